@@ -5,6 +5,8 @@ SetLocal
 :: Constants
 set PYTHON=%~dp0\..\Python\v3.8.5\python.exe
 set PYBPP=%~dp0\..\BPP\bpp.py
+:: The client runs bpp.py in the daemon if it is running, otherwise itself
+set PYBPPC=%~dp0\..\BPP\bppc.py
 set BLIB=%~dp0\..\BLib
 set BATPATH=%~dp0\..\BLib
 set BATLIB=%~dp0\..\BLib
@@ -25,7 +27,7 @@ goto :EndOfDefines
 :main (argv)
 :::Main function.:::
 :{
-	call "%PYTHON%" "%PYBPP%" %*
+	call "%PYTHON%" "%PYBPPC%" %*
 :}
 (goto:return)
 
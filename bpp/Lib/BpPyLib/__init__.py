@@ -1,29 +1,77 @@
-"""Bpp library package."""
+"""Bpp library package.
+
+The modules are imported on first access (PEP 562),
+'BpPyLib.includer' works without an import of 'BpPyLib.includer',
+and importing the package loads none of them.
+
+"""
 
 __all__ = [
 	'init',
 ]
 
+# The modules of this package, see '__getattr__'.
+_modules = (
+	'abcs',
+	'utils',
+	'cores',
+	'daemon',
+	'depfile',
+	'bppcli',
+	'prompts',
+	'version',
+	'watcher',
+	'includer',
+	'project',
+	'exceptions',
+	'buildcache',
+	'structures',
+	'precommands',
+	'preprocessor',
+	'stats',
+	'precompiled',
+	'treeshaker',
+)
+
+
+def __getattr__(name):
+	"""Imports the module of this package on first access.
+
+	Args:
+	    name: str -- module name
+
+	Return:
+	    value: module -- the module
+
+	Raises:
+	    AttributeError -- if it is not a module of this package.
+
+	"""
+
+	if name not in _modules:
+		raise AttributeError(
+			"module '%s' has no attribute '%s'" % (__name__, name)
+		)
+	import importlib
+
+	return importlib.import_module('.' + name, __name__)
+
+
+def __dir__():
+	return sorted(set(globals()) | set(_modules))
+
 
 def init():
 	"""Initializes modules and packages of this package.
-	
+
+	The modules are imported at once,
+	without it they are imported on first access.
+
 	Return:
 	    value: int -- imports count
-	
+
 	"""
 
-	from . import abcs
-	from . import utils
-	from . import cores
-	from . import bppcli
-	from . import prompts
-	from . import version
-	from . import includer
-	from . import exceptions
-	from . import structures
-	from . import precommands
-	from . import preprocessor
-
-	globals().update(locals())
-	return len(locals())
\ No newline at end of file
+	for name in _modules:
+		__getattr__(name)
+	return len(_modules)
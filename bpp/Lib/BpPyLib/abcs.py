@@ -1,6 +1,12 @@
 """Abstract base classes."""
 
 import abc
+import os
+import tempfile
+
+from .structures import (
+	Document,
+)
 
 __all__ = [
 	'BaseBpp',
@@ -36,15 +42,104 @@ class BaseBpp(metaclass=abc.ABCMeta):
 		with open(file_path, 'r') as file:
 			return file.read()
 	
-	def save(self, file_path, text):
+	def save(self, file_path, text, encoding=None, newline=None):
 		"""Saves text to file.
+
+		The text can be a 'Document',
+		then it is written chunk by chunk, without joining.
+		With the 'encoding' the file is written in binary mode,
+		see 'write_stream'.
+		
+		Args:
+		    file_path: str -- saved file path
+		    text: str or Document -- saved text
+		    encoding: str -- the file encoding, or None
+		    newline: str -- the file line ending, with the 'encoding'
+		
+		Return:
+		     value: int -- the number of characters (bytes) stored.
+		
+		Raises:
+		    OSError -- If problem in operating system
+		    TypeError -- If incorrect types
+
+		"""
+
+		if not isinstance(file_path, str):
+			raise TypeError("Param 'file_path' must be 'str'")
+		if not isinstance(text, (str, Document)):
+			raise TypeError("Param 'text' must be 'str' or 'Document'")
+		with open(file_path, 'w' if encoding is None else 'wb') as file:
+			return self.write_stream(
+				file, text, encoding=encoding, newline=newline
+			)
+	
+	def write_stream(self, stream, text, buffer_size=65536,
+			encoding=None, newline=None):
+		"""Writes text to the opened stream.
+
+		A 'Document' is streamed chunk by chunk,
+		small chunks are gathered up to 'buffer_size' characters.
+		So it is never joined into one string.
+
+		Without the 'encoding' the stream is a text stream.
+		With the 'encoding' it is a binary stream,
+		then the bytes of mapped files are written as they are,
+		and the text is encoded with '\\n' turned into the 'newline'.
+		
+		Args:
+		    stream: object -- stream, with a 'write' method
+		    text: str or Document -- written text
+		    buffer_size: int -- characters gathered before a write
+		    encoding: str -- encoding of a binary stream, or None
+		    newline: str -- line ending of a binary stream, 'os.linesep' by default
+		
+		Return:
+		     value: int -- the number of characters (bytes) written.
+		
+		Raises:
+		    OSError -- If problem in operating system
+		    TypeError -- If incorrect types
+
+		"""
+
+		if not isinstance(text, (str, Document)):
+			raise TypeError("Param 'text' must be 'str' or 'Document'")
+		empty = '' if encoding is None else b''
+		size = 0
+		buffer = []
+		buffered = 0
+		for chunk in self._get_chunks(text, encoding, newline):
+			size += len(chunk)
+			if buffered + len(chunk) > buffer_size and buffer:
+				stream.write(empty.join(buffer))
+				buffer = []
+				buffered = 0
+			if len(chunk) >= buffer_size:
+				stream.write(chunk)
+				continue
+			buffer.append(chunk)
+			buffered += len(chunk)
+		if buffer:
+			stream.write(empty.join(buffer))
+		return size
+	
+	def save_if_changed(self, file_path, text, encoding=None, newline=None):
+		"""Saves text to file, only if the file value differs.
+
+		The file is replaced atomically -
+		the text is written to a temporary file next to it,
+		which then replaces the file.
+		So an unchanged file keeps its modification time.
 		
 		Args:
 		    file_path: str -- saved file path
-		    text: str -- saved text
+		    text: str or Document -- saved text
+		    encoding: str -- the file encoding, or None (see 'save')
+		    newline: str -- the file line ending, with the 'encoding'
 		
 		Return:
-		     value: int -- the number of characters stored.
+		     value: bool -- True if the file was rewritten
 		
 		Raises:
 		    OSError -- If problem in operating system
@@ -54,10 +149,61 @@ class BaseBpp(metaclass=abc.ABCMeta):
 
 		if not isinstance(file_path, str):
 			raise TypeError("Param 'file_path' must be 'str'")
-		if not isinstance(text, str):
-			raise TypeError("Param 'text' must be 'str'")
-		with open(file_path, 'w') as file:
-			return file.write(text)
+		if not isinstance(text, (str, Document)):
+			raise TypeError("Param 'text' must be 'str' or 'Document'")
+		if os.path.isfile(file_path):
+			try:
+				if self._is_file_value(file_path, text, encoding, newline):
+					return False
+
+			except (OSError, ValueError):
+				pass
+			file_mode = os.stat(file_path).st_mode & 0o7777
+		else:
+			umask = os.umask(0)
+			os.umask(umask)
+			file_mode = 0o666 & ~umask
+		file_dir = os.path.dirname(os.path.abspath(file_path))
+		descriptor, temp_path = tempfile.mkstemp(
+			prefix='.bpp_', suffix='.tmp', dir=file_dir
+		)
+		try:
+			with open(descriptor, 'w' if encoding is None else 'wb') as file:
+				self.write_stream(
+					file, text, encoding=encoding, newline=newline
+				)
+			os.chmod(temp_path, file_mode)
+			os.replace(temp_path, file_path)
+
+		except BaseException:
+			if os.path.exists(temp_path):
+				os.remove(temp_path)
+			raise
+		return True
+	
+	def _is_file_value(self, file_path, text, encoding, newline):
+		"""Checks if the file value is equal to the text.
+
+		The file is compared chunk by chunk,
+		it is never read entirely.
+
+		"""
+
+		with open(file_path, 'r' if encoding is None else 'rb') as file:
+			for chunk in self._get_chunks(text, encoding, newline):
+				if file.read(len(chunk)) != chunk:
+					return False
+			return not file.read(1)
+	
+	@staticmethod
+	def _get_chunks(text, encoding, newline):
+		"""Return the chunks of the text, 'str' or bytes if 'encoding'."""
+
+		if isinstance(text, str):
+			text = Document([text])
+		if encoding is None:
+			return text.iter_text()
+		return text.iter_bytes(encoding, newline)
 
 
 class BaseCommand(BaseBpp, metaclass=abc.ABCMeta):
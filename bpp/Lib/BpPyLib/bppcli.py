@@ -1,7 +1,6 @@
 """Batch preprocessor command line interface."""
 
-import textwrap
-import copy
+import codecs
 import sys
 import os
 
@@ -33,6 +32,34 @@ class BppCLI:
 		'--help':     ('unary',  'help'  ),
 		'-h':         ('unary',  'help'  ),
 		'--version':  ('unary', 'version'),
+		'--no-cache': ('unary',  'no_cache'),
+		'--cache-dir': ('binary', 'cache_dir'),
+		'--define':   ('multiple', 'defines'),
+		'-D':         ('multiple', 'defines'),
+		'--depfile':  ('binary', 'depfile'),
+		'--max-depth':        ('binary', 'max_depth'),
+		'--max-includes':     ('binary', 'max_includes'),
+		'--max-output-bytes': ('binary', 'max_output_bytes'),
+		'--include-once':     ('unary',  'include_once'),
+		'--mmap':             ('unary',  'mmap'),
+		'--binary':           ('unary',  'binary'),
+		'--encoding':         ('binary', 'encoding'),
+		'--prefetch':         ('binary', 'prefetch'),
+		'--project':          ('binary', 'project'),
+		'--target':           ('multiple', 'targets'),
+		'--sources':          ('multiple', 'sources'),
+		'--output-dir':       ('binary', 'output_dir'),
+		'--jobs':             ('binary', 'jobs'),
+		'-j':                 ('binary', 'jobs'),
+		'--daemon':           ('unary',  'daemon'),
+		'--watch':            ('unary',  'watch'),
+		'--watch-interval':   ('binary', 'watch_interval'),
+		'--stats':            ('unary',  'stats'),
+		'--trace':            ('binary', 'trace'),
+		'--precompile':       ('multiple', 'precompile'),
+		'--use-precompiled':  ('unary',  'use_precompiled'),
+		'--tree-shake':       ('unary',  'tree_shake'),
+		'--keep-label':       ('multiple', 'keep_labels'),
 	})
 
 	def __init__(self):
@@ -40,6 +67,32 @@ class BppCLI:
 			'output': None,
 			'source': None,
 			'run': None,
+			'no_cache': None,
+			'cache_dir': None,
+			'defines': None,
+			'depfile': None,
+			'max_depth': None,
+			'max_includes': None,
+			'max_output_bytes': None,
+			'include_once': None,
+			'mmap': None,
+			'binary': None,
+			'encoding': None,
+			'prefetch': None,
+			'project': None,
+			'targets': None,
+			'sources': None,
+			'output_dir': None,
+			'jobs': None,
+			'daemon': None,
+			'watch': None,
+			'watch_interval': None,
+			'stats': None,
+			'trace': None,
+			'precompile': None,
+			'use_precompiled': None,
+			'tree_shake': None,
+			'keep_labels': None,
 		}
 	
 	def __repr__(self):
@@ -48,22 +101,53 @@ class BppCLI:
 	
 	def get_parsered_args(self):
 		"""Return parsered arguments."""
-		return copy.copy(self._parsered_args)
+		return dict(self._parsered_args)
 		
 	def print_help(self):
 		"""Printed Help."""
 
+		import textwrap
+
 		help_text = textwrap.dedent("""
 			BPP Utility Help
 			This utility preprocesses bat files.
 			
 			Syntax:
 			    python bpp.py -s|--source <source file> [-o|--output <output file>] [-r|--run]
+			    python bpp.py --project <manifest file> [--target <name>] [-j <N>]
+			    python bpp.py --sources <glob or @list file> --output-dir <dir> [-j <N>]
+			    python bpp.py --precompile <library file>
 
 			Params:
 			    --source | -s <source file>
 			    [--output] | [-o] <output file>
 			    [--run] | [-r]
+			    [--no-cache]
+			    [--cache-dir] <build cache directory>
+			    [--define] | [-D] <VAR=value | NAME> (variables and :#if names, NAME is 1, can be repeated)
+			    [--depfile] <dependency file> (.json or Makefile .d)
+			    [--max-depth] <number> (256 by default)
+			    [--max-includes] <number>
+			    [--max-output-bytes] <number>
+			    [--include-once]
+			    [--mmap] (map included files, copy their bytes as they are)
+			    [--binary] (bytes in, bytes out, the source is not lowercased)
+			    [--encoding] <code page> (with --binary, of files that are not UTF-8, cp866 ...etc)
+			    [--prefetch] <number> (threads that read included files ahead)
+			    [--project] <manifest file> (.json or .ini, builds all its targets)
+			    [--target] <target name> (can be repeated, with --project)
+			    [--sources] <glob or @list file> (can be repeated)
+			    [--output-dir] <output directory> (with --sources)
+			    [--jobs] | [-j] <number> (processes, with --project or --sources)
+			    [--daemon] (serves the bppc.py client, see the docs)
+			    [--watch] (rebuilds the outputs when their files change)
+			    [--watch-interval] <seconds> (0.5 by default)
+			    [--stats] (prints the time of each phase, the slowest files ...etc)
+			    [--trace] <trace file> (Chrome trace events JSON, a span per file)
+			    [--precompile] <library file> (writes <library file>.bpch, can be repeated)
+			    [--use-precompiled] (takes included libraries from their .bpch files)
+			    [--tree-shake] (removes the unused labels of the included files)
+			    [--keep-label] <label or pattern> (called dynamically, can be repeated)
 			    [--help] | [-h]
 			    [--version]
 			
@@ -72,6 +156,18 @@ class BppCLI:
 			    $ python bpp.py -o script.bat -s script2.bat --run
 			    $ python bpp.py --run -s script.cmd
 			    $ python bpp.py -r -s script.cmd
+			    $ python bpp.py -s script.bat -o out.bat --cache-dir .bppcache
+			    $ python bpp.py -s script.bat -o out.bat -D LIBDIR=C:\\lib
+			    $ python bpp.py -s script.bat -o out.bat --depfile out.d
+			    $ python bpp.py -s script.bat -o out.bat --binary --encoding cp866
+			    $ python bpp.py -s script.bat -o out.bat --prefetch 8
+			    $ python bpp.py --project bpp.json --target setup
+			    $ python bpp.py --sources "src/*.bat" --output-dir dist -j 8
+			    $ python bpp.py --project bpp.json --watch
+			    $ python bpp.py -s script.bat -o out.bat --stats --trace trace.json
+			    $ python bpp.py --precompile lib\\big.hbat -D LIBDIR=C:\\lib
+			    $ python bpp.py -s script.bat -o out.bat --use-precompiled
+			    $ python bpp.py -s script.bat -o out.bat --tree-shake --keep-label "on_*"
 		""")
 		print(help_text, file=sys.stdout)
 	
@@ -113,6 +209,23 @@ class BppCLI:
 		return self.parameters.get(argument)
 
 
+	def get_argument_names(self, argname):
+		"""Return all names of the argument, for messages.
+		
+		Args:
+		    argname: str -- argument common name
+		
+		Return:
+		    value: str -- for example '-o / --output'
+
+		"""
+
+		names = sorted(
+			(n for n, info in self.parameters.items() if info[-1] == argname),
+			key=len,
+		)
+		return ' / '.join(names)
+
 	def parse(self, argv):
 		"""Parsing the command line arguments.
 		
@@ -133,36 +246,28 @@ class BppCLI:
 		if '--version' in argv:
 			self.print_version()
 			return False
-		output = source = run = None
+		parsered_args = dict.fromkeys(self._parsered_args)
 		errmsg = "before param '%s' must be indicated value"
-		ind = arg = 1
+		ind = 1
 		while ind < len(argv):
 			arg = argv[ind]
 			if not self.is_supported(arg):
 				raise CLIError("This argument '%s' is unsupported" % arg)
-			argname = self.get_argument_info(arg)[-1]
-			if argname == 'output':
+			argtype, argname = self.get_argument_info(arg)
+			if argtype in ('binary', 'multiple'):
 				if len(argv)-1 > ind:
-					output = argv[ind+1]
+					if argtype == 'multiple':
+						values = parsered_args[argname] or []
+						parsered_args[argname] = values + [argv[ind+1]]
+					else:
+						parsered_args[argname] = argv[ind+1]
 					ind += 2
 					continue
 				else:
-					raise CLIError(errmsg % '-o / --output')
-			if argname == 'source':
-				if len(argv)-1 > ind:
-					source = argv[ind+1]
-					ind += 2
-					continue
-				else:
-					raise CLIError(errmsg % '-s / --source')
-			if argname == 'run':
-				run = 'true'
+					raise CLIError(errmsg % self.get_argument_names(argname))
+			parsered_args[argname] = 'true'
 			ind += 1
-		self._parsered_args.update({
-			'output': output,
-			'source': source,
-			'run': run,
-		})
+		self._parsered_args.update(parsered_args)
 		return True
 	
 	def validate(self):
@@ -173,9 +278,149 @@ class BppCLI:
 		
 		"""
 
+		project = self._parsered_args.get('project', None)
+		sources = self._parsered_args.get('sources', None)
+		if project is not None:
+			if not os.path.isfile(project):
+				raise CLIError('Project manifest file not found')
+			if self._parsered_args.get('source', None) is not None:
+				raise CLIError("Params '--project' and '-s / --source' are exclusive")
+			if sources is not None:
+				raise CLIError("Params '--project' and '--sources' are exclusive")
+		elif self._parsered_args.get('targets', None) is not None:
+			raise CLIError("Param '--target' works with '--project'")
+		if sources is not None:
+			if self._parsered_args.get('source', None) is not None:
+				raise CLIError("Params '--sources' and '-s / --source' are exclusive")
+			if self._parsered_args.get('output_dir', None) is None:
+				raise CLIError("Param '--sources' needs '--output-dir'")
+			if self._parsered_args.get('depfile', None) is not None:
+				raise CLIError("Param '--depfile' works with one source")
+		elif self._parsered_args.get('output_dir', None) is not None:
+			raise CLIError("Param '--output-dir' works with '--sources'")
+		jobs = self._parsered_args.get('jobs', None)
+		if jobs is not None:
+			if project is None and sources is None:
+				raise CLIError("Param '--jobs / -j' works with '--project' or '--sources'")
+			if not jobs.isdigit() or int(jobs) < 1:
+				raise CLIError("Param '--jobs / -j' must be a positive number")
 		source = self._parsered_args.get('source', None)
-		if source is None:
+		precompile = self._parsered_args.get('precompile', None)
+		if precompile is not None:
+			if source is not None or project is not None or sources is not None:
+				raise CLIError("Param '--precompile' works without sources")
+			for argname in (
+				'daemon', 'watch', 'use_precompiled', 'stats', 'trace', 'tree_shake',
+			):
+				if self._parsered_args.get(argname, None) is not None:
+					raise CLIError(
+						"Params '--precompile' and '%s' are exclusive" % (
+							self.get_argument_names(argname),)
+					)
+			for library in precompile:
+				if not os.path.isfile(library):
+					raise CLIError("Library file '%s' not found" % library)
+		if self._parsered_args.get('daemon', None) is not None:
+			if source is not None or project is not None or sources is not None:
+				raise CLIError("Param '--daemon' works without sources")
+			return None
+		if source is None and project is None and sources is None and precompile is None:
 			raise CLIError("Param '-s / --source' must be indicated")
+		if self._parsered_args.get('watch', None) is not None:
+			if source is not None and self._parsered_args.get('output', None) is None:
+				raise CLIError("Param '--watch' needs '-o / --output'")
+			if self._parsered_args.get('run', None) is not None:
+				raise CLIError("Params '--watch' and '-r / --run' are exclusive")
+		watch_interval = self._parsered_args.get('watch_interval', None)
+		if watch_interval is not None:
+			if self._parsered_args.get('watch', None) is None:
+				raise CLIError("Param '--watch-interval' works with '--watch'")
+			try:
+				if float(watch_interval) <= 0:
+					raise ValueError(watch_interval)
+
+			except ValueError:
+				raise CLIError("Param '--watch-interval' must be a positive number")
+		for argname in ('stats', 'trace'):
+			if self._parsered_args.get(argname, None) is None:
+				continue
+			if source is None or self._parsered_args.get('watch', None) is not None:
+				raise CLIError(
+					"Param '%s' works with one source, without '--watch'" % (
+						self.get_argument_names(argname),)
+				)
+		if self._parsered_args.get('tree_shake', None) is not None:
+			for argname in ('mmap', 'binary'):
+				if self._parsered_args.get(argname, None) is not None:
+					raise CLIError(
+						"Params '--tree-shake' and '%s' are exclusive" % (
+							self.get_argument_names(argname),)
+					)
+		elif self._parsered_args.get('keep_labels', None) is not None:
+			raise CLIError("Param '--keep-label' works with '--tree-shake'")
+		# In the text mode the files are read in the system encoding.
+		if self._parsered_args.get('encoding', None) is not None:
+			if self._parsered_args.get('binary', None) is None:
+				raise CLIError("Param '--encoding' works with '--binary'")
 		if isinstance(source, str) and not os.path.isfile(source):
 			raise CLIError('Source file not found')
-		return None
\ No newline at end of file
+		for define in self._parsered_args.get('defines') or ():
+			if not define.partition('=')[0].strip():
+				raise CLIError(
+					"Param '--define / -D' must be 'VAR=value' or 'NAME', not '%s'" % define
+				)
+		for argname in ('max_depth', 'max_includes', 'max_output_bytes', 'prefetch'):
+			limit = self._parsered_args.get(argname)
+			if limit is not None and (not limit.isdigit() or int(limit) < 1):
+				raise CLIError(
+					"Param '%s' must be a positive number" % (
+						self.get_argument_names(argname),)
+				)
+		encoding = self._parsered_args.get('encoding')
+		if encoding is not None:
+			try:
+				codecs.lookup(encoding)
+
+			except LookupError:
+				raise CLIError(
+					"Param '--encoding' - unknown encoding '%s'" % encoding
+				)
+		return None
+	
+	def get_limits(self):
+		"""Return include limits from '--max-*' params.
+		
+		Return:
+		    value: dict -- :
+		        {'depth': int, 'includes': int, 'output_bytes': int},
+		        only the specified limits
+
+		"""
+
+		limits = {}
+		names = (
+			('max_depth', 'depth'),
+			('max_includes', 'includes'),
+			('max_output_bytes', 'output_bytes'),
+		)
+		for argname, limit_name in names:
+			limit = self._parsered_args.get(argname)
+			if limit is not None:
+				limits[limit_name] = int(limit)
+		return limits
+	
+	def get_defines(self):
+		"""Return variables from '--define / -D' params.
+
+		'NAME' without '=value' is defined as '1', as ':#define NAME'.
+		
+		Return:
+		    value: dict -- {VAR: value}
+
+		"""
+
+		defines = {}
+		for define in self._parsered_args.get('defines') or ():
+			name, separator, value = define.partition('=')
+			defines[name.strip()] = value if separator else '1'
+		return defines
\ No newline at end of file
@@ -0,0 +1,252 @@
+"""Persistent incremental build cache.
+
+The build manifest records every file of the include tree -
+with its modification time, size and content hash.
+If nothing in the tree has changed since the last build,
+the preprocessing can be skipped entirely.
+
+The manifest is saved next to the output file,
+or in the cache directory if one is specified.
+
+"""
+
+import hashlib
+import json
+import os
+
+from .abcs import (
+	BaseBpp,
+)
+from .version import (
+	getversion,
+)
+
+__all__ = [
+	'BuildCache',
+	'get_file_entry',
+	'is_file_unchanged',
+]
+
+
+class BuildCache(BaseBpp):
+	"""Build manifest of one output file.
+
+	Constructor:
+	    source_filepath: str -- source file path
+	    output_filepath: str -- output file path
+	    cache_dir: str -- :
+	        Directory for the manifest.
+	        If None then the manifest is saved next to the output file.
+	    options: dict -- :
+	        Options that affect the output.
+	        If they change, the output is rebuilt.
+
+	#### Example ####:
+	>>> cache = BuildCache('main.bat', 'out.bat')
+	>>> if not cache.is_up_to_date(includer.expand_environ):
+	...     preprocessor.preprocessize()
+	...     preprocessor.update('out.bat')
+	...     cache.record(includer.get_dependencies(), includer.get_environ_values())
+
+	"""
+
+	manifest_extension = '.bppcache'
+
+	def __init__(self, source_filepath, output_filepath, cache_dir=None, options=None):
+		self._source_filepath = os.path.realpath(source_filepath)
+		self._output_filepath = os.path.realpath(output_filepath)
+		self._options = dict(options or {})
+		if cache_dir is None:
+			self._manifest_path = self._output_filepath + self.manifest_extension
+		else:
+			output_hash = hashlib.sha1(
+				self._output_filepath.encode('utf-8')
+			).hexdigest()[:16]
+			self._manifest_path = os.path.join(
+				os.path.abspath(cache_dir),
+				'%s.%s%s' % (
+					os.path.basename(self._output_filepath),
+					output_hash,
+					self.manifest_extension,
+				)
+			)
+
+	def __repr__(self):
+		repr_text = "BuildCache(source_filepath=%s, output_filepath=%s)" % (
+			self._source_filepath, self._output_filepath
+		)
+		return repr_text
+
+	def get_manifest_path(self):
+		"""Return the manifest file path."""
+		return self._manifest_path
+
+	def load(self):
+		"""Loads the manifest.
+
+		Return:
+		    value: dict -- :
+		        The manifest, or None -
+		        if it does not exist or is damaged
+
+		"""
+
+		try:
+			manifest = json.loads(self.read(self._manifest_path))
+
+		except (OSError, ValueError):
+			return None
+		if not isinstance(manifest, dict):
+			return None
+		return manifest
+
+	def get_recorded_files(self):
+		"""Return the paths of the files recorded by the last build.
+
+		Return:
+		    value: list -- file paths, the source first
+
+		"""
+
+		manifest = self.load()
+		try:
+			return [file_entry['path'] for file_entry in manifest['files']]
+
+		except (KeyError, TypeError):
+			return []
+
+	def is_up_to_date(self, expand_environ=None, stats=None):
+		"""Checks if the output is up to date.
+
+		A file whose modification time has changed -
+		but whose content hash has not, is still up to date.
+
+		Args:
+		    expand_environ: callable -- :
+		        Expands environment variables in paths.
+		        Needed if the manifest has env-based includes.
+		    stats: BuildStats -- counts the checked files ('files_checked')
+
+		Return:
+		    value: bool -- True if preprocessing can be skipped
+
+		"""
+
+		manifest = self.load()
+		if manifest is None:
+			return False
+		expected = (
+			('version', getversion()),
+			('source', self._source_filepath),
+			('output', self._output_filepath),
+			('options', self._options),
+		)
+		for key, value in expected:
+			if manifest.get(key) != value:
+				return False
+		try:
+			file_entries = list(manifest['files'])
+			file_entries.append(manifest['output_file'])
+			for file_entry in file_entries:
+				if stats is not None:
+					stats.count('files_checked')
+				if not is_file_unchanged(file_entry):
+					return False
+			environ_values = manifest['environ']
+			if environ_values:
+				if expand_environ is None:
+					return False
+				for environ_var, variable_value in environ_values.items():
+					if expand_environ(environ_var) != variable_value:
+						return False
+
+		except (KeyError, TypeError, AttributeError):
+			return False
+		return True
+
+	def record(self, dependencies, environ_values=None):
+		"""Saves the manifest after a successful build.
+
+		Args:
+		    dependencies: list -- paths of all files of the include tree
+		    environ_values: dict -- :
+		        Expanded env-based include paths,
+		        {path with variables: unwrapped path}
+
+		"""
+
+		files = []
+		seen = set()
+		for file_path in [self._source_filepath] + list(dependencies):
+			file_path = os.path.realpath(file_path)
+			if file_path in seen:
+				continue
+			seen.add(file_path)
+			files.append(get_file_entry(file_path))
+		manifest = {
+			'version': getversion(),
+			'source': self._source_filepath,
+			'output': self._output_filepath,
+			'options': self._options,
+			'files': files,
+			'output_file': get_file_entry(self._output_filepath),
+			'environ': dict(environ_values or {}),
+		}
+		# The builds of a project share the cache directory, see '--cache-dir'.
+		os.makedirs(os.path.dirname(self._manifest_path), exist_ok=True)
+		self.save_if_changed(
+			self._manifest_path, json.dumps(manifest, indent=1)
+		)
+
+	def remove(self):
+		"""Removes the manifest if it exists."""
+
+		if os.path.isfile(self._manifest_path):
+			os.remove(self._manifest_path)
+
+
+def get_file_entry(file_path):
+	"""Return the manifest entry of the file.
+
+	Return:
+	    value: dict -- {'path': str, 'mtime': int, 'size': int, 'sha256': str}
+
+	"""
+
+	stat = os.stat(file_path)
+	return {
+		'path': file_path,
+		'mtime': stat.st_mtime_ns,
+		'size': stat.st_size,
+		'sha256': _get_file_hash(file_path),
+	}
+
+
+def is_file_unchanged(file_entry):
+	"""Checks the manifest entry of the file, see 'get_file_entry'.
+
+	A file whose modification time has changed -
+	but whose content hash has not, is unchanged.
+
+	"""
+
+	try:
+		stat = os.stat(file_entry['path'])
+
+	except OSError:
+		return False
+	if stat.st_size != file_entry['size']:
+		return False
+	if stat.st_mtime_ns == file_entry['mtime']:
+		return True
+	return _get_file_hash(file_entry['path']) == file_entry['sha256']
+
+
+def _get_file_hash(file_path):
+	"""Return the sha256 hash of the file content."""
+
+	file_hash = hashlib.sha256()
+	with open(file_path, 'rb') as file:
+		for chunk in iter(lambda: file.read(65536), b''):
+			file_hash.update(chunk)
+	return file_hash.hexdigest()
@@ -1,17 +1,320 @@
 """In this kernel module for preprocessor commands."""
 
+import codecs
 import os
+import re
+
+from .structures import (
+	DirectiveToken,
+)
+from .utils import (
+	LazyRegexs,
+)
 
 __all__ = [
-	'IncluderCore'
+	'IncluderCore',
+	'IncluderTokenizer',
+	'EnvironCore',
+	'ConditionalCore',
 ]
 
+# {'ConditionalRegexs' key: token kind}
+_conditional_kinds = {
+	1: 'define',
+	2: 'undef',
+	3: 'ifdef',
+	4: 'ifndef',
+	5: 'if',
+	6: 'elif',
+	7: 'else',
+	8: 'endif',
+}
+
+
+class IncluderTokenizer:
+	"""Line-oriented tokenizer of preprocessor directives.
+
+	Constructor:
+	    com_include: dict -- The 'Include' command regexs
+	    com_conditional: dict -- :
+	        The conditional directives regexs (see 'ConditionalRegexs'),
+	        if None then the conditional directives are not tokenized
+
+	The source is scanned once.
+	Only the lines with ':#' are looked at,
+	all other lines are skipped without any regexs.
+	Each directive line becomes a 'DirectiveToken'.
+
+	The regexs are applied to a single line,
+	so the tokens are the same as the matches -
+	of the regexs over the whole source.
+
+	#### Example ####:
+	>>> import precommands
+	>>> com_include = precommands.PreprocessorCommands().com_include
+	>>> tokenizer = IncluderTokenizer(com_include)
+	>>> tokens = tokenizer.tokenize('\\n:#include "some.bat"\\n')
+
+	"""
+
+	def __init__(self, com_include, com_conditional=None):
+		self._com_include = com_include
+		self._bad_keys = tuple(n for n in com_include if n < 0)
+		self._com_conditional = com_conditional
+		if com_conditional is not None:
+			self._conditional_keys = tuple(
+				n for n in sorted(com_conditional) if n < 0
+			) + tuple(n for n in sorted(com_conditional) if n > 0)
+
+	def __repr__(self):
+		repr_text = "IncluderTokenizer(com_include=%s)" % (self._com_include,)
+		return repr_text
+
+	def tokenize(self, source):
+		"""Return tokens of all directive lines of the 'source'.
+
+		Args:
+		    source: str -- file value
+		
+		Return:
+		    value: list -- 'DirectiveToken' objects, in the source order
+
+		"""
+
+		tokens = []
+		line = 1
+		line_position = 0
+		source_size = len(source)
+		position = source.find(':#')
+		while position != -1:
+			line_start = source.rfind('\n', 0, position) + 1
+			line_end = source.find('\n', position)
+			if line_end == -1:
+				line_end = source_size
+			line += source.count('\n', line_position, line_start)
+			line_position = line_start
+			token = self._get_token(
+				source[line_start:line_end],
+				line_start,
+				line,
+				line_start > 0,
+				line_end < source_size,
+			)
+			if token is not None:
+				tokens.append(token)
+			position = source.find(':#', line_end)
+		return tokens
+
+	def tokenize_mapped(self, buffer, encoding, is_included=True):
+		"""Return tokens of all directive lines of the mapped file.
+
+		The file is scanned for ':#' at the byte level,
+		only the directive lines are decoded.
+		A line is decoded as UTF-8 if it can be,
+		otherwise with the 'encoding' (the file code page).
+		The UTF-8 BOM is not a part of the first line.
+
+		An included file is looked at as in 'Includer' -
+		its first line starts with a space, and the last one ends with it.
+		The directive lines of the source file are lowercased,
+		as the source file is lowercased in text mode.
+
+		The offsets of the tokens are in bytes of the file -
+		wrapped with the spaces, see 'MappedFile'.
+		The line numbers are counted only for the error tokens,
+		other tokens have the line None.
+
+		Args:
+		    buffer: mmap or bytes -- file value
+		    encoding: str -- file code page
+		    is_included: bool -- it is an included file, not the source
+		
+		Return:
+		    value: list -- 'DirectiveToken' objects, in the file order
+
+		"""
+
+		tokens = []
+		line = 1
+		line_position = 0
+		buffer_size = len(buffer)
+		shift = 1 if is_included else 0
+		bom_size = len(codecs.BOM_UTF8)
+		if buffer[:bom_size] != codecs.BOM_UTF8:
+			bom_size = 0
+		position = buffer.find(b':#')
+		while position != -1:
+			line_start = buffer.rfind(b'\n', 0, position) + 1
+			line_end = buffer.find(b'\n', position)
+			if line_end == -1:
+				line_end = buffer_size
+			lead = ' ' if line_start == 0 and is_included else ''
+			trail = ' ' if line_end == buffer_size and is_included else ''
+			if line_start == 0:
+				line_start = bom_size
+			text_end = line_end
+			if text_end > line_start and buffer[text_end - 1] == ord('\r'):
+				text_end -= 1
+			text, line_encoding = self._decode_line(
+				buffer[line_start:text_end], encoding
+			)
+			directive = text
+			if not is_included:
+				directive = text.lower()
+				if len(directive) != len(text):
+					directive = text
+			token = self._get_token(
+				'%s%s%s' % (lead, directive, trail),
+				-len(lead), None, True, True,
+			)
+			if token is not None:
+				if token.kind in ('error', 'conditional_error'):
+					line += buffer[line_position:line_start].count(b'\n')
+					line_position = line_start
+					token.line = line
+				# Character offsets in the line, to byte offsets in the file.
+				for name in ('start', 'end', 'path_start', 'path_end'):
+					offset = getattr(token, name)
+					if offset is None:
+						continue
+					if offset < 0:
+						# The leading space is a part of the directive.
+						offset = 0
+					elif offset > len(text):
+						# The trailing space is a part of the directive.
+						offset = buffer_size + 2 * shift
+					else:
+						offset = shift + line_start + len(
+							text[:offset].encode(line_encoding, 'surrogateescape')
+						)
+					setattr(token, name, offset)
+				tokens.append(token)
+			position = buffer.find(b':#', line_end)
+		return tokens
+
+	@staticmethod
+	def _decode_line(data, encoding):
+		"""Return the decoded line and its encoding.
+
+		The undecodable bytes are kept as surrogates,
+		so the line is encoded back to the same bytes.
+
+		"""
+
+		try:
+			return (data.decode('utf-8'), 'utf-8')
+
+		except UnicodeDecodeError:
+			return (data.decode(encoding, 'surrogateescape'), encoding)
+
+	def _get_token(self, text, offset, line, is_newline_before, is_newline_after):
+		"""Return the token of one directive line, or None.
+
+		Args:
+		    text: str -- the line, without newlines
+		    offset: int -- offset of the line in the source
+		    line: int -- line number
+		    is_newline_before: bool -- the line is preceded by a newline
+		    is_newline_after: bool -- the line is followed by a newline
+
+		"""
+
+		com_include = self._com_include
+		shift = 1 if is_newline_before else 0
+		wrapped = '%s%s%s' % (
+			'\n' * shift, text, '\n' if is_newline_after else ''
+		)
+		column = text.find(':#') + 1
+		for n in self._bad_keys:
+			match = com_include[n].search(wrapped)
+			if match is None:
+				continue
+			expression = match.group().strip()
+			if com_include[n].search('\n' + expression) is None:
+				continue
+			return DirectiveToken(
+				'error', n, line, column,
+				offset + match.start() - shift,
+				offset + match.end() - shift,
+				expression,
+			)
+		match = com_include[1].search(wrapped)
+		if match is not None:
+			expression = match.group()
+			if com_include[2].search('\n' + expression + '\n') is not None:
+				kind, path_key = 'environ', 21
+			else:
+				kind, path_key = 'include', 11
+			token = DirectiveToken(
+				kind, 1 if kind == 'include' else 2, line, column,
+				offset + match.start() - shift,
+				offset + match.end() - shift,
+				expression,
+			)
+			path_match = com_include[path_key].search(expression)
+			if path_match is not None:
+				quoted = path_match.group()[1:-1]
+				path = quoted.strip()
+				token.path = path
+				token.path_start = (
+					token.start + path_match.start() + 1 +
+					len(quoted) - len(quoted.lstrip())
+				)
+				token.path_end = token.path_start + len(path)
+			return token
+		pragma_once = com_include.get(3)
+		if pragma_once is not None:
+			match = pragma_once.search(wrapped)
+			if match is not None:
+				return DirectiveToken(
+					'pragma', 3, line, column,
+					offset + match.start() - shift,
+					offset + match.end() - shift,
+					match.group(),
+				)
+		if self._com_conditional is not None:
+			return self._get_conditional_token(wrapped, offset, line, column, shift)
+		return None
+
+	def _get_conditional_token(self, wrapped, offset, line, column, shift):
+		"""Return the token of the conditional directive line, or None.
+
+		Args:
+		    See '_get_token', 'wrapped' is the line with its newlines.
+
+		"""
+
+		directive = wrapped.lstrip()[2:]
+		if not directive.startswith(('define', 'undef', 'if', 'elif', 'else', 'endif')):
+			return None
+		com_conditional = self._com_conditional
+		for n in self._conditional_keys:
+			match = com_conditional[n].search(wrapped)
+			if match is None:
+				continue
+			token = DirectiveToken(
+				_conditional_kinds.get(n, 'conditional_error'), n, line, column,
+				offset + match.start() - shift,
+				offset + match.end() - shift,
+				match.group().strip(),
+			)
+			if n in (1, 2, 3, 4):
+				token.name = match.group(1)
+			if n == 1:
+				token.value = match.group(2)
+			elif n in (5, 6):
+				token.value = match.group(1)
+			return token
+		return None
+
 
 class IncluderCore:
 	"""The 'Include' command core.
 	
 	Constructor:
 	    regexs: dict -- The 'Include' command regexs
+	    com_conditional: dict -- :
+	        The conditional directives regexs, see 'IncluderTokenizer'
 	
 	#### Example ####:
 	>>> import precommands, os
@@ -22,8 +325,27 @@ class IncluderCore:
 
 	"""
 
-	def __init__(self, com_include):
+	def __init__(self, com_include, com_conditional=None):
 		self._com_include = com_include
+		self._tokenizer = IncluderTokenizer(com_include, com_conditional)
+	
+	def tokenize(self, source):
+		"""Return tokens of all directive lines of the 'source'.
+
+		See 'IncluderTokenizer.tokenize'.
+
+		"""
+
+		return self._tokenizer.tokenize(source)
+	
+	def tokenize_mapped(self, buffer, encoding, is_included=True):
+		"""Return tokens of all directive lines of the mapped file.
+
+		See 'IncluderTokenizer.tokenize_mapped'.
+
+		"""
+
+		return self._tokenizer.tokenize_mapped(buffer, encoding, is_included)
 	
 	def absolutize(self, path, source):
 		"""Makes inclusions in 'source' absolutized.
@@ -53,19 +375,346 @@ class IncluderCore:
 		
 		"""
 
-		com_include = self._com_include
-		absolutized = source
-		for m1 in com_include[1].finditer('\n' + source + '\n'):
-			m1 = m1.group()
-			if com_include[2].search('\n' + m1 + '\n') is not None:
-				continue
-			included_file = com_include[11].search(m1)
-			if included_file is None:
+		if ':#' not in source:
+			return source
+		source = '\n' + source + '\n'
+		parts = []
+		position = 0
+		for token in self._tokenizer.tokenize(source):
+			if token.kind != 'include' or token.path is None:
 				continue
-			included_file = included_file.group()[1:-1].strip()
-			if os.path.isabs(included_file):
+			if os.path.isabs(token.path):
 				continue
-			absolutized = absolutized.replace(
-				m1, m1.replace(included_file, os.path.join(path, included_file))
-			)
-		return absolutized
\ No newline at end of file
+			parts.append(source[position:token.path_start])
+			parts.append(os.path.join(path, token.path))
+			position = token.path_end
+		parts.append(source[position:])
+		return ''.join(parts)[1:-1]
+
+
+class EnvironCore:
+	"""Expands environment variables in paths, without a shell.
+
+	Constructor:
+	    environ: dict -- :
+	        Environment variables, they are looked up by name when expanded.
+	        If None then 'os.environ' is used.
+	        If it has 'get_nocase(name)', it is used for cmd variables,
+	        so the variables are never listed (see 'BppDaemon').
+	    defines: dict -- :
+	        Variables which override the environment.
+	        For example from '--define VAR=value'.
+
+	Both syntaxes are supported, regardless of the OS:
+	    cmd   -- %VAR%, %VAR:~start,length%, %VAR:old=new%, %VAR:*old=new%
+	    POSIX -- $VAR, ${VAR}
+
+	Like in cmd.exe, cmd variable names are not case sensitive,
+	and an undefined cmd variable is left as is.
+	An undefined POSIX variable is expanded to an empty string.
+
+	#### Example ####:
+	>>> core = EnvironCore(defines={'LIBDIR': 'C:\\lib'})
+	>>> core.expand('%libdir:~0,2%\\some.bat')
+	'C:\\some.bat'
+
+	"""
+
+	_cmd_variable = LazyRegexs(
+		r'%([^%:]+)(?::(?:~(-?\d+)(?:,(-?\d+))?|(\*?)([^=%]*)=([^%]*)))?%'
+	)
+	_posix_variable = LazyRegexs(r'\$(?:\{(\w+)\}|(\w+))')
+
+	def __init__(self, environ=None, defines=None):
+		if environ is None:
+			environ = os.environ
+		self._environ = environ
+		self._defines = dict(defines or {})
+		self._nocase_defines = {
+			n.lower(): v for n, v in self._defines.items()
+		}
+		# The environment with lowercase names, made on the first cmd variable.
+		self._nocase_environ = None
+		self._expanded = {}
+
+	def __repr__(self):
+		repr_text = "EnvironCore(defines=%s)" % (self._defines,)
+		return repr_text
+
+	def expand(self, value):
+		"""Expands all environment variables in 'value'.
+
+		The results are memoized.
+
+		Args:
+		    value: str -- path with environment variables
+		
+		Return:
+		    value: str -- unwrapped path
+
+		"""
+
+		expanded = self._expanded.get(value)
+		if expanded is None:
+			expanded = self._cmd_variable.sub(self._expand_cmd, value)
+			expanded = self._posix_variable.sub(self._expand_posix, expanded)
+			self._expanded[value] = expanded
+		return expanded
+
+	def _expand_cmd(self, match):
+		"""Return the value of the cmd variable match."""
+
+		name, start, length, star, old, new = match.groups()
+		variable_value = self._nocase_defines.get(name.lower())
+		if variable_value is None:
+			variable_value = self._get_nocase_variable(name)
+		if variable_value is None:
+			return match.group()
+		if start is not None:
+			start = int(start)
+			size = len(variable_value)
+			if start < 0:
+				start = max(size + start, 0)
+			if length is None:
+				return variable_value[start:]
+			length = int(length)
+			if length < 0:
+				return variable_value[start:size + length]
+			return variable_value[start:start + length]
+		if old:
+			old_regex = re.compile(re.escape(old), re.IGNORECASE)
+			if star:
+				old_match = old_regex.search(variable_value)
+				if old_match is None:
+					return variable_value
+				return new + variable_value[old_match.end():]
+			return old_regex.sub(lambda m: new, variable_value)
+		return variable_value
+
+	def _expand_posix(self, match):
+		"""Return the value of the POSIX variable match."""
+
+		name = match.group(1) or match.group(2)
+		variable_value = self._defines.get(name)
+		if variable_value is None:
+			variable_value = self._environ.get(name, '')
+		return variable_value
+
+	def _get_nocase_variable(self, name):
+		"""Return the environment variable, the name is not case sensitive."""
+
+		get_nocase = getattr(self._environ, 'get_nocase', None)
+		if get_nocase is not None:
+			return get_nocase(name)
+		if self._nocase_environ is None:
+			self._nocase_environ = {
+				n.lower(): v for n, v in self._environ.items()
+			}
+		return self._nocase_environ.get(name.lower())
+
+
+class ConditionalCore:
+	"""Defines and expressions of the conditional directives.
+
+	Constructor:
+	    defines: dict -- :
+	        The initial definitions,
+	        for example from '--define VAR=value'.
+
+	The names are not case sensitive, as cmd variable names.
+	An expression of ':#if' and ':#elif' can have:
+	    defined(NAME), defined NAME -- 1 if the name is defined, else 0
+	    NAME -- the defined value, an undefined name is empty
+	    "text", 123 -- a string and a number
+	    ==, != -- comparison, not case sensitive (numbers as numbers)
+	    !, &&, || and parentheses
+	A value is false if it is empty or '0'.
+
+	The definitions are never changed in place,
+	a new dict is made for each change.
+	So 'get_state' is a snapshot, and comparing them is cheap.
+
+	#### Example ####:
+	>>> core = ConditionalCore({'TARGET': 'windows'})
+	>>> core.define('debug')
+	>>> core.evaluate('defined(DEBUG) && target == "Windows"')
+	True
+
+	"""
+
+	_expression_token = LazyRegexs(
+		r'\s*(?:(\|\||&&|==|!=|!|\(|\))|"([^"]*)"|([\w.\-]+))'
+	)
+
+	def __init__(self, defines=None):
+		self._defines = {
+			str(n).lower(): str(v) for n, v in (defines or {}).items()
+		}
+
+	def __repr__(self):
+		repr_text = "ConditionalCore(defines=%s)" % (self._defines,)
+		return repr_text
+
+	def get_state(self):
+		"""Return the current definitions (not to be changed)."""
+		return self._defines
+
+	def set_state(self, defines):
+		"""Sets the definitions, see 'get_state'."""
+		self._defines = defines
+
+	def define(self, name, value=None):
+		"""Defines the name.
+
+		Args:
+		    name: str -- the name
+		    value: str -- :
+		        the value, quotes around it are dropped,
+		        '1' if None or empty
+
+		"""
+
+		if value is not None and len(value) > 1 and value[0] == value[-1] == '"':
+			value = value[1:-1]
+		defines = dict(self._defines)
+		defines[name.lower()] = value or '1'
+		self._defines = defines
+
+	def undef(self, name):
+		"""Removes the definition of the name."""
+
+		name = name.lower()
+		if name in self._defines:
+			defines = dict(self._defines)
+			del defines[name]
+			self._defines = defines
+
+	def is_defined(self, name):
+		"""Checks if the name is defined."""
+		return name.lower() in self._defines
+
+	def evaluate(self, expression):
+		"""Evaluates the expression of ':#if' or ':#elif'.
+
+		Args:
+		    expression: str -- the expression
+		
+		Return:
+		    value: bool -- the result
+		
+		Raises:
+		    ValueError -- If the expression is incorrect
+
+		"""
+
+		tokens = self._split(expression)
+		value, position = self._parse_or(tokens, 0)
+		if position != len(tokens):
+			raise ValueError("Unexpected '%s'" % tokens[position][1])
+		return self._is_true(value)
+
+	def _split(self, expression):
+		"""Return the expression tokens, tuples (kind, text)."""
+
+		tokens = []
+		position = 0
+		expression = expression.rstrip()
+		while position < len(expression):
+			match = self._expression_token.match(expression, position)
+			if match is None:
+				raise ValueError(
+					"Unexpected '%s'" % expression[position:].strip()
+				)
+			operator, string, word = match.groups()
+			if operator is not None:
+				tokens.append(('operator', operator))
+			elif string is not None:
+				tokens.append(('string', string))
+			else:
+				tokens.append(('word', word))
+			position = match.end()
+		return tokens
+
+	@staticmethod
+	def _is_true(value):
+		"""Checks if the value is true, see the class help."""
+		return value not in ('', '0')
+
+	def _parse_or(self, tokens, position):
+		"""Parses 'a || b', return (value, next position)."""
+
+		value, position = self._parse_and(tokens, position)
+		while position < len(tokens) and tokens[position] == ('operator', '||'):
+			right, position = self._parse_and(tokens, position + 1)
+			value = '1' if self._is_true(value) or self._is_true(right) else '0'
+		return (value, position)
+
+	def _parse_and(self, tokens, position):
+		"""Parses 'a && b', see '_parse_or'."""
+
+		value, position = self._parse_not(tokens, position)
+		while position < len(tokens) and tokens[position] == ('operator', '&&'):
+			right, position = self._parse_not(tokens, position + 1)
+			value = '1' if self._is_true(value) and self._is_true(right) else '0'
+		return (value, position)
+
+	def _parse_not(self, tokens, position):
+		"""Parses '!a', see '_parse_or'."""
+
+		if position < len(tokens) and tokens[position] == ('operator', '!'):
+			value, position = self._parse_not(tokens, position + 1)
+			return ('0' if self._is_true(value) else '1', position)
+		return self._parse_comparison(tokens, position)
+
+	def _parse_comparison(self, tokens, position):
+		"""Parses 'a == b' and 'a != b', see '_parse_or'."""
+
+		value, position = self._parse_value(tokens, position)
+		if position < len(tokens) and tokens[position][1] in ('==', '!='):
+			operator = tokens[position][1]
+			right, position = self._parse_value(tokens, position + 1)
+			if value.lstrip('-').isdigit() and right.lstrip('-').isdigit():
+				is_equal = int(value) == int(right)
+			else:
+				is_equal = value.lower() == right.lower()
+			value = '1' if is_equal == (operator == '==') else '0'
+		return (value, position)
+
+	def _parse_value(self, tokens, position):
+		"""Parses a name, a string, a number or '(...)', see '_parse_or'."""
+
+		if position >= len(tokens):
+			raise ValueError("The expression is not complete")
+		kind, text = tokens[position]
+		if kind == 'string':
+			return (text, position + 1)
+		if kind == 'operator':
+			if text != '(':
+				raise ValueError("Unexpected '%s'" % text)
+			value, position = self._parse_or(tokens, position + 1)
+			if position >= len(tokens) or tokens[position] != ('operator', ')'):
+				raise ValueError("The ')' is missing")
+			return (value, position + 1)
+		if text.lstrip('-').isdigit():
+			return (text, position + 1)
+		if text.lower() == 'defined':
+			return self._parse_defined(tokens, position + 1)
+		return (self._defines.get(text.lower(), ''), position + 1)
+
+	def _parse_defined(self, tokens, position):
+		"""Parses the name after 'defined', see '_parse_or'."""
+
+		is_wrapped = (
+			position < len(tokens) and tokens[position] == ('operator', '(')
+		)
+		if is_wrapped:
+			position += 1
+		if position >= len(tokens) or tokens[position][0] != 'word':
+			raise ValueError("The 'defined' must be followed by a name")
+		value = '1' if self.is_defined(tokens[position][1]) else '0'
+		position += 1
+		if is_wrapped:
+			if position >= len(tokens) or tokens[position] != ('operator', ')'):
+				raise ValueError("The ')' is missing")
+			position += 1
+		return (value, position)
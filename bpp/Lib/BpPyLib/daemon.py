@@ -0,0 +1,502 @@
+"""The bpp daemon, a long-running server of bpp calls.
+
+Every bpp call starts the interpreter and imports the library,
+which may take longer than the preprocessing itself.
+The daemon does it once, and keeps the files cache warm between the calls.
+The client sends it the command line and the cwd,
+and gets back the output and the exit status.
+The daemon asks the client for each environment variable the build expands,
+so the rest of the environment is never sent.
+
+It listens on a named pipe on Windows, and on a unix socket elsewhere.
+The connection is authenticated with a key from a file,
+both are in a private directory of the user (see 'get_runtime_dir').
+The client checks that the key and the socket are the user's own,
+and that nobody else can read them.
+
+This module imports the rest of the library (and 'logging', 'multiprocessing') -
+only in the daemon, or when the daemon is running,
+so the client ('send_request') starts fast.
+
+"""
+
+import codecs
+import io
+import os
+import stat
+import sys
+import time
+
+__all__ = [
+	'BppDaemon',
+	'LOCAL_PARAMS',
+	'get_daemon_address',
+	'get_runtime_dir',
+	'send_request',
+]
+
+# These params are not run by the daemon, the client runs them itself:
+# the script runs in the console of the client, the daemon does not nest,
+# the watch mode does not end.
+LOCAL_PARAMS = ('--run', '-r', '--daemon', '--watch')
+
+
+def get_runtime_dir(create=False):
+	"""Return the private directory of the daemon files of the current user.
+
+	It is 'bpp' in '$XDG_RUNTIME_DIR', or 'bpp-<uid>' in '$TMPDIR' ('/tmp').
+	On POSIX it must be a directory (not a link) of the user, with mode 0700,
+	otherwise another user could read the key or listen instead of the daemon.
+	On Windows it is 'bpp' in '%LOCALAPPDATA%', the profile of the user.
+
+	Args:
+	    create: bool -- create the directory if it does not exist
+
+	Return:
+	    value: str -- the directory path, or None if it does not exist or is not private
+
+	Raises:
+	    DaemonError -- if 'create' and the directory is not private
+
+	"""
+
+	runtime_dir = _get_runtime_path()
+	if create:
+		try:
+			os.mkdir(runtime_dir, 0o700)
+
+		except FileExistsError:
+			pass
+	if not _is_private(runtime_dir, True):
+		if create:
+			from .exceptions import DaemonError
+
+			raise DaemonError(
+				"The directory '%s' must belong to the user, with mode 0700" % (
+					runtime_dir,)
+			)
+		return None
+	return runtime_dir
+
+
+def get_daemon_address():
+	"""Return the daemon address of the current user.
+
+	Return:
+	    value: tuple -- :
+	        0 is the address (a named pipe, or a unix socket path),
+	        1 is the address family,
+	        2 is the key file path
+
+	"""
+
+	runtime_dir = _get_runtime_path()
+	key_path = os.path.join(runtime_dir, 'bpp.key')
+	if os.name == 'nt':
+		user = os.environ.get('USERNAME')
+		if not user:
+			import getpass
+			user = getpass.getuser()
+		return (r'\\.\pipe\bpp-%s' % user, 'AF_PIPE', key_path)
+	return (os.path.join(runtime_dir, 'bpp.sock'), 'AF_UNIX', key_path)
+
+
+def send_request(request):
+	"""Sends the request to the running daemon.
+
+	While the daemon runs the call, it asks for the environment variables -
+	that the build expands, they are sent one by one.
+
+	Args:
+	    request: dict -- :
+	        {'argv': list, 'cwd': str, 'encoding': str} -
+	        a bpp call, 'encoding' is the encoding of the output,
+	        or {'command': 'stop'} - stops the daemon,
+	        or {'command': 'ping'} - the daemon statistics
+
+	Return:
+	    value: dict -- :
+	        {'status': int, 'stdout': bytes, 'stderr': bytes},
+	        or None if the daemon is not running
+
+	"""
+
+	if get_runtime_dir() is None:
+		return None
+	address, family, key_path = get_daemon_address()
+	authkey = _read_key(key_path)
+	if authkey is None:
+		return None
+	if family == 'AF_UNIX' and not _is_private(address):
+		return None
+	import multiprocessing.connection
+
+	try:
+		connection = multiprocessing.connection.Client(address, family, authkey)
+
+	except (OSError, multiprocessing.AuthenticationError):
+		return None
+	with connection:
+		connection.send(request)
+		try:
+			while True:
+				response = connection.recv()
+				if response.get('command') != 'environ':
+					return response
+				connection.send(
+					_get_environ_variable(response['name'], response['nocase'])
+				)
+
+		except EOFError:
+			return None
+
+
+def _get_runtime_path():
+	"""Return the path of the runtime directory, see 'get_runtime_dir'.
+
+	'tempfile' is not imported, the client must start fast.
+
+	"""
+
+	if os.name == 'nt':
+		base_dir = os.environ.get('LOCALAPPDATA') or os.environ.get('TEMP') or '.'
+		return os.path.join(base_dir, 'bpp')
+	base_dir = os.environ.get('XDG_RUNTIME_DIR')
+	if base_dir and os.path.isdir(base_dir):
+		return os.path.join(base_dir, 'bpp')
+	base_dir = os.environ.get('TMPDIR') or '/tmp'
+	return os.path.join(base_dir, 'bpp-%s' % os.getuid())
+
+
+def _is_private(file_path, is_dir=False):
+	"""Checks that the file belongs to the user, and only the user can access it.
+
+	A link is not followed, it is not private.
+	On Windows the files are in the profile of the user, only the existence is checked.
+
+	"""
+
+	try:
+		file_stat = os.lstat(file_path)
+
+	except OSError:
+		return False
+	if is_dir != stat.S_ISDIR(file_stat.st_mode) or stat.S_ISLNK(file_stat.st_mode):
+		return False
+	if os.name == 'nt':
+		return True
+	return file_stat.st_uid == os.getuid() and not file_stat.st_mode & 0o077
+
+
+def _read_key(key_path):
+	"""Return the key of the daemon, or None if it is not found or not private."""
+
+	flags = os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0) | getattr(os, 'O_BINARY', 0)
+	try:
+		key_fd = os.open(key_path, flags)
+
+	except OSError:
+		return None
+	with os.fdopen(key_fd, 'rb') as key_file:
+		file_stat = os.fstat(key_file.fileno())
+		if not stat.S_ISREG(file_stat.st_mode):
+			return None
+		if os.name != 'nt' and (
+			file_stat.st_uid != os.getuid() or file_stat.st_mode & 0o077
+		):
+			return None
+		return key_file.read()
+
+
+def _get_environ_variable(name, nocase):
+	"""Return the environment variable the daemon asks for, or None."""
+
+	if not nocase:
+		return os.environ.get(name)
+	return dict(
+		(n.lower(), v) for n, v in os.environ.items()
+	).get(name.lower())
+
+
+class _ClientEnviron:
+	"""The environment of the client, while the daemon runs its call.
+
+	A variable is asked from the client on the first lookup,
+	so only the variables that the build expands are sent.
+	It is the 'environ' of the call (see 'EnvironCore'),
+	'os.environ' of the daemon is not changed.
+
+	Constructor:
+	    connection: multiprocessing.connection.Connection -- the client connection
+
+	"""
+
+	def __init__(self, connection):
+		self._connection = connection
+		# {(name, nocase): value or None}
+		self._variables = {}
+
+	def __repr__(self):
+		repr_text = "_ClientEnviron(variables=%s)" % len(self._variables)
+		return repr_text
+
+	def __getitem__(self, name):
+		variable_value = self._get_variable(name, False)
+		if variable_value is None:
+			raise KeyError(name)
+		return variable_value
+
+	def __contains__(self, name):
+		return self._get_variable(name, False) is not None
+
+	def get(self, name, default=None):
+		"""Return the variable, or the default if it is not defined."""
+
+		variable_value = self._get_variable(name, False)
+		return default if variable_value is None else variable_value
+
+	def get_nocase(self, name):
+		"""Return the variable (the name is not case sensitive), or None."""
+		return self._get_variable(name, True)
+
+	def _get_variable(self, name, nocase):
+		"""Asks the client for the variable, once."""
+
+		key = (name, nocase)
+		if key not in self._variables:
+			self._connection.send({'command': 'environ', 'name': name, 'nocase': nocase})
+			self._variables[key] = self._connection.recv()
+		return self._variables[key]
+
+
+class BppDaemon:
+	"""The bpp daemon.
+
+	The requests are handled one by one,
+	each in the cwd and the environment of its client.
+	The read files cache is kept between the requests,
+	a file is read again when its modification time or size changes.
+	The mapped files are not kept,
+	so the daemon does not hold the files open.
+
+	Constructor:
+	    handler: callable -- :
+	        handler(argv, cache_includer, environ) -> int,
+	        runs one bpp call and returns its exit status,
+	        the includer is the files cache to share,
+	        environ is the environment of the client, see '_ClientEnviron'
+
+	#### Example ####
+	>>> BppDaemon(bpp.execute).serve_forever()
+
+	"""
+
+	# A file changed this recently (seconds) may be changed again -
+	# with the same mtime, so it is not kept.
+	_racy_time = 2.0
+
+	def __init__(self, handler):
+		import logging
+		from .exceptions import DaemonError
+		from .includer import Includer
+		from .precommands import PreprocessorCommands
+
+		if send_request({'command': 'ping'}) is not None:
+			raise DaemonError('The bpp daemon is already running')
+		self._handler = handler
+		self._logger = logging.getLogger()
+		self._cache_includer = Includer(
+			PreprocessorCommands().com_include, os.getcwd()
+		)
+		# {real path: (mtime, size)} of the files in the cache.
+		self._file_stats = {}
+		self._is_running = False
+		self._requests_count = 0
+
+	def __repr__(self):
+		repr_text = "BppDaemon(handler=%s)" % self._handler
+		return repr_text
+
+	def serve_forever(self):
+		"""Serves the requests until the 'stop' command."""
+
+		import multiprocessing.connection
+
+		get_runtime_dir(create=True)
+		address, family, key_path = get_daemon_address()
+		authkey = os.urandom(32)
+		# The files left by a daemon that was killed, the directory is private.
+		for file_path in (key_path, address if family == 'AF_UNIX' else None):
+			if file_path is not None and os.path.lexists(file_path):
+				os.remove(file_path)
+		flags = (
+			os.O_WRONLY | os.O_CREAT | os.O_EXCL |
+			getattr(os, 'O_NOFOLLOW', 0) | getattr(os, 'O_BINARY', 0)
+		)
+		key_fd = os.open(key_path, flags, 0o600)
+		with os.fdopen(key_fd, 'wb') as key_file:
+			key_file.write(authkey)
+		listener = multiprocessing.connection.Listener(address, family, authkey=authkey)
+		if family == 'AF_UNIX':
+			os.chmod(address, 0o600)
+		self._is_running = True
+		try:
+			while self._is_running:
+				try:
+					connection = listener.accept()
+
+				except (OSError, multiprocessing.AuthenticationError):
+					continue
+				with connection:
+					self._serve_connection(connection)
+
+		finally:
+			listener.close()
+			try:
+				os.remove(key_path)
+
+			except OSError:
+				pass
+		return None
+
+	def _serve_connection(self, connection):
+		"""Serves one request of the connection."""
+
+		try:
+			request = connection.recv()
+
+		except (EOFError, OSError):
+			return None
+		if not isinstance(request, dict):
+			return None
+		command = request.get('command')
+		if command == 'stop':
+			self._is_running = False
+			response = {'status': 0, 'stdout': b'', 'stderr': b''}
+		elif command == 'ping':
+			response = {
+				'status': 0,
+				'requests': self._requests_count,
+				'cache': self._cache_includer.get_cache_stats(),
+			}
+		else:
+			response = self._run_request(request, connection)
+		try:
+			connection.send(response)
+
+		except OSError:
+			pass
+		return None
+
+	def _run_request(self, request, connection):
+		"""Runs the bpp call of the request.
+
+		Args:
+		    request: dict -- see 'send_request'
+		    connection: multiprocessing.connection.Connection -- :
+		        the client connection, the environment variables are asked on it
+
+		Return:
+		    value: dict -- :
+		        {'status': int, 'stdout': bytes, 'stderr': bytes},
+		        the status is 1 with a param of 'LOCAL_PARAMS', or a bad request
+
+		"""
+
+		self._requests_count += 1
+		# The output is written in the encoding of the client console.
+		encoding = request.get('encoding')
+		try:
+			codecs.lookup(encoding)
+
+		except (LookupError, TypeError):
+			encoding = sys.stdout.encoding
+		argv = request.get('argv')
+		if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+			argv = []
+		local_params = [param for param in argv[1:] if param in LOCAL_PARAMS]
+		error_message = None
+		if not argv or not isinstance(request.get('cwd'), str):
+			error_message = "Error: Incorrect request\n"
+		elif local_params:
+			error_message = "Error: Param '%s' is not run by the daemon\n" % (
+				local_params[0],
+			)
+		if error_message is not None:
+			return {
+				'status': 1,
+				'stdout': b'',
+				'stderr': error_message.encode(encoding, 'replace'),
+			}
+		self._invalidate_cache()
+		stdout = io.TextIOWrapper(io.BytesIO(), encoding, newline='')
+		stderr = io.TextIOWrapper(io.BytesIO(), encoding, 'replace', newline='')
+		real_stdout, real_stderr = sys.stdout, sys.stderr
+		current_dir = os.getcwd()
+		# The log handlers write to the stderr of the daemon.
+		handlers = [
+			handler for handler in self._logger.handlers
+			if hasattr(handler, 'setStream') and
+			handler.stream in (real_stdout, real_stderr)
+		]
+		streams = [handler.stream for handler in handlers]
+		sys.stdout, sys.stderr = stdout, stderr
+		for handler, stream in zip(handlers, streams):
+			handler.setStream(stderr if stream is real_stderr else stdout)
+		try:
+			os.chdir(request['cwd'])
+			status = self._handler(
+				list(argv), self._cache_includer, _ClientEnviron(connection)
+			)
+
+		except Exception:
+			stderr.write("Error: Some kind of error has occurred\n")
+			status = 1
+
+		finally:
+			sys.stdout, sys.stderr = real_stdout, real_stderr
+			for handler, stream in zip(handlers, streams):
+				handler.setStream(stream)
+			os.chdir(current_dir)
+			self._record_cache()
+		stdout.flush()
+		stderr.flush()
+		return {
+			'status': status,
+			'stdout': stdout.buffer.getvalue(),
+			'stderr': stderr.buffer.getvalue(),
+		}
+
+	def _invalidate_cache(self):
+		"""Drops the cached files that are changed since they were read."""
+
+		for real_path, file_stat in list(self._file_stats.items()):
+			if self._get_file_stat(real_path) != file_stat:
+				self._cache_includer.forget_file(real_path)
+				del self._file_stats[real_path]
+
+	def _record_cache(self):
+		"""Records the stats of the new cached files, drops the mapped ones."""
+
+		for real_path in self._cache_includer.get_cached_files(mapped=True):
+			self._cache_includer.forget_file(real_path)
+		racy_time = time.time_ns() - int(self._racy_time * 10**9)
+		for real_path in self._cache_includer.get_cached_files():
+			if real_path in self._file_stats:
+				continue
+			file_stat = self._get_file_stat(real_path)
+			if file_stat is None or file_stat[0] > racy_time:
+				self._cache_includer.forget_file(real_path)
+			else:
+				self._file_stats[real_path] = file_stat
+
+	@staticmethod
+	def _get_file_stat(file_path):
+		"""Return (mtime, size) of the file, or None if it is not found."""
+
+		try:
+			file_stat = os.stat(file_path)
+
+		except OSError:
+			return None
+		return (file_stat.st_mtime_ns, file_stat.st_size)
@@ -0,0 +1,125 @@
+"""Dependency files for build systems.
+
+A dependency file lists every file an output depends on,
+so that make/ninja-style build systems know -
+when the output needs to be preprocessed again.
+
+Two formats are supported:
+* Makefile '.d' syntax (any extension except '.json')
+* JSON with the include graph edges ('.json' extension)
+
+"""
+
+import json
+import os
+
+from .abcs import (
+	BaseBpp,
+)
+
+__all__ = [
+	'DepFile',
+]
+
+
+class DepFile(BaseBpp):
+	"""Dependency file of one output.
+
+	Constructor:
+	    target: str -- output file path (the make target)
+	    source: str -- source file path
+	    include_graph: list -- :
+	        tuples (including file, included file, environ_var).
+	        See 'Includer.get_include_graph'.
+
+	#### Example ####:
+	>>> depfile = DepFile('out.bat', 'main.bat', includer.get_include_graph())
+	>>> depfile.save('out.d')
+
+	"""
+
+	def __init__(self, target, source, include_graph):
+		self._target = os.path.abspath(target)
+		self._source = os.path.realpath(source)
+		self._include_graph = list(include_graph)
+
+	def __repr__(self):
+		repr_text = "DepFile(target=%s, source=%s)" % (
+			self._target, self._source
+		)
+		return repr_text
+
+	def get_dependencies(self):
+		"""Return all files the target depends on, without repeats."""
+
+		dependencies = [self._source]
+		for _, included_file, _ in self._include_graph:
+			if included_file not in dependencies:
+				dependencies.append(included_file)
+		return dependencies
+
+	def get_makefile(self):
+		"""Return the dependencies in Makefile '.d' syntax.
+
+		Like 'gcc -MP', an empty rule is added for every dependency,
+		so make does not fail if a file is removed.
+
+		"""
+
+		dependencies = [
+			self._escape(n) for n in self.get_dependencies()
+		]
+		lines = ['%s: \\' % self._escape(self._target)]
+		lines.extend('  %s \\' % n for n in dependencies[:-1])
+		lines.append('  %s' % dependencies[-1])
+		for dependency in dependencies[1:]:
+			lines.append('')
+			lines.append('%s:' % dependency)
+		return '\n'.join(lines) + '\n'
+
+	def get_json(self):
+		"""Return the dependencies and the include graph in JSON."""
+
+		edges = [
+			{
+				'from': including_file,
+				'to': included_file,
+				'environ': environ_var,
+			}
+			for including_file, included_file, environ_var in self._include_graph
+		]
+		value = {
+			'target': self._target,
+			'source': self._source,
+			'files': self.get_dependencies(),
+			'edges': edges,
+		}
+		return json.dumps(value, indent=1) + '\n'
+
+	def save(self, file_path):
+		"""Saves the dependency file.
+
+		The format depends on the file extension,
+		'.json' is JSON, everything else is Makefile syntax.
+		The file is only rewritten if its value changes.
+
+		Args:
+		    file_path: str -- dependency file path
+
+		Return:
+		    value: bool -- True if the file was rewritten
+
+		"""
+
+		if os.path.splitext(file_path)[-1].lower() == '.json':
+			text = self.get_json()
+		else:
+			text = self.get_makefile()
+		return self.save_if_changed(file_path, text)
+
+	@staticmethod
+	def _escape(file_path):
+		"""Escapes the path for Makefile syntax."""
+
+		file_path = file_path.replace('$', '$$').replace('#', '\\#')
+		return file_path.replace(' ', '\\ ')
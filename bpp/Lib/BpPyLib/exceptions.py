@@ -26,11 +26,36 @@ class InclusionSyntaxError(IncludeError):
 	pass
 
 
+class IncludeCycleError(IncludeError):
+	"""Raises when files include each other in a cycle."""
+	pass
+
+
+class IncludeLimitError(IncludeError):
+	"""Raises when the inclusion exceeds a limit."""
+	pass
+
+
+class ConditionalSyntaxError(PreprocessorError):
+	"""The conditional directives Syntax Error exception."""
+	pass
+
+
 class CLIError(BPPError):
 	"""Command Line Interface exception."""
 	pass
 
 
+class ProjectError(BPPError):
+	"""Raises when a project manifest or a project build is incorrect."""
+	pass
+
+
+class DaemonError(BPPError):
+	"""Raises when the bpp daemon can not be started."""
+	pass
+
+
 __all__ = [
 	n for n in globals() if not n.startswith('_')
 ]
\ No newline at end of file
@@ -14,6 +14,7 @@ Write this for more information:
 
 """
 
+import codecs
 import os
 import textwrap
 
@@ -21,20 +22,38 @@ from .abcs import (
 	BaseCommand,
 )
 from .exceptions import (
+	ConditionalSyntaxError,
 	IncludeError,
 	IncludedSourceError,
 	InclusionSyntaxError,
+	IncludeCycleError,
+	IncludeLimitError,
 )
 from .prompts import (
+	get_conditional_prompt,
 	get_include_prompt,
 )
 from .cores import (
 	IncluderCore,
+	EnvironCore,
+	ConditionalCore,
+)
+from .structures import (
+	Document,
+	MappedFile,
+)
+from .stats import (
+	BuildStats,
+)
+from .utils import (
+	get_file_encoding,
+	map_file,
 )
 
 __all__ = [
 	'Includer',
 	'include_all',
+	'async_include_all',
 	'SpecialIncluder',
 ]
 
@@ -56,12 +75,14 @@ class Includer(BaseCommand):
 	This class is not very flexible.
 	There are a lot of things you have to implement -
 	in order for everything to work as it should.
-	For example, there is no recursive 'include'.
+	For example, the 'start' method is not recursive.
 
 	Example:
 	>>> help(Includer.start)
 	There's just an example of how a -
 	recursive 'include' can be implemented.
+	>>> help(Includer.expand)
+	And this one does a recursive 'include' in one pass.
 
 	The constructor takes a 'source_file_path' parameter.
 	It's just the path to the source file.
@@ -92,6 +113,10 @@ class Includer(BaseCommand):
 	    but which has a reference to environment variables.
 	    Match example - "%somes_path%\some.bat"
 
+	Key 3 (optional):
+	    This is the include-once pragma.
+	    Match example - :#pragma once
+
 	Example:
 	>>> # import sys
 	>>> # sys.path.insert (1, <includer module path>)
@@ -101,6 +126,16 @@ class Includer(BaseCommand):
 	
 	"""
 
+	_property_names = (
+		'extensions', 'comment', 'defines', 'environ', 'limits', 'include_once',
+		'mmap', 'encoding', 'include_paths', 'prefetch', 'stats', 'use_precompiled',
+		'conditionals',
+	)
+	_conditional_kinds = frozenset((
+		'define', 'undef', 'ifdef', 'ifndef', 'if', 'elif', 'else', 'endif',
+		'conditional_error',
+	))
+
 	def __new__(cls, regexs, source_file_path):
 		error_message = "Param '%s' type is '%s', not '%s'"
 		if not isinstance(regexs, dict):
@@ -121,6 +156,57 @@ class Includer(BaseCommand):
 		self._comment_symbol = '::'
 		self._file_extensions = ('.bat', '.cmd', '.hbat', '.hb')
 		self._core = IncluderCore(regexs)
+		self._defines = {}
+		# The environment variables, None is 'os.environ'.
+		self._environ = None
+		self._environ_core = EnvironCore()
+		self._limits = {
+			'depth': 256,
+			'includes': None,
+			'output_bytes': None,
+		}
+		self._include_stack = []
+		self._include_count = 0
+		self._diagnostics = []
+		self._include_once = False
+		self._mmap = False
+		self._encoding = get_file_encoding()
+		self._include_paths = ()
+		self._prefetch = 0
+		# 'BuildStats', or None - then nothing is measured.
+		self._stats = None
+		self._use_precompiled = False
+		# {real path: the precompiled header (see 'precompile'), or None}
+		self._precompiled_files = {}
+		# The conditional directives regexs, None is off.
+		self._conditional_regexs = None
+		self._conditional_core = ConditionalCore()
+		self._conditional_diagnostics = []
+		# The prefetch pool of one 'expand', and its results.
+		self._prefetch_pool = None
+		self._prefetch_futures = {}
+		self._prefetched_files = {}
+		self._emitted_files = set()
+		self._skipped_files = []
+		# Per-run caches, the maps are keyed by real file path,
+		# the read and the expanded files by '_get_cache_key'.
+		self._read_files = {}
+		self._mapped_files = {}
+		# Files read by this includer, in order (the values are None).
+		self._dependencies = {}
+		self._expanded_files = {}
+		self._expanded_heights = {}
+		# {cache key: the count of the nested includes of the file}
+		self._expanded_includes = {}
+		self._expanded_subtrees = {}
+		# {cache key: (defines before, defines after)} of the files -
+		# whose expansion depends on the conditional directives.
+		self._expanded_defines = {}
+		self._pragma_once = set()
+		self._environ_values = {}
+		self._include_graph = []
+		self._cache_hits = 0
+		self._cache_misses = 0
 	
 	def __repr__(self):
 		repr_text = "Includer(regexs=%s, source_file_path=%s)" % (
@@ -132,13 +218,57 @@ class Includer(BaseCommand):
 		"""Set the property new value.
 		
 		The parameter 'name' for example -
-		could be 'comment' OR 'extensions'.
+		could be 'comment', 'extensions', 'defines', 'environ', 'limits',
+		'include_once', 'mmap', 'encoding', 'include_paths', 'prefetch', 'stats',
+		'use_precompiled' - OR 'conditionals'.
 
 		If name == 'extensions' then
 		    set file extensions. ( ['.bat', '.cmd','.py'] )
 		If name == 'comment' then
 		    set comment symbol. ( '//', '#', '::', ...etc ) -
 		    * the specify one option.
+		If name == 'defines' then
+		    set variables which override the environment. ( {'LIBDIR': 'lib'} )
+		If name == 'environ' then
+		    set the environment variables. ( {'LIBDIR': 'lib'} ) -
+		    * a mapping with 'get', see 'EnvironCore',
+		    * None is 'os.environ'.
+		If name == 'limits' then
+		    set the hard limits of 'expand'. ( {'depth': 64} ) -
+		    * keys: 'depth', 'includes', 'output_bytes',
+		    * 'output_bytes' counts the encoded output, as it is written,
+		    * None is unlimited.
+		If name == 'include_once' then
+		    set the include-once mode. ( True ) -
+		    * every file is included at most once per output,
+		    * as if every file had ':#pragma once'.
+		If name == 'mmap' then
+		    set the mapped reading of included files. ( True ) -
+		    * 'expand' maps the files and decodes only the directive lines,
+		    * the rest is copied to the output as raw bytes.
+		If name == 'encoding' then
+		    set the code page of mapped files. ( 'cp866' ) -
+		    * it is used for the lines that are not UTF-8.
+		If name == 'include_paths' then
+		    set the include search paths. ( ['lib', 'C:\\vendor'] ) -
+		    * a relative 'include' that is not found next to the file -
+		    * is looked for in these directories, in order.
+		If name == 'prefetch' then
+		    set the number of prefetch threads. ( 8 ) -
+		    * 'expand' reads the files included by a file in the background,
+		    * as soon as the file is tokenized, 0 is off.
+		If name == 'stats' then
+		    set the build statistics. ( BuildStats() ) -
+		    * 'expand' reports its phases and files to it, None is off.
+		If name == 'use_precompiled' then
+		    set the use of precompiled libraries. ( True ) -
+		    * an included file with an up-to-date '.bpch' file -
+		    * is taken from it, and not expanded, see 'precompile'.
+		If name == 'conditionals' then
+		    set the conditional directives regexs. ( {1: re.compile(...)} ) -
+		    * see 'ConditionalRegexs', None is off,
+		    * the dead branches and their includes are dropped,
+		    * the 'defines' property is the initial definitions.
 		
 		Args:
 		    name: str -- property name.
@@ -159,11 +289,87 @@ class Includer(BaseCommand):
 		if name == 'comment' and not isinstance(value, str):
 			errmsg = "If param name == 'comment' do the value is 'str'"
 			raise TypeError(errmsg)
-		if name in ('extensions', 'comment'):
+		if name == 'defines' and not isinstance(value, dict):
+			errmsg = "If param name == 'defines' do the value is 'dict'"
+			raise TypeError(errmsg)
+		if name == 'environ' and value is not None and not hasattr(value, 'get'):
+			errmsg = "If param name == 'environ' do the value is a mapping or None"
+			raise TypeError(errmsg)
+		if name == 'limits':
+			if not isinstance(value, dict):
+				errmsg = "If param name == 'limits' do the value is 'dict'"
+				raise TypeError(errmsg)
+			for key, limit in value.items():
+				if key not in self._limits:
+					raise ValueError("This limit '%s' - not supported" % key)
+				if limit is not None and (not isinstance(limit, int) or limit < 1):
+					raise ValueError("The limit '%s' must be a positive 'int'" % key)
+		if name == 'include_once' and not isinstance(value, bool):
+			errmsg = "If param name == 'include_once' do the value is 'bool'"
+			raise TypeError(errmsg)
+		if name == 'mmap' and not isinstance(value, bool):
+			errmsg = "If param name == 'mmap' do the value is 'bool'"
+			raise TypeError(errmsg)
+		if name == 'encoding':
+			if not isinstance(value, str):
+				errmsg = "If param name == 'encoding' do the value is 'str'"
+				raise TypeError(errmsg)
+			try:
+				codecs.lookup(value)
+
+			except LookupError:
+				raise ValueError("This encoding '%s' - not supported" % value)
+		if name == 'include_paths':
+			if not isinstance(value, (list, tuple)):
+				errmsg = "If param name == 'include_paths' do the value is 'list' or 'tuple'"
+				raise TypeError(errmsg)
+			if not all(isinstance(path, str) for path in value):
+				raise TypeError("Include paths must be 'str'")
+		if name == 'prefetch':
+			if not isinstance(value, int) or isinstance(value, bool):
+				errmsg = "If param name == 'prefetch' do the value is 'int'"
+				raise TypeError(errmsg)
+			if value < 0:
+				raise ValueError("The prefetch threads number must not be negative")
+		if name == 'stats' and not isinstance(value, (BuildStats, type(None))):
+			errmsg = "If param name == 'stats' do the value is 'BuildStats' or None"
+			raise TypeError(errmsg)
+		if name == 'use_precompiled' and not isinstance(value, bool):
+			errmsg = "If param name == 'use_precompiled' do the value is 'bool'"
+			raise TypeError(errmsg)
+		if name == 'conditionals' and not isinstance(value, (dict, type(None))):
+			errmsg = "If param name == 'conditionals' do the value is 'dict' or None"
+			raise TypeError(errmsg)
+		if name in self._property_names:
 			if name == 'extensions':
 				self._file_extensions = value
 			elif name == 'comment':
 				self._comment_symbol = value
+			elif name == 'defines':
+				self._defines = dict(value)
+				self._environ_core = EnvironCore(self._environ, self._defines)
+			elif name == 'environ':
+				self._environ = value
+				self._environ_core = EnvironCore(self._environ, self._defines)
+			elif name == 'limits':
+				self._limits.update(value)
+			elif name == 'include_once':
+				self._include_once = value
+			elif name == 'mmap':
+				self._mmap = value
+			elif name == 'encoding':
+				self._encoding = value
+			elif name == 'include_paths':
+				self._include_paths = tuple(os.path.abspath(path) for path in value)
+			elif name == 'prefetch':
+				self._prefetch = value
+			elif name == 'stats':
+				self._stats = value
+			elif name == 'use_precompiled':
+				self._use_precompiled = value
+			elif name == 'conditionals':
+				self._conditional_regexs = value
+				self._core = IncluderCore(self._regexs, value)
 		else:
 			errmsg = "This name '%s' - not supported" % name
 			raise ValueError(errmsg)
@@ -172,13 +378,37 @@ class Includer(BaseCommand):
 		"""Return property value.
 		
 		The parameter 'name' for example -
-		could be 'comment' OR 'extensions'.
+		could be 'comment', 'extensions', 'defines', 'environ', 'limits',
+		'include_once', 'mmap', 'encoding', 'include_paths', 'prefetch', 'stats',
+		'use_precompiled' - OR 'conditionals'.
 
 		If name == 'extensions' then
 		    return file extensions. ( ['.bat', '.cmd','.py'] )
 		If name == 'comment' then
 		    return comment symbol. ( '//', '#', '::', ...etc ) -
 		    * the specify one option.
+		If name == 'defines' then
+		    return variables which override the environment.
+		If name == 'environ' then
+		    return the environment variables, or None ('os.environ').
+		If name == 'limits' then
+		    return the hard limits of 'expand'.
+		If name == 'include_once' then
+		    return True if the include-once mode is on.
+		If name == 'mmap' then
+		    return True if included files are mapped.
+		If name == 'encoding' then
+		    return the code page of mapped files.
+		If name == 'include_paths' then
+		    return the include search paths.
+		If name == 'prefetch' then
+		    return the number of prefetch threads.
+		If name == 'stats' then
+		    return the build statistics, or None.
+		If name == 'use_precompiled' then
+		    return True if precompiled libraries are used.
+		If name == 'conditionals' then
+		    return the conditional directives regexs, or None.
 		
 		Args:
 		    name: str -- property name.
@@ -194,17 +424,42 @@ class Includer(BaseCommand):
 		
 		if not isinstance(name, str):
 			raise TypeError("Param name is 'str'")
-		if name in ('extensions', 'comment'):
+		if name in self._property_names:
 			if name == 'extensions':
 				return self._file_extensions
 			elif name == 'comment':
 				return self._comment_symbol
+			elif name == 'defines':
+				return dict(self._defines)
+			elif name == 'environ':
+				return self._environ
+			elif name == 'limits':
+				return dict(self._limits)
+			elif name == 'include_once':
+				return self._include_once
+			elif name == 'mmap':
+				return self._mmap
+			elif name == 'encoding':
+				return self._encoding
+			elif name == 'include_paths':
+				return list(self._include_paths)
+			elif name == 'prefetch':
+				return self._prefetch
+			elif name == 'stats':
+				return self._stats
+			elif name == 'use_precompiled':
+				return self._use_precompiled
+			elif name == 'conditionals':
+				return self._conditional_regexs
 		else:
 			errmsg = "This name '%s' - not supported" % name
 			raise ValueError(errmsg)
 
 	def read_included_file(self, file_path):
 		"""Read included file.
+
+		The file is read and absolutized only once per run,
+		next time the value is returned from the cache.
 		
 		Args:
 		    file_path: str -- file path
@@ -214,15 +469,158 @@ class Includer(BaseCommand):
 			
 		"""
 
+		cache_key = self._get_cache_key(file_path)
+		real_path = cache_key[0]
+		self._dependencies[real_path] = None
+		file_value = self._read_files.get(cache_key)
+		if file_value is not None:
+			self._cache_hits += 1
+			return file_value
+		stats = self._stats
+		if stats is not None:
+			stats.begin('read', real_path)
+		file_value = self._get_prefetched_value(cache_key)
+		if file_value is None:
+			file_value = self._load_included_file(file_path)
+		if stats is not None:
+			stats.end()
+			stats.count('files_read')
+			stats.count('bytes_read', os.path.getsize(real_path))
+		self._cache_misses += 1
+		self._read_files[cache_key] = file_value
+		return file_value
+	
+	def map_included_file(self, file_path):
+		"""Map included file into memory.
+
+		The file is not read and not decoded,
+		see 'IncluderCore.tokenize_mapped'.
+		It is mapped only once per run,
+		next time the map is returned from the cache.
+		
+		Args:
+		    file_path: str -- file path
+		
+		Return:
+		    value: mmap or bytes -- :
+		        read-only file map, an empty file is empty bytes
+			
+		"""
+
+		real_path = os.path.realpath(file_path)
+		self._dependencies[real_path] = None
+		file_map = self._mapped_files.get(real_path)
+		if file_map is not None:
+			self._cache_hits += 1
+			return file_map
+		stats = self._stats
+		if stats is not None:
+			stats.begin('read', real_path)
+		file_map = self._get_prefetched_value(self._get_cache_key(file_path))
+		if file_map is None:
+			file_map = self._load_mapped_file(file_path)
+		if stats is not None:
+			stats.end()
+			stats.count('files_read')
+			stats.count('bytes_read', len(file_map))
+		self._cache_misses += 1
+		self._mapped_files[real_path] = file_map
+		return file_map
+	
+	@staticmethod
+	def _get_cache_key(file_path):
+		"""Return the key of the file in the read and the expanded files caches.
+
+		The relative includes of a file are absolutized -
+		against the directory it is included from,
+		which is not its real directory if the file is a link,
+		so the values of one file are cached per directory.
+
+		Return:
+		    value: tuple -- (real path, absolute directory of the path)
+
+		"""
+
+		return (
+			os.path.realpath(file_path), os.path.abspath(os.path.dirname(file_path))
+		)
+	
+	def _load_included_file(self, file_path, includes_dir=None):
+		"""Reads and absolutizes the included file, without the cache.
+
+		It is called by the prefetch threads too,
+		so it does not change the includer.
+
+		Args:
+		    file_path: str -- file path
+		    includes_dir: str -- :
+		        directory of the relative includes of the file,
+		        the file directory by default
+
+		Raises:
+		    FileNotFoundError -- If the file is not found
+		    OSError -- If the file extension is not supported
+
+		"""
+
+		self._check_included_file(file_path)
+		if includes_dir is None:
+			includes_dir = os.path.dirname(file_path)
+		file_value = self.read(file_path)
+		# The prefetch threads are not measured, see 'BuildStats'.
+		stats = self._stats
+		if stats is not None:
+			stats.begin('absolutize', file_path)
+		file_value = self._core.absolutize(includes_dir, file_value)
+		if stats is not None:
+			stats.end()
+		return file_value
+	
+	def _load_mapped_file(self, file_path):
+		"""Maps the included file, without the cache.
+
+		Raises:
+		    See '_load_included_file'.
+
+		"""
+
+		self._check_included_file(file_path)
+		return map_file(file_path)
+	
+	def _check_included_file(self, file_path):
+		"""Checks that the included file exists and can be included."""
+
 		if not os.path.isfile(file_path):
 			raise FileNotFoundError('Include file not found')
 		file_ext = os.path.splitext(os.path.split(file_path)[-1])[-1]
 		if file_ext not in self._file_extensions:
 			raise OSError(
 				"File extension must be in %s" % self._file_extensions)
-		return self._core.absolutize(
-			os.path.dirname(file_path), self.read(file_path)
-		)
+	
+	def expand_environ(self, environ_var):
+		"""Expands environment variables in the path.
+
+		The expansion is done in-process, no shell is started.
+		Supports cmd (%VAR%, %VAR:~0,2%, %VAR:a=b%) -
+		and POSIX ($VAR, ${VAR}) syntaxes.
+		The 'defines' property overrides the environment.
+		
+		Args:
+		    environ_var: str -- path with environment variables
+		
+		Return:
+		    value: str -- unwrapped path
+
+		"""
+
+		stats = self._stats
+		if stats is not None:
+			stats.begin('environ')
+		variable_value = self._environ_core.expand(environ_var).strip()
+		if stats is not None:
+			stats.end()
+		self._environ_values[environ_var] = variable_value
+		return variable_value
 	
 	def read_from_environ(self, environ_var):
 		"""Read file from environment.
@@ -240,51 +638,315 @@ class Includer(BaseCommand):
 
 		"""
 		
-		variable_value = os.popen('echo %s' % environ_var).read().strip()
+		variable_value = self.expand_environ(environ_var)
 		file_value = self.read_included_file(variable_value)
 		return (file_value, variable_value)
 	
-	def syntax_analyze(self, source):
+	def get_cached_files(self, mapped=False):
+		"""Return real paths of the read (or the mapped) files in the cache."""
+
+		if mapped:
+			return list(self._mapped_files)
+		return list(dict.fromkeys(real_path for real_path, _ in self._read_files))
+	
+	def get_cache_stats(self):
+		"""Return the included files cache statistics.
+
+		Return:
+		    value: dict -- :
+		        'hits' is how many times a file was taken from the cache,
+		        'misses' is how many times a file was read from disk,
+		        'files' is the number of cached files,
+		        'skipped' is how many includes were skipped -
+		        because the file was already included once
+
+		"""
+
+		return {
+			'hits': self._cache_hits,
+			'misses': self._cache_misses,
+			'files': len(
+				set(self.get_cached_files()) | set(self._mapped_files)
+			),
+			'skipped': len(self._skipped_files),
+		}
+	
+	def get_dependencies(self):
+		"""Return real paths of all files read during inclusion."""
+		return list(self._dependencies)
+	
+	def get_environ_values(self):
+		"""Return env-based paths expanded during inclusion.
+		
+		Return:
+		    value: dict -- {path with variables: unwrapped path}
+
+		"""
+
+		return dict(self._environ_values)
+	
+	def get_skipped_files(self):
+		"""Return real paths of the includes skipped by include-once."""
+		return list(self._skipped_files)
+	
+	def get_include_graph(self):
+		"""Return the resolved include graph.
+
+		Every 'include' reached by 'expand' is an edge of the graph,
+		in the order in which they were reached.
+		
+		Return:
+		    value: list -- :
+		        tuples (including file, included file, environ_var),
+		        the files are real paths,
+		        environ_var is the path with environment variables -
+		        as it was written, or None
+
+		"""
+
+		return list(self._include_graph)
+	
+	def clear_cache(self):
+		"""Clears the included files cache and its statistics."""
+
+		self._read_files.clear()
+		# The maps are closed when the documents that use them are freed.
+		self._mapped_files.clear()
+		self._dependencies.clear()
+		self._expanded_files.clear()
+		self._expanded_heights.clear()
+		self._expanded_includes.clear()
+		self._expanded_subtrees.clear()
+		self._expanded_defines.clear()
+		self._precompiled_files.clear()
+		self._pragma_once.clear()
+		del self._skipped_files[:]
+		self._environ_values.clear()
+		del self._include_graph[:]
+		self._cache_hits = 0
+		self._cache_misses = 0
+	
+	def share_cache(self, includer):
+		"""Shares the read files cache with the other includer.
+
+		The files are read (and mapped) once for all the includers,
+		for example for all targets of a project.
+		The expanded files are not shared,
+		they depend on the properties of each includer.
+
+		Args:
+		    includer: Includer -- the includer with the cache
+		
+		Raises:
+		    TypeError -- if incorrectly params types
+
+		"""
+
+		if not isinstance(includer, Includer):
+			raise TypeError("Param 'includer' is 'Includer'")
+		self._read_files = includer._read_files
+		self._mapped_files = includer._mapped_files
+	
+	def forget_file(self, file_path):
+		"""Removes the file from the read files cache.
+
+		It must be called if the file is changed during the run,
+		for example if it is an output of a previous build.
+
+		Args:
+		    file_path: str -- file path
+
+		"""
+
+		real_path = os.path.realpath(file_path)
+		for cache_key in list(self._read_files):
+			if cache_key[0] == real_path:
+				del self._read_files[cache_key]
+		self._mapped_files.pop(real_path, None)
+	
+	def get_included_files(self, file_path):
+		"""Return the files that the file includes, without expanding them.
+
+		The file is read through the cache,
+		so the next 'expand' does not read it again.
+		The paths are found as 'expand' finds them.
+
+		Args:
+		    file_path: str -- the source file path, or an included file path
+		
+		Return:
+		    value: list -- included file paths, in the file order
+
+		"""
+
+		file_dir = os.path.dirname(file_path)
+		is_source = os.path.abspath(file_path) == os.path.abspath(
+			self._source_file_path
+		)
+		if self._mmap:
+			if is_source:
+				file_map = map_file(file_path)
+			else:
+				file_map = self.map_included_file(file_path)
+			tokens = self._core.tokenize_mapped(
+				file_map, self._encoding, not is_source
+			)
+		else:
+			if is_source:
+				file_value = self._core.absolutize(
+					file_dir, self.read(file_path).lower()
+				)
+			else:
+				file_value = self.read_included_file(file_path)
+			tokens = self._core.tokenize('\n%s\n' % file_value)
+		included_files = []
+		for token in tokens:
+			if token.path is None:
+				continue
+			if token.kind == 'environ':
+				included_files.append(self.expand_environ(token.path))
+			elif token.kind == 'include':
+				included_files.append(self._find_included_file(
+					os.path.join(file_dir, token.path), file_dir
+				))
+		return included_files
+	
+	def precompile(self, file_path):
+		"""Expands the library file as if it were included.
+
+		The result is saved as a precompiled header (see 'PrecompiledHeader'),
+		then an includer with the 'use_precompiled' property -
+		takes the expanded library from it, and does not expand it again.
+
+		Args:
+		    file_path: str -- the library file path
+		
+		Return:
+		    value: dict -- :
+		        'text' is the expanded library,
+		        'directory' is the library directory,
+		        'files' is the real paths of the read files,
+		        'environ' is the expanded env-based paths,
+		        'graph' is the include graph, see 'get_include_graph',
+		        'emitted' is the real paths of the included files,
+		        'skipped' is the files skipped by include-once in the tree,
+		        'skipped_files' is the skipped includes, see 'get_skipped_files',
+		        'pragma_once' is the files with the include-once pragma,
+		        'height' is the depth of the nested includes,
+		        'includes' is the number of the nested includes,
+		        'defines' is the definitions before and after the library -
+		        if the conditional directives change it, else None
+		
+		Raises:
+		    See 'expand'.
+
+		"""
+
+		real_path = os.path.realpath(file_path)
+		file_dir = os.path.dirname(file_path)
+		# The results of this library only, they are merged afterwards.
+		dependencies = self._dependencies
+		include_graph = self._include_graph
+		environ_values = self._environ_values
+		self._dependencies = {}
+		self._include_graph = []
+		self._environ_values = {}
+		self._include_stack = [real_path]
+		self._include_count = 0
+		self._emitted_files = {real_path}
+		self._skipped_files = []
+		self._diagnostics = []
+		self._conditional_core = ConditionalCore(self._defines)
+		self._conditional_diagnostics = []
+		try:
+			file_value = self.read_included_file(file_path)
+			document = self._expand(
+				'\n %s \n' % file_value, real_path, file_dir=file_dir
+			)
+			files = list(self._dependencies)
+			cache_key = (real_path, os.path.abspath(file_dir))
+			emitted_files, skipped_files = self._expanded_subtrees[cache_key]
+			precompiled = {
+				'text': document.join(),
+				'directory': os.path.abspath(file_dir),
+				'files': files,
+				'environ': dict(self._environ_values),
+				'graph': list(self._include_graph),
+				'emitted': sorted(emitted_files),
+				'skipped': sorted(skipped_files),
+				'skipped_files': list(self._skipped_files),
+				'pragma_once': sorted(self._pragma_once.intersection(files)),
+				'height': self._expanded_heights[cache_key],
+				'includes': self._include_count,
+				'defines': self._expanded_defines.get(cache_key),
+			}
+
+		finally:
+			self._include_stack = []
+			dependencies.update(self._dependencies)
+			include_graph.extend(self._include_graph)
+			environ_values.update(self._environ_values)
+			self._dependencies = dependencies
+			self._include_graph = include_graph
+			self._environ_values = environ_values
+		self._raise_diagnostics()
+		return precompiled
+
+	def get_precompile_options(self):
+		"""Return the properties that change a precompiled library.
+
+		A precompiled header is used only with the same properties.
+		The environment variables are checked by their expanded values,
+		and the definitions of the conditional directives by their values.
+
+		Return:
+		    value: dict -- {property name: value}, JSON compatible
+
+		"""
+
+		return {
+			'comment': self._comment_symbol,
+			'extensions': list(self._file_extensions),
+			'include_once': self._include_once,
+			'include_paths': list(self._include_paths),
+			'conditionals': self._conditional_regexs is not None,
+		}
+
+	def syntax_analyze(self, source, tokens=None, file_path=None):
 		"""The syntax analyzer for the inlcude command.
 
+		All directives are checked in one pass,
+		and all errors are raised together.
+
 		Args:
 		    source: str -- source file value
+		    tokens: list -- :
+		        'source' tokens, if they are already there.
+		        See 'IncluderTokenizer'.
+		    file_path: str -- :
+		        file path for error messages,
+		        the source file path by default
 		
 		Return:
 		    value: bool -- True, is correctly
 		
 		Raises:
-		   IncludeError -- raises if syntax incorrectly.
+		   InclusionSyntaxError -- raises if syntax incorrectly.
 		   
 		"""
 		
-		
-		error_message = textwrap.dedent("""
-			Syntax Error with 'include' command:\n
-			* %s
-			Maybe in Line - %s
-			SyntaxError - %s""")[1:]
-		com_include = self._regexs
-		bad_templates = (n for n in com_include if n < 0)
-		for n in bad_templates:
-			match = com_include[n].search(source)
-			if match is not None:
-				match = match.group().strip()
-				if com_include[n].search('\n' + match) is None:
-					continue
-				try:
-					line = source.splitlines().index(match)
-					
-				except ValueError:
-					line = -1
-				prompt = get_include_prompt(n)
-				raise InclusionSyntaxError(
-					error_message % (prompt, line, match)
-				)
-		else:
-			return True
+		if tokens is None:
+			tokens = self._core.tokenize(source)
+		if file_path is None:
+			file_path = self._source_file_path
+		diagnostics = self._get_diagnostics(
+			tokens, file_path, source.startswith('\n'), False
+		)
+		if diagnostics:
+			raise InclusionSyntaxError(self._format_diagnostics(diagnostics))
+		return True
 	
-	def not_include_source(self, source, include_expression):
+	def not_include_source(self, source, include_expression, file_path=None, line=None):
 		"""Raises exceptions due to the inclusion of itself.
 
 		You do NOT need to call this method to check -
@@ -300,6 +962,12 @@ class Includer(BaseCommand):
 		Args:
 		    source: str -- source file value
 		    include_expression: str -- for example ":#include source.bat"
+		    file_path: str -- :
+		        path of the file with the expression,
+		        the source file path by default
+		    line: int -- :
+		        line of the expression,
+		        if None, then it is found in the 'source'
 		
 		Raises:
 		    IncludedSourceError -- just raises
@@ -308,14 +976,96 @@ class Includer(BaseCommand):
 
 		error_message = textwrap.dedent("""
 			The file is trying to include itself.\n
-			Maybe in Line - %s
+			File - "%s", Line - %s
 			IncludeError - %s""")[1:]
-		try:
-			line = source.splitlines().index(include_expression)
+		if file_path is None:
+			file_path = self._source_file_path
+		if line is None:
+			offset = source.find(include_expression)
+			if offset == -1:
+				line = -1
+			else:
+				# A source wrapped with newlines starts with an empty line.
+				line = source.count('\n', 0, offset)
+				if not source.startswith('\n'):
+					line += 1
+		raise IncludedSourceError(
+			error_message % (file_path, line, include_expression.strip())
+		)
+	
+	def _get_diagnostics(self, tokens, file_path, is_wrapped, is_included):
+		"""Return the syntax errors of the tokens.
 
-		except ValueError:
-			line = -1
-		raise IncludedSourceError(error_message % (line, include_expression))
+		Args:
+		    tokens: list -- the file tokens
+		    file_path: str -- the file path
+		    is_wrapped: bool -- the file value starts with a newline
+		    is_included: bool -- :
+		        the file value is wrapped as an included one,
+		        its first line starts with a space
+
+		Return:
+		    value: list -- tuples (file_path, line, column, key, expression)
+
+		"""
+
+		diagnostics = []
+		for token in tokens:
+			if token.kind != 'error':
+				continue
+			line, column = self._get_location(token, is_wrapped, is_included)
+			diagnostics.append(
+				(file_path, line, column, token.key, token.text)
+			)
+		return diagnostics
+
+	@staticmethod
+	def _get_location(token, is_wrapped, is_included):
+		"""Return (line, column) of the token in the original file."""
+
+		line, column = token.line, token.column
+		if is_wrapped:
+			line -= 1
+		if is_included and line == 1:
+			column -= 1
+		return (line, column)
+
+	@staticmethod
+	def _format_diagnostics(diagnostics, is_conditional=False):
+		"""Return the error message of all syntax errors.
+
+		Args:
+		    diagnostics: list -- see '_get_diagnostics'
+		    is_conditional: bool -- :
+		        the errors of the conditional directives,
+		        see '_add_conditional_diagnostic'
+
+		Return:
+		    value: str -- error message
+
+		"""
+
+		error_message = textwrap.dedent("""
+			* %s
+			  File - "%s", Line - %s, Column - %s
+			  SyntaxError - %s""")[1:]
+		if is_conditional:
+			title, get_prompt = 'conditional directives', get_conditional_prompt
+		else:
+			title, get_prompt = "'include' command", get_include_prompt
+		messages = [
+			"Syntax Error with %s (%s %s):" % (
+				title, len(diagnostics),
+				'error' if len(diagnostics) == 1 else 'errors',
+			)
+		]
+		for file_path, line, column, key, expression in diagnostics:
+			messages.append(
+				error_message % (
+					get_prompt(key), file_path, line, column, expression
+				)
+			)
+		return '\n\n'.join(messages)
 	
 	def start(self, source):
 		"""Performs inclusion.
@@ -335,6 +1085,8 @@ class Includer(BaseCommand):
 		...     else:
 		...         break
 		------------------------------
+		But it rescans the whole document on every call,
+		so it is better to use the 'expand' method.
 
 		Args:
 		    source: str -- source file value
@@ -350,52 +1102,1025 @@ class Includer(BaseCommand):
 		
 		# analyze
 		self.syntax_analyze(source)
-		after_replacement = (
-			'%s ' % self._comment_symbol + 'File - "%s"\n' +\
-			'%s%s(\n\n' % (self._comment_symbol, '-'*30)
-		)
-		before_replacement = (
-			'\n\n%s%s)\n' % (self._comment_symbol, '-'*30)
-		)
+		after_replacement, before_replacement = self._get_banners()
 		error_message = "Syntax Error from 'include' command"
-		com_include = self._regexs
 		source_includes = self._core.absolutize(
 			os.path.dirname(self._source_file_path),
 			source,
 		)
-		for m2 in com_include[2].finditer(source):
-			m2 = m2.group()
-			included_file = com_include[21].search(m2)
-			if included_file is not None:
-				included_file = included_file.group()[1:-1].strip()
-				included_file_value, variable_value = self.read_from_environ(included_file)
-				if os.path.abspath(variable_value) == self._source_file_path:
-					self.not_include_source(source, m2)
-				included_value = '%s %s %s' % (
-					after_replacement % os.path.split(variable_value)[-1],
-					included_file_value,
-					before_replacement,
-				)
-				source_includes = source_includes.replace(m2, included_value)
-			else:
+		document = Document()
+		position = 0
+		for token in self._core.tokenize(source_includes):
+			if token.kind not in ('include', 'environ'):
+				continue
+			if token.path is None:
 				raise IncludeError(error_message)
-		for m1 in com_include[1].finditer(source_includes):
-			m1 = m1.group()
-			included_file = com_include[11].search(m1)
-			if included_file is not None:
-				included_file = included_file.group()[1:-1].strip()
+			if token.kind == 'environ':
+				included_file_value, included_file = self.read_from_environ(token.path)
+				if os.path.abspath(included_file) == self._source_file_path:
+					self.not_include_source(source, token.text)
+			else:
+				included_file = token.path
 				if os.path.abspath(included_file) == self._source_file_path:
-					self.not_include_source(source, m1)
+					self.not_include_source(source, token.text)
 				included_file_value = self.read_included_file(included_file)
-				included_value = '%s %s %s' % (
-					after_replacement % os.path.split(included_file)[-1],
-					included_file_value,
-					before_replacement,
+			document.append(source_includes[position:token.start])
+			document.append(after_replacement % os.path.split(included_file)[-1])
+			document.append(' %s ' % included_file_value)
+			document.append(before_replacement)
+			position = token.end
+		document.append(source_includes[position:])
+		return document.join()
+
+	def expand(self, source):
+		"""Performs recursive inclusion in one pass.
+
+		Each included file is read and expanded once,
+		at the moment its 'include' is reached (depth-first).
+		So the cost depends on the size of the result,
+		and not on the depth of the inclusions.
+
+		The result is the same as calling 'start'
+		until the source stops changing.
+
+		Args:
+		    source: str -- source file value
+		
+		Return:
+		    value: str -- source after all includes on
+		
+		Raises:
+		    IncludeError -- raises if syntax incorrectly.
+		    IncludedSourceError -- raises if includes itself.
+		    IncludeCycleError -- raises if files include each other.
+		    IncludeLimitError -- raises if a limit is exceeded.
+
+		"""
+
+		return self.expand_document(source).join()
+
+	def expand_document(self, source, trim=False):
+		"""Performs recursive inclusion, see 'expand'.
+
+		The result is a 'Document' - a rope of segments,
+		it is not joined into one string.
+		An included file is one shared segment,
+		however many times it is included.
+
+		Args:
+		    source: str -- source file value
+		    trim: bool -- :
+		        drop the first and the last characters of the source,
+		        the newlines it is wrapped with
+		
+		Return:
+		    value: Document -- source after all includes on
+		
+		Raises:
+		    See 'expand'.
+
+		"""
+
+		stats = self._stats
+		if stats is not None:
+			stats.begin('absolutize', self._source_file_path)
+		source = self._core.absolutize(
+			os.path.dirname(self._source_file_path),
+			source,
+		)
+		if stats is not None:
+			stats.end()
+		return self._expand_source(
+			source, trim, file_dir=os.path.dirname(self._source_file_path)
+		)
+
+	def expand_mapped_document(self, buffer):
+		"""Performs recursive inclusion of the mapped source, see 'expand'.
+
+		The source is not decoded and not lowercased,
+		only its directive lines are (see 'IncluderCore.tokenize_mapped').
+		The included files are mapped too, as with the 'mmap' property.
+		So the result matches the files byte for byte -
+		outside the expanded directives.
+
+		Args:
+		    buffer: mmap or bytes -- source file value
+		
+		Return:
+		    value: Document -- source after all includes on
+		
+		Raises:
+		    See 'expand'.
+
+		"""
+
+		stats = self._stats
+		if stats is not None:
+			stats.begin('syntax_analyze', self._source_file_path)
+		tokens = self._core.tokenize_mapped(buffer, self._encoding, False)
+		if stats is not None:
+			stats.end()
+		return self._expand_source(
+			MappedFile(buffer, False), False,
+			tokens, os.path.dirname(self._source_file_path),
+		)
+
+	async def aexpand_document(self, source, trim=False, executor=None):
+		"""Performs recursive inclusion without blocking the event loop.
+
+		The async counterpart of 'expand_document'.
+		The include tree is resolved and read in the 'executor' first,
+		many files at once, and the coroutine can be cancelled -
+		(or timed out, see 'asyncio.wait_for') between the reads.
+		Then the files are expanded in the 'executor', with no disk access.
+		The expansion cannot be interrupted, if it is cancelled then,
+		it runs to the end in its thread (the result is dropped),
+		and the includer must not be used until that thread ends.
+		
+		Args:
+		    source: str -- source file value
+		    trim: bool -- see 'expand_document'
+		    executor: concurrent.futures.Executor -- :
+		        the pool of the blocking work,
+		        many builds can share one bounded pool,
+		        the loop default executor if None
+		
+		Return:
+		    value: Document -- source after all includes on
+		
+		Raises:
+		    See 'expand'.
+
+		#### Example ####
+		>>> pool = concurrent.futures.ThreadPoolExecutor(8)
+		>>> document = await asyncio.wait_for(
+		...     includer.aexpand_document(source, executor=pool), 10
+		... )
+
+		"""
+
+		import asyncio
+
+		loop = asyncio.get_running_loop()
+		file_dir = os.path.dirname(self._source_file_path)
+		source = await loop.run_in_executor(
+			executor, self._core.absolutize, file_dir, source
+		)
+		tokens = await loop.run_in_executor(
+			executor, self._core.tokenize, source
+		)
+		await self._aprefetch_tree(tokens, file_dir, False, executor)
+		return await self._aexpand_source(
+			executor, source, trim, None, file_dir
+		)
+
+	async def aexpand_mapped_document(self, buffer, executor=None):
+		"""Performs recursive inclusion of the mapped source, asynchronously.
+
+		See 'expand_mapped_document' and 'aexpand_document'.
+
+		"""
+
+		import asyncio
+
+		loop = asyncio.get_running_loop()
+		file_dir = os.path.dirname(self._source_file_path)
+		tokens = await loop.run_in_executor(
+			executor, self._core.tokenize_mapped, buffer, self._encoding, False
+		)
+		await self._aprefetch_tree(tokens, file_dir, True, executor)
+		return await self._aexpand_source(
+			executor, MappedFile(buffer, False), False, tokens, file_dir
+		)
+
+	async def _aexpand_source(self, executor, *args):
+		"""Runs '_expand_source' in the executor.
+
+		A running expansion cannot be interrupted,
+		if the coroutine is cancelled, it runs to the end in its thread,
+		and '_expand_source' drops the prefetched results itself.
+		Only if it is cancelled before the expansion starts -
+		the expansion does not start, and the results are dropped here.
+
+		Args:
+		    executor: concurrent.futures.Executor -- the pool, or None
+		    args: tuple -- the args of '_expand_source'
+
+		"""
+
+		import asyncio
+		import threading
+
+		lock = threading.Lock()
+		is_started = False
+		is_cancelled = False
+
+		def expand_source():
+			nonlocal is_started
+			with lock:
+				if is_cancelled:
+					return None
+				is_started = True
+			return self._expand_source(*args)
+
+		loop = asyncio.get_running_loop()
+		try:
+			return await loop.run_in_executor(executor, expand_source)
+
+		except asyncio.CancelledError:
+			with lock:
+				is_cancelled = True
+				if not is_started:
+					self._stop_prefetch()
+			raise
+
+	def _expand_source(self, source, trim, tokens=None, file_dir=None):
+		"""Expands the source file, see '_expand'.
+
+		Raises:
+		    See 'expand'.
+
+		"""
+
+		file_path = os.path.realpath(self._source_file_path)
+		self._include_stack = [file_path]
+		self._include_count = 0
+		self._emitted_files = set()
+		self._skipped_files = []
+		self._diagnostics = []
+		self._conditional_core = ConditionalCore(self._defines)
+		self._conditional_diagnostics = []
+		if self._prefetch:
+			import concurrent.futures
+
+			self._prefetch_pool = concurrent.futures.ThreadPoolExecutor(
+				self._prefetch
+			)
+		try:
+			expanded = self._expand(
+				source, file_path, False, trim, tokens, file_dir
+			)
+
+		finally:
+			self._include_stack = []
+			self._stop_prefetch()
+		self._raise_diagnostics()
+		return expanded
+
+	def _expand(self, source, file_path, is_included=True, trim=True,
+			tokens=None, file_dir=None):
+		"""Expands all inclusions of the 'source' recursively.
+
+		Paths in 'source' must already be absolutized,
+		except for a mapped file.
+		Syntax errors are collected, and not raised.
+
+		Args:
+		    source: str or MappedFile -- file value
+		    file_path: str -- real path of the file
+		    is_included: bool -- it is an included file, not the source
+		    trim: bool -- drop the wrapping newlines of the source
+		    tokens: list -- :
+		        tokens of a mapped file (see 'IncluderCore.tokenize_mapped'),
+		        then the 'source' is 'MappedFile'
+		    file_dir: str -- :
+		        directory of the file, for the include search paths,
+		        and for relative paths of a mapped file
+		
+		Return:
+		    value: Document -- file value after all includes on
+
+		"""
+
+		stats = self._stats
+		if stats is not None:
+			stats.begin('file', file_path)
+			stats.begin('syntax_analyze', file_path)
+		# See '_get_cache_key'.
+		cache_key = (
+			file_path, None if file_dir is None else os.path.abspath(file_dir)
+		)
+		is_mapped = tokens is not None
+		if not is_mapped:
+			tokens = self._core.tokenize(source)
+		self._diagnostics.extend(
+			self._get_diagnostics(tokens, file_path, not is_mapped, is_included)
+		)
+		if stats is not None:
+			stats.end()
+		if self._prefetch_pool is not None:
+			self._prefetch_included_files(tokens, file_dir, is_mapped)
+		after_replacement, before_replacement = self._get_banners()
+		skipped_replacement = '%s File - "%%s" (already included)' % (
+			self._comment_symbol,
+		)
+		error_message = "Syntax Error from 'include' command"
+		max_output = self._limits['output_bytes']
+		# The output is counted in bytes, as it is written.
+		output_encoding = self._encoding if self._mmap else None
+		include_count = self._include_count
+		document = Document()
+		position = 1 if trim else 0
+		height = 0
+		emitted_files = set()
+		skipped_files = set()
+		# The text of the dead branches (and their includes) is dropped.
+		conditions = []
+		is_live = True
+		is_conditional = False
+		entry_defines = self._conditional_core.get_state()
+		for token in tokens:
+			if token.kind in self._conditional_kinds:
+				if is_live:
+					document.append(source[position:token.start])
+				position = token.end
+				is_conditional = True
+				is_live = self._apply_conditional(
+					token, conditions, is_live,
+					(source, file_path, is_mapped, is_included),
 				)
-				source_includes = source_includes.replace(m1, included_value)
-			else:
+				continue
+			if not is_live:
+				continue
+			if token.kind == 'pragma':
+				self._pragma_once.add(file_path)
+				document.append(source[position:token.start])
+				position = token.end
+				continue
+			if token.kind not in ('include', 'environ'):
+				continue
+			if token.path is None:
 				raise IncludeError(error_message)
-		return source_includes
+			if stats is not None:
+				stats.count('includes')
+			expression = token.text
+			environ_var = None
+			if token.kind == 'environ':
+				environ_var = token.path
+				included_file = self._get_prefetched_file(
+					self.expand_environ(environ_var), None
+				)
+			else:
+				included_file = token.path
+				if is_mapped:
+					included_file = os.path.join(file_dir, included_file)
+				included_file = self._get_prefetched_file(included_file, file_dir)
+			if os.path.abspath(included_file) == self._source_file_path:
+				if is_mapped:
+					token.line = source.count_lines(token.start)
+				line = self._get_location(token, not is_mapped, is_included)[0]
+				self.not_include_source(source, expression, file_path, line)
+			real_path = os.path.realpath(included_file)
+			self._include_graph.append((file_path, real_path, environ_var))
+			document.append(source[position:token.start])
+			position = token.end
+			if real_path in self._emitted_files and self._is_once(real_path):
+				self._skipped_files.append(real_path)
+				skipped_files.add(real_path)
+				document.append(skipped_replacement % os.path.split(included_file)[-1])
+				continue
+			included_key = self._get_cache_key(included_file)
+			self._check_include(real_path, included_key)
+			self._emitted_files.add(real_path)
+			included_value = self._get_expanded_file(included_key)
+			if included_value is None and self._use_precompiled:
+				if not (self._mmap or is_mapped):
+					included_value = self._get_precompiled_file(
+						included_file, included_key
+					)
+			if included_value is not None:
+				self._cache_hits += 1
+			else:
+				self._include_stack.append(real_path)
+				if self._mmap or is_mapped:
+					included_value = self._expand_mapped(included_file, real_path)
+				else:
+					included_file_value = self.read_included_file(included_file)
+					# The included value is wrapped as 'start' would insert it,
+					# so the nested 'include' lines look the same to the regexs.
+					included_value = self._expand(
+						'\n %s \n' % included_file_value, real_path,
+						file_dir=os.path.dirname(included_file),
+					)
+				self._include_stack.pop()
+				self._expanded_files[included_key] = included_value
+			height = max(height, self._expanded_heights[included_key] + 1)
+			emitted_files.add(real_path)
+			emitted_files.update(self._expanded_subtrees[included_key][0])
+			skipped_files.update(self._expanded_subtrees[included_key][1])
+			if included_key in self._expanded_defines:
+				is_conditional = True
+			document.append(after_replacement % os.path.split(included_file)[-1])
+			document.append(included_value)
+			document.append(before_replacement)
+			if max_output is not None and (
+				document.get_byte_size(output_encoding) > max_output
+			):
+				raise IncludeLimitError(
+					"The output is larger than %s bytes" % max_output
+				)
+		for condition in conditions:
+			self._add_conditional_diagnostic(
+				condition[2], -6, (source, file_path, is_mapped, is_included)
+			)
+		if is_live:
+			document.append(source[position:len(source) - 1 if trim else None])
+		if max_output is not None and (
+			document.get_byte_size(output_encoding) > max_output
+		):
+			raise IncludeLimitError(
+				"The output is larger than %s bytes" % max_output
+			)
+		if is_conditional:
+			self._expanded_defines[cache_key] = (
+				entry_defines, self._conditional_core.get_state()
+			)
+		else:
+			self._expanded_defines.pop(cache_key, None)
+		self._expanded_heights[cache_key] = height
+		self._expanded_includes[cache_key] = self._include_count - include_count
+		self._expanded_subtrees[cache_key] = (
+			frozenset(emitted_files), frozenset(skipped_files)
+		)
+		if stats is not None:
+			stats.end()
+		return document
+
+	def _apply_conditional(self, token, conditions, is_live, location):
+		"""Applies the conditional directive, see '_expand'.
+
+		The directives of a dead branch are not evaluated,
+		its ':#define' and ':#undef' are ignored.
+
+		Args:
+		    token: DirectiveToken -- the directive
+		    conditions: list -- :
+		        the open ':#if' blocks of the file, lists -
+		        [a branch is taken, has ':#else', the token, the block is live]
+		    is_live: bool -- the text before the directive is live
+		    location: tuple -- see '_add_conditional_diagnostic'
+		
+		Return:
+		    value: bool -- True if the text after the directive is live
+
+		"""
+
+		kind = token.kind
+		conditional_core = self._conditional_core
+		if kind == 'conditional_error':
+			self._add_conditional_diagnostic(token, token.key, location)
+			return is_live
+		if kind in ('define', 'undef'):
+			if is_live and kind == 'define':
+				conditional_core.define(token.name, token.value)
+			elif is_live:
+				conditional_core.undef(token.name)
+			return is_live
+		if kind in ('if', 'ifdef', 'ifndef'):
+			is_true = False
+			if is_live and kind == 'if':
+				is_true = self._evaluate_condition(token, location)
+			elif is_live:
+				is_true = conditional_core.is_defined(token.name) == (kind == 'ifdef')
+			conditions.append([is_true, False, token, is_live])
+			return is_true
+		if not conditions:
+			self._add_conditional_diagnostic(token, -5, location)
+			return is_live
+		condition = conditions[-1]
+		is_taken, has_else, _, is_block_live = condition
+		if kind == 'endif':
+			conditions.pop()
+			return is_block_live
+		if has_else:
+			self._add_conditional_diagnostic(token, -7, location)
+			return False
+		is_true = is_block_live and not is_taken
+		if kind == 'else':
+			condition[1] = True
+		elif is_true:
+			is_true = self._evaluate_condition(token, location)
+		condition[0] = is_taken or is_true
+		return is_true
+
+	def _evaluate_condition(self, token, location):
+		"""Return the value of the ':#if' (or ':#elif') expression.
+
+		An incorrect expression is a syntax error, and it is false.
+
+		"""
+
+		try:
+			return self._conditional_core.evaluate(token.value)
+
+		except ValueError as ex:
+			self._add_conditional_diagnostic(
+				token, -8, location, '%s (%s)' % (token.text, ex)
+			)
+			return False
+
+	def _add_conditional_diagnostic(self, token, key, location, expression=None):
+		"""Adds the syntax error of the conditional directive.
+
+		Args:
+		    token: DirectiveToken -- the directive
+		    key: int -- the error key, see 'get_conditional_prompt'
+		    location: tuple -- :
+		        (file value, file path, is mapped, is included),
+		        see '_expand'
+		    expression: str -- the error expression, the token text by default
+
+		"""
+
+		source, file_path, is_mapped, is_included = location
+		if token.line is None:
+			token.line = source.count_lines(token.start)
+		line, column = self._get_location(token, not is_mapped, is_included)
+		self._conditional_diagnostics.append(
+			(file_path, line, column, key, expression or token.text)
+		)
+
+	def _raise_diagnostics(self):
+		"""Raises the syntax errors collected by the expansion.
+
+		Raises:
+		    InclusionSyntaxError -- if there are 'include' syntax errors.
+		    ConditionalSyntaxError -- if there are conditional syntax errors.
+
+		"""
+
+		if self._diagnostics:
+			raise InclusionSyntaxError(
+				self._format_diagnostics(self._diagnostics)
+			)
+		if self._conditional_diagnostics:
+			raise ConditionalSyntaxError(
+				self._format_diagnostics(self._conditional_diagnostics, True)
+			)
+
+	def _expand_mapped(self, included_file, real_path):
+		"""Expands the mapped included file, see '_expand'.
+
+		The text between the directives is not decoded,
+		it is a 'memoryview' of the file map, see 'MappedFile'.
+
+		Args:
+		    included_file: str -- file path
+		    real_path: str -- real path of the file
+		
+		Return:
+		    value: Document -- file value after all includes on
+
+		"""
+
+		file_map = self.map_included_file(included_file)
+		stats = self._stats
+		if stats is not None:
+			stats.begin('syntax_analyze', real_path)
+		tokens = self._core.tokenize_mapped(file_map, self._encoding)
+		if stats is not None:
+			stats.end()
+		return self._expand(
+			MappedFile(file_map), real_path, True, False,
+			tokens, os.path.dirname(included_file),
+		)
+
+	def _prefetch_included_files(self, tokens, file_dir, is_mapped):
+		"""Starts reading the files included by the tokens in the background.
+
+		The paths are resolved as '_expand' resolves them,
+		but absolutized here, so the threads do not depend on the cwd.
+		'_get_prefetched_file' takes the results in the '_expand' order,
+		so the errors are raised where they would be raised without it.
+
+		Args:
+		    tokens: list -- the file tokens
+		    file_dir: str -- directory of the file
+		    is_mapped: bool -- the file is mapped, see '_expand'
+
+		"""
+
+		for key, args in self._get_prefetch_jobs(tokens, file_dir, is_mapped):
+			self._prefetch_futures[key] = self._prefetch_pool.submit(
+				self._prefetch_file, *args
+			)
+
+	def _get_prefetch_jobs(self, tokens, file_dir, is_mapped):
+		"""Yields the included files of the tokens that are not prefetched.
+
+		The includes inside the conditional blocks are not prefetched,
+		their branches may be dead.
+
+		Args:
+		    See '_prefetch_included_files'.
+
+		Yields:
+		    value: tuple -- :
+		        0 is the key of '_get_prefetched_file',
+		        1 is the args of '_prefetch_file'
+
+		"""
+
+		depth = 0
+		for token in tokens:
+			if token.kind in ('if', 'ifdef', 'ifndef'):
+				depth += 1
+			elif token.kind == 'endif':
+				depth = max(depth - 1, 0)
+			if token.kind not in ('include', 'environ') or token.path is None:
+				continue
+			# The includes of the conditional blocks may be dead.
+			if depth:
+				continue
+			if token.kind == 'environ':
+				try:
+					included_file = self._environ_core.expand(token.path).strip()
+
+				except Exception:
+					# '_expand' raises it in its turn.
+					continue
+				search_dir = None
+			else:
+				included_file = token.path
+				if is_mapped:
+					included_file = os.path.join(file_dir, included_file)
+				search_dir = file_dir
+			key = (included_file, search_dir)
+			if key in self._prefetch_futures:
+				continue
+			yield (key, (
+				included_file,
+				os.path.abspath(included_file),
+				None if search_dir is None else os.path.abspath(search_dir),
+				self._mmap or is_mapped,
+			))
+
+	def _prefetch_file(self, included_file, file_path, file_dir, is_mapped):
+		"""Resolves and reads the included file, in a prefetch thread.
+
+		Args:
+		    included_file: str -- the path next to the including file
+		    file_path: str -- the same path, absolutized
+		    file_dir: str -- absolute directory of the including file, or None
+		    is_mapped: bool -- map the file instead of reading it
+
+		Return:
+		    value: tuple -- :
+		        0 is the found path, or None if it is 'included_file',
+		        1 is the cache key, see '_get_cache_key',
+		        2 is the file value (or the error), or None if it is cached
+
+		"""
+
+		found_file = self._find_included_file(file_path, file_dir)
+		cache_key = self._get_cache_key(found_file)
+		if found_file == file_path:
+			found_file = None
+		if is_mapped:
+			is_cached = cache_key[0] in self._mapped_files
+		else:
+			is_cached = cache_key in self._read_files
+		if is_cached:
+			return (found_file, cache_key, None)
+		# The includes of the file are absolutized as '_expand' would do it.
+		includes_dir = os.path.dirname(found_file or included_file)
+		try:
+			if is_mapped:
+				file_value = self._load_mapped_file(found_file or file_path)
+			else:
+				file_value = self._load_included_file(
+					found_file or file_path, includes_dir
+				)
+
+		except Exception as ex:
+			file_value = ex
+		return (found_file, cache_key, file_value)
+
+	def _get_prefetched_file(self, included_file, file_dir):
+		"""Return the included file path, see '_find_included_file'.
+
+		If the file is prefetched, waits for it,
+		and keeps its value for 'read_included_file' (or 'map_included_file').
+
+		"""
+
+		future = self._prefetch_futures.pop((included_file, file_dir), None)
+		if future is None or future.cancelled():
+			return self._find_included_file(included_file, file_dir)
+		stats = self._stats
+		if stats is not None:
+			stats.begin('read', included_file)
+		found_file, cache_key, file_value = future.result()
+		if stats is not None:
+			stats.end()
+		if file_value is not None:
+			self._prefetched_files[cache_key] = file_value
+		if found_file is None:
+			return included_file
+		return found_file
+
+	def _get_prefetched_value(self, cache_key):
+		"""Return the prefetched value of the file, or None.
+
+		Args:
+		    cache_key: tuple -- the key of the file, see '_get_cache_key'
+
+		Raises:
+		    Exception -- the error of the prefetch, see '_load_included_file'
+
+		"""
+
+		file_value = self._prefetched_files.pop(cache_key, None)
+		if isinstance(file_value, Exception):
+			raise file_value
+		return file_value
+
+	async def _aprefetch_tree(self, tokens, file_dir, is_mapped, executor):
+		"""Resolves and reads the whole include tree in the executor.
+
+		The files of one level of the tree are read at the same time.
+		The results are kept as done prefetch futures,
+		so '_expand' takes them as if they were prefetched by threads.
+		If the coroutine is cancelled, the results are dropped.
+
+		Args:
+		    tokens: list -- the source tokens
+		    file_dir: str -- directory of the source
+		    is_mapped: bool -- the source is mapped
+		    executor: concurrent.futures.Executor -- the pool, or None
+
+		"""
+
+		import asyncio
+		import concurrent.futures
+
+		loop = asyncio.get_running_loop()
+		is_mapped = self._mmap or is_mapped
+		files = [(tokens, file_dir)]
+		seen = set()
+		try:
+			while files:
+				jobs = []
+				for tokens, file_dir in files:
+					for key, args in self._get_prefetch_jobs(tokens, file_dir, is_mapped):
+						future = concurrent.futures.Future()
+						self._prefetch_futures[key] = future
+						jobs.append((future, loop.run_in_executor(
+							executor, self._prefetch_tree_file, *args
+						)))
+				results = await asyncio.gather(*[job for _, job in jobs])
+				files = []
+				for (future, _), (result, tokens, includes_dir) in zip(jobs, results):
+					future.set_result(result)
+					if tokens is not None and (result[1], includes_dir) not in seen:
+						seen.add((result[1], includes_dir))
+						files.append((tokens, includes_dir))
+
+		except BaseException:
+			self._stop_prefetch()
+			raise
+
+	def _prefetch_tree_file(self, included_file, file_path, file_dir, is_mapped):
+		"""Prefetches the included file, and tokenizes it, in the executor.
+
+		Args:
+		    See '_prefetch_file'.
+
+		Return:
+		    value: tuple -- :
+		        0 is the result of '_prefetch_file',
+		        1 is the file tokens, or None if it is not read,
+		        2 is the directory of its includes
+
+		"""
+
+		result = self._prefetch_file(included_file, file_path, file_dir, is_mapped)
+		found_file, cache_key, file_value = result
+		if file_value is None:
+			if is_mapped:
+				file_value = self._mapped_files.get(cache_key[0])
+			else:
+				file_value = self._read_files.get(cache_key)
+		if file_value is None or isinstance(file_value, Exception):
+			return (result, None, None)
+		if is_mapped:
+			tokens = self._core.tokenize_mapped(file_value, self._encoding)
+		else:
+			tokens = self._core.tokenize('\n %s \n' % file_value)
+		return (result, tokens, os.path.dirname(found_file or included_file))
+
+	def _stop_prefetch(self):
+		"""Stops the prefetch threads, and drops their results."""
+
+		# An async expansion can be cancelled while it runs in a thread.
+		for future in list(self._prefetch_futures.values()):
+			future.cancel()
+		if self._prefetch_pool is not None:
+			self._prefetch_pool.shutdown()
+			self._prefetch_pool = None
+		self._prefetch_futures.clear()
+		self._prefetched_files.clear()
+		return None
+
+	def _find_included_file(self, included_file, file_dir):
+		"""Return the included file path, using the include search paths.
+
+		A relative 'include' is looked for next to the including file,
+		and then in the include search paths, in order.
+
+		Args:
+		    included_file: str -- the path next to the including file
+		    file_dir: str -- directory of the including file
+		
+		Return:
+		    value: str -- the found path, or 'included_file'
+
+		"""
+
+		if not self._include_paths or file_dir is None:
+			return included_file
+		if os.path.isfile(included_file):
+			return included_file
+		try:
+			relative_path = os.path.relpath(included_file, file_dir)
+
+		except ValueError:
+			return included_file
+		for include_path in self._include_paths:
+			found_file = os.path.join(include_path, relative_path)
+			if os.path.isfile(found_file):
+				return found_file
+		return included_file
+
+	def _is_once(self, real_path):
+		"""Checks if the file can be included only once per output."""
+		return self._include_once or real_path in self._pragma_once
+
+	def _get_expanded_file(self, cache_key):
+		"""Return the cached expanded value of the file.
+
+		With include-once files, an expanded value depends on -
+		what was already included before it,
+		and with the conditional directives - on the definitions.
+		So the value is returned only if it is still the same,
+		and if its nested includes do not exceed the 'includes' limit.
+
+		Args:
+		    cache_key: tuple -- the key of the file, see '_get_cache_key'
+		
+		Return:
+		    value: str -- expanded file value, or None
+
+		"""
+
+		included_value = self._expanded_files.get(cache_key)
+		if included_value is None:
+			return None
+		defines = self._expanded_defines.get(cache_key)
+		if defines is not None and defines[0] != self._conditional_core.get_state():
+			return None
+		emitted_files, skipped_files = self._expanded_subtrees[cache_key]
+		if not skipped_files <= self._emitted_files:
+			return None
+		for emitted_file in emitted_files:
+			if emitted_file in self._emitted_files and self._is_once(emitted_file):
+				return None
+		# The nested includes are counted as if the file was expanded,
+		# over the limit it is expanded, so that the error is raised.
+		max_includes = self._limits['includes']
+		include_count = self._include_count + self._expanded_includes[cache_key]
+		if max_includes is not None and include_count > max_includes:
+			return None
+		self._include_count = include_count
+		self._emitted_files.update(emitted_files)
+		if defines is not None:
+			self._conditional_core.set_state(defines[1])
+		return included_value
+
+	def _get_precompiled_file(self, included_file, cache_key):
+		"""Return the expanded file from its precompiled header.
+
+		The header is used only if the expansion would give the same value:
+		none of its files is being included (or is the source),
+		none of its include-once files is already included,
+		the definitions of the conditional directives are the same,
+		and the limits are not exceeded (else '_expand' raises the error).
+		Then its files and includes are registered, as if it was expanded.
+
+		Args:
+		    included_file: str -- file path
+		    cache_key: tuple -- the key of the file, see '_get_cache_key'
+		
+		Return:
+		    value: str -- expanded file value, or None
+
+		"""
+
+		real_path = cache_key[0]
+		if real_path not in self._precompiled_files:
+			from .precompiled import PrecompiledHeader
+
+			self._precompiled_files[real_path] = PrecompiledHeader(real_path).load(
+				self.get_precompile_options(), self.expand_environ
+			)
+		precompiled = self._precompiled_files[real_path]
+		if precompiled is None:
+			return None
+		if precompiled['directory'] != os.path.abspath(os.path.dirname(included_file)):
+			return None
+		defines = precompiled['defines']
+		if defines is not None and defines[0] != self._conditional_core.get_state():
+			return None
+		source_path = os.path.realpath(self._source_file_path)
+		for file_path in precompiled['files']:
+			if file_path == source_path or file_path in self._include_stack:
+				return None
+		pragma_once = frozenset(precompiled['pragma_once'])
+		for emitted_file in precompiled['emitted']:
+			if emitted_file in self._emitted_files and (
+					emitted_file in pragma_once or self._is_once(emitted_file)):
+				return None
+		max_includes = self._limits['includes']
+		include_count = self._include_count + precompiled['includes']
+		if max_includes is not None and include_count > max_includes:
+			return None
+		max_depth = self._limits['depth']
+		depth = len(self._include_stack) + precompiled['height']
+		if max_depth is not None and depth > max_depth:
+			return None
+		for file_path in precompiled['files']:
+			self._dependencies[file_path] = None
+		self._environ_values.update(precompiled['environ'])
+		self._include_graph.extend(tuple(edge) for edge in precompiled['graph'])
+		self._pragma_once.update(pragma_once)
+		self._include_count = include_count
+		self._emitted_files.update(precompiled['emitted'])
+		self._skipped_files.extend(precompiled['skipped_files'])
+		if self._stats is not None:
+			self._stats.count('includes', len(precompiled['graph']))
+		self._expanded_heights[cache_key] = precompiled['height']
+		self._expanded_includes[cache_key] = precompiled['includes']
+		self._expanded_subtrees[cache_key] = (
+			frozenset(precompiled['emitted']), frozenset(precompiled['skipped'])
+		)
+		if defines is not None:
+			self._conditional_core.set_state(defines[1])
+			self._expanded_defines[cache_key] = tuple(defines)
+		self._expanded_files[cache_key] = precompiled['text']
+		return precompiled['text']
+
+	def _check_include(self, real_path, cache_key):
+		"""Checks the include against the include stack and the limits.
+
+		Args:
+		    real_path: str -- real path of the included file
+		    cache_key: tuple -- the key of the file, see '_get_cache_key'
+		
+		Raises:
+		    IncludeCycleError -- raises if the file is already being included.
+		    IncludeLimitError -- raises if a limit is exceeded.
+
+		"""
+
+		if real_path in self._include_stack:
+			cycle = self._include_stack[self._include_stack.index(real_path):]
+			raise IncludeCycleError(
+				"Files include each other in a cycle:\n%s" % (
+					' -> '.join(cycle + [real_path]),)
+			)
+		self._include_count += 1
+		max_includes = self._limits['includes']
+		if max_includes is not None and self._include_count > max_includes:
+			raise IncludeLimitError(
+				"More than %s includes" % max_includes
+			)
+		# An already expanded file brings its own nested includes.
+		depth = len(self._include_stack) + self._expanded_heights.get(cache_key, 0)
+		max_depth = self._limits['depth']
+		if max_depth is not None and depth > max_depth:
+			raise IncludeLimitError(
+				"Includes are nested deeper than %s levels:\n%s" % (
+					max_depth, ' -> '.join(self._include_stack + [real_path]),)
+			)
+
+	def _get_banners(self):
+		"""Return the banners that wrap an included file.
+
+		Return:
+		    value: tuple -- :
+		        0 is the banner before the file (with '%s' for the file name),
+		        1 is the banner after the file
+
+		"""
+
+		after_replacement = (
+			'%s ' % self._comment_symbol + 'File - "%s"\n' +\
+			'%s%s(\n\n' % (self._comment_symbol, '-'*30)
+		)
+		before_replacement = (
+			'\n\n%s%s)\n' % (self._comment_symbol, '-'*30)
+		)
+		return (after_replacement, before_replacement)
 
 
 class SpecialIncluder:
@@ -612,11 +2337,70 @@ def include_all(source_file_path, lang='batch'):
 	regexs = preproc_commands.get_com_include()
 	includer_obj = SpecialIncluder.get_special_includer(regexs, source_file_path, lang)
 	source_file_value = '\n' + includer_obj.read(source_file_path) + '\n'
-	start_include = includer_obj.start
-	while True:
-		included_source = start_include(source_file_value)
-		if included_source != source_file_value:
-			source_file_value = included_source
-		else:
-			break
-	return included_source[1:-1]
\ No newline at end of file
+	included_source = includer_obj.expand(source_file_value)
+	return included_source[1:-1]
+
+
+async def async_include_all(source_file_path, lang='batch', executor=None,
+		timeout=None):
+	"""The async counterpart of 'include_all'.
+
+	The files are read in the 'executor',
+	so the event loop is not blocked by the disk.
+	The coroutine can be cancelled,
+	the files are not read after that.
+	
+	Args:
+	    source_file_path: str -- Source file path
+	    lang: str -- Program language name, see 'include_all'
+	    executor: concurrent.futures.Executor -- :
+	        the pool of the blocking work,
+	        many calls can share one bounded pool,
+	        the loop default executor if None
+	    timeout: float -- seconds, None is no timeout
+	
+	Return:
+	    value: str -- Source file after includes.
+	
+	Raises:
+	    asyncio.TimeoutError -- If the timeout is exceeded.
+	    See 'include_all'.
+
+	#### Example ####
+	>>> pool = concurrent.futures.ThreadPoolExecutor(8)
+	>>> results = await asyncio.gather(*[
+	...     async_include_all(path, executor=pool, timeout=10)
+	...     for path in ('a.bat', 'b.bat')
+	... ])
+
+	"""
+
+	if not isinstance(source_file_path, str):
+		raise TypeError("Param 'source_file_path' must be 'str' type")
+	import asyncio
+
+	return await asyncio.wait_for(
+		_async_include_all(source_file_path, lang, executor), timeout
+	)
+
+
+async def _async_include_all(source_file_path, lang, executor):
+	"""See 'async_include_all'."""
+
+	import asyncio
+
+	loop = asyncio.get_running_loop()
+	if not await loop.run_in_executor(executor, os.path.isfile, source_file_path):
+		raise FileNotFoundError("Source file not found")
+	from .precommands import PreprocessorCommands
+	preproc_commands = PreprocessorCommands()
+	regexs = preproc_commands.get_com_include()
+	includer_obj = SpecialIncluder.get_special_includer(regexs, source_file_path, lang)
+	source_file_value = await loop.run_in_executor(
+		executor, includer_obj.read, source_file_path
+	)
+	document = await includer_obj.aexpand_document(
+		'\n' + source_file_value + '\n', executor=executor
+	)
+	included_source = await loop.run_in_executor(executor, document.join)
+	return included_source[1:-1]
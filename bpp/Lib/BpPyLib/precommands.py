@@ -1,10 +1,13 @@
 """Preprocessor commands."""
 
-import re
 import os
-import copy
+
+from .utils import (
+	LazyRegexs,
+)
 
 __all__ = [
+	'ConditionalRegexs',
 	'IncluderRegexs',
 	'PreprocessorCommands',
 ]
@@ -20,7 +23,7 @@ class IncluderRegexs:
 	This dictionary contain the given keys:
 
 	Keys names:
-	    1, 11, 2, 21
+	    1, 11, 2, 21, 3
 	    -1, -2, -3, -4, -5, -6
 	
 	Correct:
@@ -41,6 +44,11 @@ class IncluderRegexs:
 	    This one also just fetches the contents of the 'include',
 	    but which has a reference to environment variables.
 	    Match example - "%somes_path%\some.bat"
+
+	Key 3:
+	    This is the include-once pragma.
+	    A file with it is included at most once per output.
+	    Match example - :#pragma once
 	
 	Incorrect:
 	Key -1:
@@ -74,23 +82,27 @@ class IncluderRegexs:
 
 	"""
 	
-	com_include = {
+	_com_include_patterns = {
 		# Good templates.
-		1:     re.compile(r'(?<=\n)[ \t]*:#include[ \t]*".+"[ \t]*(?=\n)'), # :#include "fold\lib.bat"
-		2:     re.compile(r'(?<=\n)[ \t]*:#include[ \t]*".*%.*"[ \t]*(?=\n)'), # :#include "%lib_dir%\lib.bat"
-		11:    re.compile(r'"(.+)"'), # included file path - "fold\lib.bat"
-		21:    re.compile(r'"(.+)"'), # included file path - "%lib_dir%\lib.bat"
+		1:     r'(?<=\n)[ \t]*:#include[ \t]*".+"[ \t]*(?=\n)', # :#include "fold\lib.bat"
+		2:     r'(?<=\n)[ \t]*:#include[ \t]*".*%.*"[ \t]*(?=\n)', # :#include "%lib_dir%\lib.bat"
+		11:    r'"(.+)"', # included file path - "fold\lib.bat"
+		21:    r'"(.+)"', # included file path - "%lib_dir%\lib.bat"
+		3:     r'(?<=\n)[ \t]*:#pragma[ \t]+once[ \t]*(?=\n)', # :#pragma once
 		# Bad templates.
-		-1:    re.compile(r'(?<=\n)[ \t]*:#include[ \t]*(?!.+)'), # :#include
-		-2:    re.compile(r'(?<=\n)[ \t]*:#include[ \t]*""'), # :#include ""
-		-3:    re.compile(r'(?<=\n)[ \t]*:#include[ \t]*"(?!.+)'), # :#include "
-		-4:    re.compile(r'(?<=\n)[ \t]*:#include[ \t]*".+[^"](?!.+)'), # :#include "lib.bat
-		-5:    re.compile(r'(?<=\n)[ \t]*:#include [^"].+"'), # :#include lib.bat"
-		-6:    re.compile(r'(?<=\n)[ \t]*:#include [^"].+[^"](?!.+)'), # :#include fold\lib.bat
+		-1:    r'(?<=\n)[ \t]*:#include[ \t]*(?!.+)', # :#include
+		-2:    r'(?<=\n)[ \t]*:#include[ \t]*""', # :#include ""
+		-3:    r'(?<=\n)[ \t]*:#include[ \t]*"(?!.+)', # :#include "
+		-4:    r'(?<=\n)[ \t]*:#include[ \t]*".+[^"](?!.+)', # :#include "lib.bat
+		-5:    r'(?<=\n)[ \t]*:#include [^"].+"', # :#include lib.bat"
+		-6:    r'(?<=\n)[ \t]*:#include [^"].+[^"](?!.+)', # :#include fold\lib.bat
 	}
 
 	if os.name == 'posix':
-		com_include[2] = re.compile(r'(?<=\n)[ \t]*:#include[ \t]*".*\$.*"[ \t]*(?=\n)')
+		_com_include_patterns[2] = r'(?<=\n)[ \t]*:#include[ \t]*".*\$.*"[ \t]*(?=\n)'
+
+	# The regexs are compiled on first use, not at the import.
+	com_include = LazyRegexs(_com_include_patterns)
 	
 	def get_com_include(self):
 		"""Return 'include' command regexs.
@@ -100,10 +112,99 @@ class IncluderRegexs:
 
 		"""
 
-		return copy.copy(self.com_include)
+		return dict(self.com_include)
+
+
+class ConditionalRegexs:
+	"""Regular expressions of the conditional directives.
+	
+	This class has a regular expression dictionary -
+	for the ':#define', ':#undef', ':#ifdef', ':#ifndef',
+	':#if', ':#elif', ':#else' and ':#endif' directives.
+
+	Keys names:
+	    1, 2, 3, 4, 5, 6, 7, 8
+	    -1, -2, -3, -4
+
+	Correct:
+	Key 1:
+	    Defines the name, the value is '1' by default.
+	    Match example - :#define DEBUG
+	    Match example - :#define TARGET "windows"
+	    Group 1 is the name, group 2 is the value.
+
+	Key 2:
+	    Removes the definition.
+	    Match example - :#undef DEBUG
+
+	Key 3:
+	    Match example - :#ifdef DEBUG
+
+	Key 4:
+	    Match example - :#ifndef DEBUG
+
+	Key 5:
+	    Group 1 is the expression, see 'ConditionalCore'.
+	    Match example - :#if defined(DEBUG) && TARGET == "windows"
+
+	Key 6:
+	    Match example - :#elif VERSION != 1
+
+	Key 7:
+	    Match example - :#else
+
+	Key 8:
+	    Match example - :#endif
+
+	Keys 2, 3 and 4 have the name in group 1.
+
+	Incorrect:
+	Key -1:
+	    Match example - :#ifdef
+
+	Key -2:
+	    Match example - :#if
+
+	Key -3:
+	    Match example - :#endif DEBUG
+
+	Key -4:
+	    Match example - :#ifdef DEBUG RELEASE
+
+	"""
+
+	_com_conditional_patterns = {
+		# Good templates.
+		1:     r'(?<=\n)[ \t]*:#define[ \t]+(\w+)(?:[ \t]+(.*?))?[ \t]*(?=\n)', # :#define DEBUG 1
+		2:     r'(?<=\n)[ \t]*:#undef[ \t]+(\w+)[ \t]*(?=\n)', # :#undef DEBUG
+		3:     r'(?<=\n)[ \t]*:#ifdef[ \t]+(\w+)[ \t]*(?=\n)', # :#ifdef DEBUG
+		4:     r'(?<=\n)[ \t]*:#ifndef[ \t]+(\w+)[ \t]*(?=\n)', # :#ifndef DEBUG
+		5:     r'(?<=\n)[ \t]*:#if[ \t]+(.*?\S)[ \t]*(?=\n)', # :#if DEBUG == 1
+		6:     r'(?<=\n)[ \t]*:#elif[ \t]+(.*?\S)[ \t]*(?=\n)', # :#elif DEBUG
+		7:     r'(?<=\n)[ \t]*:#else[ \t]*(?=\n)', # :#else
+		8:     r'(?<=\n)[ \t]*:#endif[ \t]*(?=\n)', # :#endif
+		# Bad templates.
+		-1:    r'(?<=\n)[ \t]*:#(?:define|undef|ifdef|ifndef)(?![ \t]+\w).*(?=\n)', # :#ifdef
+		-2:    r'(?<=\n)[ \t]*:#(?:if|elif)[ \t]*(?=\n)', # :#if
+		-3:    r'(?<=\n)[ \t]*:#(?:else|endif)[ \t]+\S.*(?=\n)', # :#endif DEBUG
+		-4:    r'(?<=\n)[ \t]*:#(?:undef|ifdef|ifndef)[ \t]+\w+[ \t]+\S.*(?=\n)', # :#ifdef A B
+	}
+
+	# The regexs are compiled on first use, not at the import.
+	com_conditional = LazyRegexs(_com_conditional_patterns)
+	
+	def get_com_conditional(self):
+		"""Return the conditional directives regexs.
+		
+		Return:
+		    value: dict -- the conditional directives regexs
+
+		"""
+
+		return dict(self.com_conditional)
 
 
-class PreprocessorCommands(IncluderRegexs,):
+class PreprocessorCommands(IncluderRegexs, ConditionalRegexs):
 	"""Regular expressions of all preprocessor commands.
 	
 	This class has dictionaries with regular expressions -
@@ -131,7 +232,8 @@ class PreprocessorCommands(IncluderRegexs,):
 	Just add a number to the key name, starting with one.
 
 	This class inherits all regex classes using multiple inheritance.
-	It currently only inherits the 'IncluderRegexs' class.
+	It currently inherits the 'IncluderRegexs' -
+	and the 'ConditionalRegexs' classes.
 	But their number may increase in the future.
 
 	"""
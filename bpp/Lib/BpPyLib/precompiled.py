@@ -0,0 +1,165 @@
+"""Precompiled library headers.
+
+A large shared library (a .hbat file) is expanded by every file that includes it.
+Precompiling expands it once, as if it were included,
+and saves the result next to it ('<library>.bpch'),
+with the real paths of its include tree and a fingerprint:
+the bpp version, the includer options, and every file of the tree -
+with its modification time, size and content hash,
+and the expanded environment variables.
+
+An includer with the 'use_precompiled' property takes the expanded library -
+from the artifact, while the fingerprint still matches.
+Otherwise it expands the library as usual.
+
+The artifact is JSON compressed with zlib.
+
+"""
+
+import json
+import os
+import tempfile
+import zlib
+
+from .abcs import (
+	BaseBpp,
+)
+from .buildcache import (
+	get_file_entry,
+	is_file_unchanged,
+)
+from .version import (
+	getversion,
+)
+
+__all__ = [
+	'PrecompiledHeader',
+]
+
+
+class PrecompiledHeader(BaseBpp):
+	"""Precompiled header of one library file.
+
+	Constructor:
+	    library_filepath: str -- the library file path
+
+	#### Example ####:
+	>>> header = PrecompiledHeader('BLib/asyncio.hbat')
+	>>> header.save(includer.precompile('BLib/asyncio.hbat'), options)
+	>>> header.load(options, includer.expand_environ)['text']
+
+	"""
+
+	artifact_extension = '.bpch'
+	_magic = b'BPCH1\n'
+
+	def __init__(self, library_filepath):
+		self._library_filepath = os.path.realpath(library_filepath)
+		self._artifact_path = self._library_filepath + self.artifact_extension
+
+	def __repr__(self):
+		repr_text = "PrecompiledHeader(library_filepath=%s)" % (
+			self._library_filepath,
+		)
+		return repr_text
+
+	def get_artifact_path(self):
+		"""Return the artifact file path."""
+		return self._artifact_path
+
+	def save(self, precompiled, options=None):
+		"""Saves the artifact.
+
+		The artifact is replaced atomically,
+		so an includer never reads a partly written one.
+
+		Args:
+		    precompiled: dict -- see 'Includer.precompile'
+		    options: dict -- :
+		        the includer options that change the expansion,
+		        see 'Includer.get_precompile_options'
+
+		"""
+
+		artifact = dict(precompiled)
+		artifact.update({
+			'version': getversion(),
+			'library': self._library_filepath,
+			'options': dict(options or {}),
+			'files': [get_file_entry(file_path) for file_path in precompiled['files']],
+		})
+		data = self._magic + zlib.compress(
+			json.dumps(artifact, separators=(',', ':')).encode('utf-8')
+		)
+		descriptor, temp_path = tempfile.mkstemp(
+			prefix='.bpp_', suffix='.tmp', dir=os.path.dirname(self._artifact_path)
+		)
+		try:
+			with open(descriptor, 'wb') as file:
+				file.write(data)
+			os.replace(temp_path, self._artifact_path)
+
+		except BaseException:
+			if os.path.exists(temp_path):
+				os.remove(temp_path)
+			raise
+
+	def load(self, options=None, expand_environ=None):
+		"""Loads the artifact, if its fingerprint still matches.
+
+		Args:
+		    options: dict -- the includer options, see 'save'
+		    expand_environ: callable -- :
+		        expands environment variables in paths,
+		        needed if the library has env-based includes
+
+		Return:
+		    value: dict -- :
+		        the artifact (see 'Includer.precompile'),
+		        or None if it does not exist, is damaged or is out of date
+
+		"""
+
+		try:
+			with open(self._artifact_path, 'rb') as file:
+				data = file.read()
+			if not data.startswith(self._magic):
+				return None
+			artifact = json.loads(
+				zlib.decompress(data[len(self._magic):]).decode('utf-8')
+			)
+
+		except (OSError, ValueError, zlib.error):
+			return None
+		if not isinstance(artifact, dict):
+			return None
+		expected = (
+			('version', getversion()),
+			('library', self._library_filepath),
+			('options', dict(options or {})),
+		)
+		try:
+			for key, value in expected:
+				if artifact.get(key) != value:
+					return None
+			for file_entry in artifact['files']:
+				if not is_file_unchanged(file_entry):
+					return None
+			environ_values = artifact['environ']
+			if environ_values:
+				if expand_environ is None:
+					return None
+				for environ_var, variable_value in environ_values.items():
+					if expand_environ(environ_var) != variable_value:
+						return None
+			artifact['files'] = [file_entry['path'] for file_entry in artifact['files']]
+
+		except (KeyError, TypeError, AttributeError):
+			return None
+		return artifact
+
+	def remove(self):
+		"""Removes the artifact if it exists."""
+
+		if os.path.isfile(self._artifact_path):
+			os.remove(self._artifact_path)
@@ -11,6 +11,14 @@ from .precommands import (
 from .includer import (
 	Includer,
 )
+from .structures import (
+	Document,
+)
+from .utils import (
+	detect_encoding,
+	detect_newline,
+	map_file,
+)
 
 __all__ = [
 	'Preprocessor',
@@ -22,38 +30,77 @@ class Preprocessor(BasePreprocessor):
 	
 	Constructor:
 	    source_filepath: str -- source file path. (any file)
+	    binary: bool -- :
+	        bytes-in/bytes-out mode,
+	        the files are mapped and only the directive lines are decoded,
+	        the encoding and the line endings of the source are kept
 		
 	"""
 
-	def __new__(cls, source_filepath):
+	def __new__(cls, source_filepath, binary=False):
 		if not isinstance(source_filepath, str):
 			raise TypeError("Param 'source_filepath' is 'str' type")
 		if not os.path.isfile(source_filepath):
 			raise FileNotFoundError('Source file not found')
 		return super().__new__(cls)
 
-	def __init__(self, source_filepath):
+	def __init__(self, source_filepath, binary=False):
 		self._source_filepath = os.path.abspath(source_filepath)
-		self._source_filevalue = self.read(source_filepath).lower()
-		self._preprocessed_file = '\n' + self._source_filevalue + '\n'
+		self._binary = binary
+		if binary:
+			self._source_map = map_file(source_filepath)
+			self._source_filevalue = None
+			source_segment = memoryview(self._source_map)
+		else:
+			self._source_map = None
+			self._source_filevalue = self.read(source_filepath).lower()
+			source_segment = self._source_filevalue
+		# The joined result, it is built only on request.
+		self._preprocessed_file = None
+		# The result, without the wrapping newlines.
+		self._document = Document([source_segment])
 		self._preproc_commands = PreprocessorCommands()
 		self._includer = Includer(
 				self._preproc_commands.com_include,
 				self._source_filepath
 		)
+		self._includer.setproperty(
+			'conditionals', self._preproc_commands.com_conditional
+		)
+		if binary:
+			self._includer.setproperty('mmap', True)
 	
 	def __repr__(self):
-		repr_text = "Preprocessor(source_filepath=%s)" % (
-			self._source_filepath
+		repr_text = "Preprocessor(source_filepath=%s, binary=%s)" % (
+			self._source_filepath, self._binary
 		)
 		return repr_text
 	
 	def get_preprocessed_file(self):
-		"""Return preprocessed file value."""
+		"""Return preprocessed file value.
+
+		The result is joined into one string only here,
+		'save' and 'write' stream it without joining.
+
+		"""
+
+		if self._preprocessed_file is None:
+			output_format = self._get_output_format()
+			encoding = output_format and output_format[0]
+			self._preprocessed_file = '\n' + self._document.join(encoding) + '\n'
 		return self._preprocessed_file
 	
+	def get_document(self):
+		"""Return preprocessed file value as 'Document' (without joining)."""
+		return self._document
+	
 	def get_source_file(self):
 		"""Return source file, before preprocessing."""
+
+		if self._source_filevalue is None:
+			self._source_filevalue = Document(
+				[memoryview(self._source_map)]
+			).join(self._get_output_format()[0])
 		return self._source_filevalue
 	
 	def getincluder(self):
@@ -63,15 +110,76 @@ class Preprocessor(BasePreprocessor):
 	def preprocessize(self):
 		"""This function does preprocessing."""
 
-		start_include = self._includer.start
-		is_loop = True
-		while is_loop:
-			included_file = start_include(self._preprocessed_file)
-			if included_file != self._preprocessed_file:
-				self._preprocessed_file = included_file
-			else:
-				break
+		if self._binary:
+			self._document = self._includer.expand_mapped_document(
+				self._source_map
+			)
+		else:
+			self._document = self._includer.expand_document(
+				'\n' + self._source_filevalue + '\n', trim=True
+			)
+		self._preprocessed_file = None
 	
+	async def apreprocessize(self, executor=None):
+		"""Does preprocessing without blocking the event loop.
+
+		The async counterpart of 'preprocessize',
+		see 'Includer.aexpand_document'.
+		The constructor reads the source file,
+		so it can be called in the executor too.
+		
+		Args:
+		    executor: concurrent.futures.Executor -- :
+		        the pool of the blocking work,
+		        many preprocessors can share one bounded pool,
+		        the loop default executor if None
+
+		#### Example ####
+		>>> loop = asyncio.get_running_loop()
+		>>> preprocessor = await loop.run_in_executor(pool, Preprocessor, path)
+		>>> await asyncio.wait_for(preprocessor.apreprocessize(pool), 10)
+		>>> await loop.run_in_executor(pool, preprocessor.update, output)
+
+		"""
+
+		if self._binary:
+			self._document = await self._includer.aexpand_mapped_document(
+				self._source_map, executor
+			)
+		else:
+			self._document = await self._includer.aexpand_document(
+				'\n' + self._source_filevalue + '\n', True, executor
+			)
+		self._preprocessed_file = None
+
+	def tree_shake(self, keep_labels=None):
+		"""Removes the unreachable label blocks of the included files.
+
+		Call it after 'preprocessize', see 'TreeShaker'.
+		The result is joined into one string.
+
+		Args:
+		    keep_labels: list -- the allow-list of labels, see 'TreeShaker'
+
+		Return:
+		    value: dict -- see 'TreeShaker.get_report'
+
+		Raises:
+		    ValueError -- if the included files are mapped ('binary' or 'mmap')
+
+		"""
+
+		if self._get_output_format() is not None:
+			raise ValueError(
+				"Tree shaking works without 'binary' and 'mmap'"
+			)
+		from .treeshaker import TreeShaker
+
+		shaker = TreeShaker(keep_labels, self._includer.getproperty('comment'))
+		self._document = Document([shaker.shake(self._document.join())])
+		self._preprocessed_file = None
+		return shaker.get_report()
+
 	def save(self, file_path):
 		"""Save preprocess result.
 		
@@ -80,4 +188,69 @@ class Preprocessor(BasePreprocessor):
 
 		"""
 
-		return super().save(file_path, self._preprocessed_file[1:-1])
\ No newline at end of file
+		return super().save(
+			file_path, self._document, *(self._get_output_format() or ())
+		)
+	
+	def write(self, stream):
+		"""Streams preprocess result to the opened text stream.
+
+		The result is written chunk by chunk, ending with a newline.
+		If the files are mapped, and the stream has a binary 'buffer',
+		then the bytes are written to the buffer as they are.
+		
+		Args:
+		    stream: object -- text stream, for example 'sys.stdout'
+		
+		Return:
+		    value: int -- the number of characters (bytes) written.
+
+		"""
+
+		output_format = self._get_output_format()
+		if output_format is None or not hasattr(stream, 'buffer'):
+			size = self.write_stream(stream, self._document)
+			return size + stream.write('\n')
+		encoding, newline = output_format
+		stream.flush()
+		size = self.write_stream(
+			stream.buffer, self._document, encoding=encoding, newline=newline
+		)
+		return size + stream.buffer.write(newline.encode(encoding))
+	
+	def update(self, file_path):
+		"""Save preprocess result, only if it differs from the file.
+
+		The file is replaced atomically,
+		and an unchanged file keeps its modification time.
+		
+		Args:
+		    file_path: str -- saved file path.
+		
+		Return:
+		    value: bool -- True if the file was rewritten
+
+		"""
+
+		return self.save_if_changed(
+			file_path, self._document, *(self._get_output_format() or ())
+		)
+	
+	def _get_output_format(self):
+		"""Return the output (encoding, newline), or None.
+
+		If included files are mapped, their bytes are copied as they are,
+		so the output file is written in binary mode with this format.
+		In the binary mode it is the format of the source file.
+
+		"""
+
+		encoding = self._includer.getproperty('encoding')
+		if self._binary:
+			return (
+				detect_encoding(self._source_map, encoding),
+				detect_newline(self._source_map),
+			)
+		if self._includer.getproperty('mmap'):
+			return (encoding, os.linesep)
+		return None
\ No newline at end of file
@@ -0,0 +1,933 @@
+"""Multi-target project builds.
+
+A project manifest lists the build targets (source and output files),
+the include search paths and the defines.
+All targets are built in one process, with one shared files cache,
+in the order of their dependencies.
+
+Two manifest formats are supported:
+* JSON ('.json' extension)
+* INI (any other extension, '.ini' or '.cfg' for example)
+
+"""
+
+import concurrent.futures
+import configparser
+import glob
+import json
+import os
+import time
+
+from .abcs import (
+	BaseBpp,
+)
+from .buildcache import (
+	BuildCache,
+)
+from .depfile import (
+	DepFile,
+)
+from .exceptions import (
+	BPPError,
+	ProjectError,
+)
+from .includer import (
+	Includer,
+)
+from .precommands import (
+	PreprocessorCommands,
+)
+from .preprocessor import (
+	Preprocessor,
+)
+from .treeshaker import (
+	get_label_names,
+)
+from .utils import (
+	get_error_message,
+)
+
+__all__ = [
+	'Project',
+]
+
+# The project of a worker process, see 'Project.build'.
+_worker_project = None
+
+
+class Project(BaseBpp):
+	"""Project of many build targets.
+
+	Constructor:
+	    manifest_path: str -- :
+	        manifest file path,
+	        if None then the project is empty (see 'from_sources')
+
+	The paths in the manifest are relative to the manifest directory.
+	A target depends on the targets from its 'depends',
+	and on the targets whose outputs it includes (or uses as the source).
+
+	Options (of the project, or of one target):
+	    include_once, mmap, binary: bool -- see the same command line params
+	    encoding: str -- see '--encoding'
+	    max_depth, max_includes, max_output_bytes: int -- see '--max-*'
+	    prefetch: int -- see '--prefetch'
+	    use_precompiled: bool -- see '--use-precompiled'
+	    tree_shake: bool -- see '--tree-shake'
+	    keep_labels: str -- see '--keep-label', comma separated ('on_*, main')
+
+	#### JSON manifest ####
+	{
+	    "include_paths": ["lib"],
+	    "defines": {"LIBDIR": "lib"},
+	    "options": {"include_once": true},
+	    "cache_dir": ".bppcache",
+	    "targets": [
+	        {"name": "common", "source": "src/common.bat", "output": "out/common.bat"},
+	        {
+	            "name": "setup", "source": "src/setup.bat", "output": "out/setup.bat",
+	            "depfile": "out/setup.d", "defines": {"VERSION": "1.0"},
+	            "options": {"max_depth": 64}, "depends": ["common"]
+	        }
+	    ]
+	}
+
+	#### INI manifest ####
+	[project]
+	include_paths = lib
+	cache_dir = .bppcache
+	include_once = yes
+
+	[defines]
+	LIBDIR = lib
+
+	[target:setup]
+	source = src/setup.bat
+	output = out/setup.bat
+	depends = common
+	defines = VERSION=1.0
+
+	#### Example ####:
+	>>> project = Project('bpp.json')
+	>>> for result in project.build():
+	...     print(result['name'], result['time'])
+
+	"""
+
+	_option_types = {
+		'include_once': bool,
+		'mmap': bool,
+		'binary': bool,
+		'encoding': str,
+		'max_depth': int,
+		'max_includes': int,
+		'max_output_bytes': int,
+		'prefetch': int,
+		'use_precompiled': bool,
+		'tree_shake': bool,
+		'keep_labels': str,
+	}
+	_limit_names = (
+		('max_depth', 'depth'),
+		('max_includes', 'includes'),
+		('max_output_bytes', 'output_bytes'),
+	)
+
+	def __init__(self, manifest_path=None):
+		self._manifest_path = None
+		self._project_dir = os.getcwd()
+		if manifest_path is not None:
+			self._manifest_path = os.path.abspath(manifest_path)
+			self._project_dir = os.path.dirname(self._manifest_path)
+		self._include_paths = []
+		self._defines = {}
+		self._options = {}
+		self._cache_dir = None
+		self._targets = []
+		self._com_include = PreprocessorCommands().com_include
+		# The files cache shared by all targets.
+		self._cache_includer = Includer(self._com_include, self._project_dir)
+		# The environment variables, None is 'os.environ'.
+		self._environ = None
+		if manifest_path is not None:
+			self.load()
+
+	def __repr__(self):
+		repr_text = "Project(manifest_path=%s)" % self._manifest_path
+		return repr_text
+
+	def __getstate__(self):
+		"""The files cache is not pickled (for worker processes)."""
+
+		state = dict(self.__dict__)
+		state['_cache_includer'] = None
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._cache_includer = Includer(self._com_include, self._project_dir)
+
+	@classmethod
+	def from_sources(cls, sources, output_dir, defines=None, options=None,
+			cache_dir=None, include_paths=None):
+		"""Return the project of many sources, without a manifest.
+
+		Every source is a target, its output is in the 'output_dir' -
+		with the same file name.
+		A source can be a glob pattern ('src/*.bat', 'src/**/*.bat'),
+		or '@' and a path of a file that lists sources, one per line.
+
+		Args:
+		    sources: list -- sources, glob patterns or list files
+		    output_dir: str -- directory for the outputs
+		    defines: dict -- variables for all targets
+		    options: dict -- options for all targets, see 'Project'
+		    cache_dir: str -- directory for the build manifests, or None
+		    include_paths: list -- include search paths
+
+		Return:
+		    value: Project -- the project, relative paths are from the cwd
+
+		Raises:
+		    ProjectError -- If no source is found, or outputs are the same
+
+		"""
+
+		source_paths = []
+		for source in sources:
+			if source.startswith('@'):
+				with open(source[1:], 'r') as file:
+					patterns = [line.strip() for line in file if line.strip()]
+			else:
+				patterns = [source]
+			for pattern in patterns:
+				if glob.has_magic(pattern):
+					found_paths = sorted(glob.glob(pattern, recursive=True))
+				else:
+					found_paths = [pattern]
+				for source_path in found_paths:
+					source_path = os.path.abspath(source_path)
+					if source_path not in source_paths:
+						source_paths.append(source_path)
+		if not source_paths:
+			raise ProjectError("No source file is found")
+		targets = []
+		outputs = {}
+		for source_path in source_paths:
+			output = os.path.join(output_dir, os.path.basename(source_path))
+			if output in outputs:
+				raise ProjectError(
+					"Sources '%s' and '%s' have the same output '%s'" % (
+						outputs[output], source_path, output)
+				)
+			outputs[output] = source_path
+			targets.append({
+				'name': os.path.relpath(source_path),
+				'source': source_path,
+				'output': output,
+			})
+		project = cls()
+		project._set_manifest({
+			'include_paths': list(include_paths or ()),
+			'defines': dict(defines or {}),
+			'options': dict(options or {}),
+			'cache_dir': cache_dir,
+			'targets': targets,
+		})
+		return project
+
+	@classmethod
+	def from_target(cls, source, output, defines=None, options=None,
+			cache_dir=None, depfile=None):
+		"""Return the project of one target, without a manifest.
+
+		Args:
+		    source: str -- source file path
+		    output: str -- output file path
+		    depfile: str -- dependency file path, or None
+		    See 'from_sources'.
+
+		Return:
+		    value: Project -- the project, relative paths are from the cwd
+
+		"""
+
+		project = cls()
+		project._set_manifest({
+			'include_paths': [],
+			'defines': dict(defines or {}),
+			'options': dict(options or {}),
+			'cache_dir': cache_dir,
+			'targets': [{
+				'name': os.path.relpath(source),
+				'source': source,
+				'output': output,
+				'depfile': depfile,
+			}],
+		})
+		return project
+
+	def load(self):
+		"""Loads the manifest.
+
+		Raises:
+		    ProjectError -- If the manifest is incorrect
+		    OSError -- If problem in operating system
+
+		"""
+
+		if self._manifest_path.endswith('.json'):
+			manifest = self._load_json()
+		else:
+			manifest = self._load_ini()
+		self._set_manifest(manifest)
+
+	def _set_manifest(self, manifest):
+		"""Sets the loaded manifest, see '_load_ini'.
+
+		Raises:
+		    ProjectError -- If the manifest is incorrect, or outputs are the same
+
+		"""
+
+		self._include_paths = [
+			self._get_path(path) for path in manifest['include_paths']
+		]
+		self._defines = self._get_defines(manifest['defines'], 'project')
+		self._options = self._get_options(manifest['options'], 'project')
+		cache_dir = manifest['cache_dir']
+		self._cache_dir = cache_dir and self._get_path(cache_dir)
+		self._targets = []
+		names = set()
+		# {real output path: target name}, two targets cannot write one file.
+		outputs = {}
+		for target in manifest['targets']:
+			name = target.get('name')
+			if not isinstance(name, str) or not name:
+				raise ProjectError("Every target must have a 'name'")
+			if name in names:
+				raise ProjectError("The target '%s' is defined twice" % name)
+			names.add(name)
+			for key in ('source', 'output'):
+				if not isinstance(target.get(key), str):
+					raise ProjectError(
+						"The target '%s' must have a '%s' path" % (name, key)
+					)
+			defines = dict(self._defines)
+			defines.update(self._get_defines(target.get('defines') or {}, name))
+			options = dict(self._options)
+			options.update(self._get_options(target.get('options') or {}, name))
+			if options.get('tree_shake', False) and (
+				options.get('mmap', False) or options.get('binary', False)
+			):
+				raise ProjectError(
+					"The option 'tree_shake' of '%s' works without 'mmap' and 'binary'" % (
+						name,)
+				)
+			if 'encoding' in options and not options.get('binary', False):
+				raise ProjectError(
+					"The option 'encoding' of '%s' works with 'binary'" % name
+				)
+			output = self._get_path(target['output'])
+			real_output = os.path.normcase(os.path.realpath(output))
+			if real_output in outputs:
+				raise ProjectError(
+					"Targets '%s' and '%s' have the same output '%s'" % (
+						outputs[real_output], name, output)
+				)
+			outputs[real_output] = name
+			depfile = target.get('depfile')
+			self._targets.append({
+				'name': name,
+				'source': self._get_path(target['source']),
+				'output': output,
+				'depfile': depfile and self._get_path(depfile),
+				'defines': defines,
+				'options': options,
+				'depends': list(target.get('depends') or ()),
+			})
+		for target in self._targets:
+			for name in target['depends']:
+				if name not in names:
+					raise ProjectError(
+						"The target '%s' depends on an unknown target '%s'" % (
+							target['name'], name)
+					)
+
+	def share_cache(self, includer):
+		"""Shares the files cache of the project with the includer.
+
+		See 'Includer.share_cache'.
+
+		"""
+
+		self._cache_includer.share_cache(includer)
+
+	def set_environ(self, environ):
+		"""Sets the environment variables of the builds.
+
+		See the 'environ' property of 'Includer'.
+		A worker process sees only its own environment,
+		so with these variables the targets are built in this process.
+
+		Args:
+		    environ: dict -- a mapping with 'get', or None ('os.environ')
+
+		"""
+
+		self._environ = environ
+
+	def forget_file(self, file_path):
+		"""Removes the changed file from the files cache of the project.
+
+		See 'Includer.forget_file'.
+
+		"""
+
+		self._cache_includer.forget_file(file_path)
+
+	def get_targets(self):
+		"""Return the targets, as they are in the manifest.
+
+		Return:
+		    value: list -- :
+		        dicts with keys 'name', 'source', 'output', 'depfile',
+		        'defines', 'options' and 'depends' (target names)
+
+		"""
+
+		return [dict(target) for target in self._targets]
+
+	def get_build_order(self, names=None):
+		"""Return the targets in the order they must be built.
+
+		The dependencies of the targets are in the order too,
+		before the targets that need them.
+		Targets that do not depend on each other keep the manifest order.
+
+		Args:
+		    names: list -- names of the targets to build, None is all
+
+		Return:
+		    value: list -- target dicts, see 'get_targets'
+
+		Raises:
+		    ProjectError -- If a target is unknown, or targets depend on each other
+
+		"""
+
+		return self._get_build_plan(names, False)[0]
+
+	def build(self, names=None, use_cache=True, jobs=1, raise_errors=True):
+		"""Builds the targets in the dependency order.
+
+		A target whose build cache is up to date is not preprocessed.
+		With 'jobs' > 1 the targets are built in a pool of processes,
+		a target starts when all its dependencies are built.
+		With the environment of 'set_environ' the 'jobs' is 1.
+		Every process has its own files cache.
+		The results are in the build order anyway.
+
+		Args:
+		    names: list -- names of the targets to build, None is all
+		    use_cache: bool -- use the incremental build cache
+		    jobs: int -- the number of processes
+		    raise_errors: bool -- :
+		        raise the first error,
+		        otherwise it is in the 'error' of the result
+
+		Return:
+		    value: list -- :
+		        dicts with keys 'name', 'output',
+		        'built' (False if it was up to date), 'time' (seconds),
+		        'dependencies' (the files of the target) and 'error' (str or None),
+		        in the build order
+
+		Raises:
+		    ProjectError -- If a target cannot be built
+
+		"""
+
+		order, dependencies = self._get_build_plan(names, use_cache)
+		if jobs > 1 and len(order) > 1 and self._environ is None:
+			results = self._build_parallel(order, dependencies, use_cache, jobs)
+		else:
+			results = []
+			for target in order:
+				results.append(self._run_target(target, use_cache))
+				if results[-1]['error'] is not None:
+					break
+		for result in results:
+			if raise_errors and result['error'] is not None:
+				raise ProjectError(
+					"Target '%s': %s" % (result['name'], result['error'])
+				)
+		return results
+
+	def _build_parallel(self, order, dependencies, use_cache, jobs):
+		"""Builds the targets in a pool of processes, see 'build'.
+
+		No target is started after an error.
+
+		Return:
+		    value: list -- results of the started targets, in the build order
+
+		"""
+
+		targets = dict((target['name'], target) for target in order)
+		pending = [target['name'] for target in order]
+		results = {}
+		running = {}
+		is_failed = False
+		with concurrent.futures.ProcessPoolExecutor(
+			jobs, initializer=_init_worker, initargs=(self,)
+		) as executor:
+			while pending or running:
+				if not is_failed:
+					for name in [
+						name for name in pending
+						if all(
+							dependency in results
+							for dependency in dependencies[name]
+						)
+					]:
+						future = executor.submit(
+							_run_worker_target, targets[name], use_cache
+						)
+						running[future] = name
+						pending.remove(name)
+				if not running:
+					break
+				done, _ = concurrent.futures.wait(
+					running, return_when=concurrent.futures.FIRST_COMPLETED
+				)
+				for future in done:
+					result = future.result()
+					results[running.pop(future)] = result
+					is_failed = is_failed or result['error'] is not None
+		return [
+			results[target['name']]
+			for target in order if target['name'] in results
+		]
+
+	def _run_target(self, target, use_cache):
+		"""Builds one target, and return its result, see 'build'.
+
+		The errors are returned in the result, and not raised.
+
+		"""
+
+		start_time = time.perf_counter()
+		result = {
+			'name': target['name'],
+			'output': target['output'],
+			'built': False,
+			'dependencies': [],
+			'error': None,
+		}
+		try:
+			result['built'], result['dependencies'] = self._build_target(
+				target, use_cache
+			)
+
+		except (BPPError, OSError) as ex:
+			result['error'] = get_error_message(ex)
+		result['time'] = time.perf_counter() - start_time
+		return result
+
+	def _get_build_plan(self, names, use_cache):
+		"""Return the build order and the target dependencies.
+
+		Args:
+		    names: list -- names of the targets to build, None is all
+		    use_cache: bool -- see '_get_dependencies'
+
+		Return:
+		    value: tuple -- :
+		        0 is the order, see 'get_build_order',
+		        1 is {target name: names of the targets it depends on}
+
+		"""
+
+		targets = dict((target['name'], target) for target in self._targets)
+		for name in names or ():
+			if name not in targets:
+				raise ProjectError("Unknown target '%s'" % name)
+		dependencies = self._get_dependencies(use_cache)
+		wanted = set()
+		stack = list(names or targets)
+		while stack:
+			name = stack.pop()
+			if name not in wanted:
+				wanted.add(name)
+				stack.extend(dependencies[name])
+		order = []
+		done = set()
+		pending = [t['name'] for t in self._targets if t['name'] in wanted]
+		while pending:
+			ready = [
+				name for name in pending
+				if all(dependency in done for dependency in dependencies[name])
+			]
+			if not ready:
+				raise ProjectError(
+					"Targets depend on each other in a cycle: %s" % (
+						', '.join(pending),)
+				)
+			for name in ready:
+				order.append(targets[name])
+				done.add(name)
+			pending = [name for name in pending if name not in done]
+		order = [dict(target) for target in order]
+		return (order, dict((name, dependencies[name]) for name in wanted))
+
+	def _build_target(self, target, use_cache):
+		"""Builds one target.
+
+		Return:
+		    value: tuple -- :
+		        0 is False if the target was up to date,
+		        1 is the files of the target
+
+		"""
+
+		options = target['options']
+		build_cache = None
+		if use_cache:
+			build_cache = self._get_build_cache(target)
+		current_dir = os.getcwd()
+		os.chdir(os.path.dirname(target['source']))
+		try:
+			# The source is read only if the target is not up to date.
+			if build_cache is not None and self._is_up_to_date(target, build_cache):
+				return (False, build_cache.get_recorded_files())
+			preprocessor = Preprocessor(
+				target['source'], options.get('binary', False)
+			)
+			includer = preprocessor.getincluder()
+			self._set_properties(includer, target)
+			preprocessor.preprocessize()
+			if options.get('tree_shake', False):
+				preprocessor.tree_shake(
+					get_label_names(options.get('keep_labels', ''))
+				)
+
+		finally:
+			os.chdir(current_dir)
+		output_dir = os.path.dirname(target['output'])
+		# The targets of one directory can be built at the same time.
+		os.makedirs(output_dir, exist_ok=True)
+		if target['depfile'] is not None:
+			DepFile(
+				target['output'], target['source'], includer.get_include_graph()
+			).save(target['depfile'])
+		preprocessor.update(target['output'])
+		# The output can be included by the next targets.
+		self._cache_includer.forget_file(target['output'])
+		if build_cache is not None:
+			build_cache.record(
+				includer.get_dependencies(), includer.get_environ_values()
+			)
+		return (True, [target['source']] + includer.get_dependencies())
+
+	def _get_build_cache(self, target):
+		"""Return the build cache of the target."""
+
+		return BuildCache(
+			target['source'], target['output'], self._cache_dir,
+			{
+				'defines': target['defines'],
+				'depfile': target['depfile'],
+				# The prefetch and the precompiled libraries -
+				# do not change the output.
+				'options': dict(
+					(name, value) for name, value in target['options'].items()
+					if name not in ('prefetch', 'use_precompiled')
+				),
+				'include_paths': self._include_paths,
+			},
+		)
+
+	def _get_dependencies(self, use_cache=False):
+		"""Return the names of the targets each target depends on.
+
+		The include tree of every target is scanned (not expanded),
+		an output of another target is a dependency, it is not scanned.
+		With 'use_cache' the tree of an up to date target is not scanned,
+		its files are taken from its build cache,
+		so a build where nothing has changed reads no files.
+
+		Args:
+		    use_cache: bool -- take the files of the up to date targets -
+		        from their build caches
+
+		Return:
+		    value: dict -- {target name: list of target names}
+
+		"""
+
+		outputs = dict(
+			(os.path.realpath(target['output']), target['name'])
+			for target in self._targets
+		)
+		dependencies = {}
+		for target in self._targets:
+			names = list(target['depends'])
+			current_dir = os.getcwd()
+			os.chdir(os.path.dirname(target['source']))
+			try:
+				file_paths = None
+				if use_cache:
+					file_paths = self._get_cached_files(target)
+				if file_paths is None:
+					file_paths = self._scan_tree(target, outputs)
+				for file_path in file_paths:
+					name = outputs.get(os.path.realpath(file_path))
+					if name is not None and name != target['name'] and name not in names:
+						names.append(name)
+
+			finally:
+				os.chdir(current_dir)
+			dependencies[target['name']] = names
+		return dependencies
+
+	def _get_cached_files(self, target):
+		"""Return the files of the target from its build cache.
+
+		An output of another target in the tree is a file of the cache too,
+		so the dependencies are the same as with '_scan_tree'.
+
+		Return:
+		    value: list -- file paths, or None if the target is not up to date
+
+		"""
+
+		build_cache = self._get_build_cache(target)
+		if not self._is_up_to_date(target, build_cache):
+			return None
+		return build_cache.get_recorded_files()
+
+	def _is_up_to_date(self, target, build_cache):
+		"""Checks the build cache of the target, and its depfile exists."""
+
+		if target['depfile'] is not None and not os.path.isfile(target['depfile']):
+			return False
+		includer = Includer(self._com_include, target['source'])
+		self._set_properties(includer, target)
+		return build_cache.is_up_to_date(includer.expand_environ)
+
+	def _scan_tree(self, target, outputs):
+		"""Yields the source and all files of the target include tree.
+
+		Files that cannot be read are skipped,
+		the build of the target reports them.
+
+		"""
+
+		includer = Includer(self._com_include, target['source'])
+		self._set_properties(includer, target)
+		seen = set()
+		stack = [target['source']]
+		while stack:
+			file_path = stack.pop()
+			real_path = os.path.realpath(file_path)
+			if real_path in seen:
+				continue
+			seen.add(real_path)
+			yield file_path
+			if real_path in outputs:
+				continue
+			try:
+				included_files = includer.get_included_files(file_path)
+
+			except (BPPError, OSError, ValueError):
+				continue
+			stack.extend(reversed(included_files))
+
+	def _set_properties(self, includer, target):
+		"""Sets the target properties of the includer."""
+
+		options = target['options']
+		includer.share_cache(self._cache_includer)
+		includer.setproperty('defines', target['defines'])
+		includer.setproperty('environ', self._environ)
+		includer.setproperty('include_paths', self._include_paths)
+		includer.setproperty('include_once', options.get('include_once', False))
+		includer.setproperty(
+			'mmap', options.get('mmap', False) or options.get('binary', False)
+		)
+		if 'encoding' in options:
+			includer.setproperty('encoding', options['encoding'])
+		includer.setproperty('prefetch', options.get('prefetch', 0))
+		includer.setproperty(
+			'use_precompiled', options.get('use_precompiled', False)
+		)
+		includer.setproperty('limits', dict(
+			(limit_name, options[option_name])
+			for option_name, limit_name in self._limit_names
+			if option_name in options
+		))
+
+	def _get_path(self, path):
+		"""Return the manifest path, relative to the manifest directory."""
+		return os.path.normpath(os.path.join(self._project_dir, path))
+
+	def _get_options(self, options, owner):
+		"""Checks the options of the project or of a target.
+
+		Raises:
+		    ProjectError -- If an option is incorrect
+
+		"""
+
+		if not isinstance(options, dict):
+			raise ProjectError("The options of '%s' must be a dict" % owner)
+		for name, value in options.items():
+			option_type = self._option_types.get(name)
+			if option_type is None:
+				raise ProjectError(
+					"The option '%s' of '%s' - not supported" % (name, owner)
+				)
+			if not isinstance(value, option_type) or (
+				option_type is int and (isinstance(value, bool) or value < 1)
+			):
+				raise ProjectError(
+					"The option '%s' of '%s' must be '%s'%s" % (
+						name, owner, option_type.__name__,
+						' (positive)' if option_type is int else '')
+				)
+		return dict(options)
+
+	def _get_defines(self, defines, owner):
+		"""Checks the defines of the project or of a target.
+
+		Raises:
+		    ProjectError -- If a define is incorrect
+
+		"""
+
+		if not isinstance(defines, dict) or not all(
+			isinstance(name, str) and isinstance(value, str)
+			for name, value in defines.items()
+		):
+			raise ProjectError(
+				"The defines of '%s' must be {'VAR': 'value'}" % owner
+			)
+		return dict(defines)
+
+	def _load_json(self):
+		"""Return the JSON manifest, see '_load_ini'."""
+
+		try:
+			manifest = json.loads(self.read(self._manifest_path))
+
+		except ValueError as ex:
+			raise ProjectError("The manifest is not a valid JSON: %s" % ex)
+		if not isinstance(manifest, dict):
+			raise ProjectError("The manifest must be a JSON object")
+		targets = manifest.get('targets')
+		if not isinstance(targets, list) or not all(
+			isinstance(target, dict) for target in targets
+		):
+			raise ProjectError("The manifest 'targets' must be a list of objects")
+		return {
+			'include_paths': list(manifest.get('include_paths') or ()),
+			'defines': manifest.get('defines') or {},
+			'options': manifest.get('options') or {},
+			'cache_dir': manifest.get('cache_dir'),
+			'targets': targets,
+		}
+
+	def _load_ini(self):
+		"""Return the INI manifest.
+
+		Return:
+		    value: dict -- :
+		        keys 'include_paths', 'defines', 'options',
+		        'cache_dir' and 'targets' (a list of dicts)
+
+		"""
+
+		parser = configparser.ConfigParser(interpolation=None)
+		# The defines are case-sensitive.
+		parser.optionxform = str
+		try:
+			parser.read_string(self.read(self._manifest_path), self._manifest_path)
+
+		except configparser.Error as ex:
+			raise ProjectError("The manifest is not a valid INI: %s" % ex)
+		project = parser['project'] if parser.has_section('project') else {}
+		targets = []
+		for section_name in parser.sections():
+			if not section_name.startswith('target:'):
+				continue
+			section = parser[section_name]
+			target = {
+				'name': section_name[len('target:'):].strip(),
+				'source': section.get('source'),
+				'output': section.get('output'),
+				'depfile': section.get('depfile'),
+				'defines': self._get_ini_defines(section.get('defines', '')),
+				'depends': section.get('depends', '').split(),
+				'options': self._get_ini_options(section, section_name),
+			}
+			targets.append(target)
+		defines = {}
+		if parser.has_section('defines'):
+			defines = dict(parser['defines'])
+		return {
+			'include_paths': [
+				path.strip()
+				for path in project.get('include_paths', '').splitlines()
+				if path.strip()
+			],
+			'defines': defines,
+			'options': self._get_ini_options(project, 'project'),
+			'cache_dir': project.get('cache_dir'),
+			'targets': targets,
+		}
+
+	def _get_ini_options(self, section, owner):
+		"""Return the options of the INI section, with their types."""
+
+		options = {}
+		for name, option_type in self._option_types.items():
+			if name not in section:
+				continue
+			try:
+				if option_type is bool:
+					options[name] = section.getboolean(name)
+				elif option_type is int:
+					options[name] = section.getint(name)
+				else:
+					options[name] = section.get(name)
+
+			except ValueError:
+				raise ProjectError(
+					"The option '%s' of '%s' must be '%s'" % (
+						name, owner, option_type.__name__)
+				)
+		return options
+
+	@staticmethod
+	def _get_ini_defines(value):
+		"""Return the defines of the INI value, one VAR=value per line."""
+
+		defines = {}
+		for line in value.splitlines():
+			name, _, define_value = line.strip().partition('=')
+			if name.strip():
+				defines[name.strip()] = define_value
+		return defines
+
+
+def _init_worker(project):
+	"""Initializes a worker process of 'Project.build'."""
+
+	global _worker_project
+	_worker_project = project
+
+
+def _run_worker_target(target, use_cache):
+	"""Builds the target in a worker process of 'Project.build'."""
+	return _worker_project._run_target(target, use_cache)
@@ -6,6 +6,7 @@ Are here hints for different preprocessor commands.
 """
 
 __all__ = [
+	'get_conditional_prompt',
 	'get_include_prompt',
 ]
 
@@ -19,6 +20,19 @@ _includer_prompts = {
 	-6: "The path must be quoted in quotes",
 }
 
+# Keys -1 ... -4 are the 'ConditionalRegexs' keys,
+# the others are found when the directives are evaluated.
+_conditional_prompts = {
+	-1: "The directive must be followed by a name",
+	-2: "The directive must be followed by an expression",
+	-3: "The directive must not be followed by a text",
+	-4: "The directive takes one name",
+	-5: "There is no ':#if' before the directive",
+	-6: "The ':#if' must be closed with ':#endif' in the same file",
+	-7: "The directive must not follow ':#else'",
+	-8: "The expression is incorrect",
+}
+
 
 def get_include_prompt(number):
 	"""Returns some prompt for 'Include' command.
@@ -55,4 +69,26 @@ def get_include_prompt(number):
 		raise TypeError(
 			"Param 'number' must be type 'int' not '%s'" % type(number).__name__
 		)
-	return _includer_prompts.get(number, "")
\ No newline at end of file
+	return _includer_prompts.get(number, "")
+
+def get_conditional_prompt(number):
+	"""Returns some prompt for the conditional directives.
+
+	See 'get_include_prompt'.
+
+	Args:
+	    number: int -- Regular expression number, or an error number
+	
+	Return:
+	    value: str -- the prompt, or '' if it is not found
+	
+	Raises:
+	    TypeError -- If incorrectly parameter types.
+	
+	"""
+	
+	if not isinstance(number, int):
+		raise TypeError(
+			"Param 'number' must be type 'int' not '%s'" % type(number).__name__
+		)
+	return _conditional_prompts.get(number, "")
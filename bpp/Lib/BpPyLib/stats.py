@@ -0,0 +1,254 @@
+"""Build statistics, the '--stats' and '--trace' params.
+
+The includer reports spans (begin / end) to 'BuildStats':
+one span per expanded file, and one per phase inside it -
+reading files, 'syntax_analyze', 'IncluderCore.absolutize',
+environment expansion.
+The time of a span is exclusive, without its nested spans,
+so the own time of a file span is the splicing of its document.
+
+The includer checks its 'stats' property before every report,
+so without the statistics the overhead is one check per span.
+
+"""
+
+import json
+import os
+import threading
+import time
+
+__all__ = [
+	'BuildStats',
+]
+
+
+class BuildStats:
+	"""Collects the phase timings and the counters of one build.
+
+	Only the thread that created the object is measured,
+	the prefetch threads are not (their reads are the waits of this one).
+
+	Constructor:
+	    trace: bool -- keep the spans for 'save_trace'
+
+	#### Example ####
+	>>> stats = BuildStats(trace=True)
+	>>> includer.setproperty('stats', stats)
+	>>> includer.expand_document(source)
+	>>> print(stats.format_report(includer.get_cache_stats()))
+	>>> stats.save_trace('trace.json')
+
+	"""
+
+	# 'setup' is the creation of the preprocessor,
+	# it reads the source and compiles the regexs,
+	# 'cache_check' is the check of the build cache,
+	# 'shake' is the tree shaking ('--tree-shake').
+	phases = (
+		'setup', 'cache_check', 'read', 'absolutize', 'syntax_analyze', 'environ', 'splice',
+		'shake', 'write',
+	)
+
+	def __init__(self, trace=False):
+		self._clock = time.perf_counter
+		self._thread_id = threading.get_ident()
+		self._start_time = self._clock()
+		self._end_time = None
+		# [name, file path, start time, nested time]
+		self._stack = []
+		self._phase_times = dict.fromkeys(self.phases, 0.0)
+		# {real path: [own time, total time, expansions count]}
+		self._file_times = {}
+		self._counters = {
+			'includes': 0,
+			'files_read': 0,
+			'bytes_read': 0,
+			'bytes_written': 0,
+			'labels_removed': 0,
+			'files_checked': 0,
+		}
+		self._is_up_to_date = False
+		# Chrome trace events, or None.
+		self._events = [] if trace else None
+
+	def __repr__(self):
+		repr_text = "BuildStats(trace=%s)" % (self._events is not None)
+		return repr_text
+
+	def begin(self, name, file_path=None):
+		"""Starts the span.
+
+		Args:
+		    name: str -- a phase name (see 'phases'), or 'file'
+		    file_path: str -- the file of the span
+
+		"""
+
+		if threading.get_ident() != self._thread_id:
+			return None
+		self._stack.append([name, file_path, self._clock(), 0.0])
+
+	def end(self):
+		"""Ends the last started span."""
+
+		if threading.get_ident() != self._thread_id:
+			return None
+		end_time = self._clock()
+		name, file_path, start_time, nested_time = self._stack.pop()
+		elapsed = end_time - start_time
+		own_time = elapsed - nested_time
+		if self._stack:
+			self._stack[-1][3] += elapsed
+		if name == 'file':
+			self._phase_times['splice'] += own_time
+			file_times = self._file_times.setdefault(file_path, [0.0, 0.0, 0])
+			file_times[0] += own_time
+			file_times[1] += elapsed
+			file_times[2] += 1
+		else:
+			self._phase_times[name] += own_time
+		if self._events is not None:
+			event = {
+				'name': os.path.basename(file_path) if name == 'file' else name,
+				'cat': 'file' if name == 'file' else 'phase',
+				'ph': 'X',
+				'ts': (start_time - self._start_time) * 10**6,
+				'dur': elapsed * 10**6,
+				'pid': 1,
+				'tid': 1,
+			}
+			if file_path is not None:
+				event['args'] = {'path': file_path}
+			self._events.append(event)
+
+	def count(self, name, value=1):
+		"""Adds the value to the counter.
+
+		Args:
+		    name: str -- :
+		        'includes', 'files_read', 'bytes_read', 'bytes_written',
+		        'labels_removed' or 'files_checked' (by the build cache)
+		    value: int -- the added value
+
+		"""
+
+		if threading.get_ident() == self._thread_id:
+			self._counters[name] += value
+
+	def set_up_to_date(self):
+		"""Marks the build as up to date, nothing is expanded."""
+		self._is_up_to_date = True
+
+	def is_up_to_date(self):
+		"""Return True if the build is up to date, see 'set_up_to_date'."""
+		return self._is_up_to_date
+
+	def stop(self):
+		"""Stops the build time, 'format_report' calls it if it is not stopped."""
+
+		if self._end_time is None:
+			self._end_time = self._clock()
+
+	def get_phase_times(self):
+		"""Return {phase name: exclusive time (seconds)}."""
+		return dict(self._phase_times)
+
+	def get_counters(self):
+		"""Return {counter name: value}, see 'count'."""
+		return dict(self._counters)
+
+	def get_slowest_files(self, count=10):
+		"""Return the files with the longest own time.
+
+		Return:
+		    value: list -- :
+		        tuples (real path, own time, total time, expansions count),
+		        the times are in seconds
+
+		"""
+
+		files = sorted(
+			self._file_times.items(), key=lambda item: item[1][0], reverse=True
+		)
+		return [(file_path,) + tuple(times) for file_path, times in files[:count]]
+
+	def format_report(self, cache_stats=None, files_count=10):
+		"""Return the statistics as text.
+
+		Args:
+		    cache_stats: dict -- see 'Includer.get_cache_stats'
+		    files_count: int -- how many slowest files are listed
+
+		"""
+
+		self.stop()
+		total_time = self._end_time - self._start_time
+		if self._is_up_to_date:
+			lines = ['Build statistics (up to date, nothing expanded):']
+		else:
+			lines = ['Build statistics:']
+		lines.append('    %-16s %9.1f ms' % ('total', total_time * 1000))
+		phases_time = 0.0
+		for name in self.phases:
+			phase_time = self._phase_times[name]
+			phases_time += phase_time
+			lines.append('    %-16s %9.1f ms %6.1f%%' % (
+				name, phase_time * 1000, _get_percent(phase_time, total_time)
+			))
+		other_time = max(total_time - phases_time, 0.0)
+		lines.append('    %-16s %9.1f ms %6.1f%%' % (
+			'other', other_time * 1000, _get_percent(other_time, total_time)
+		))
+		counters = self._counters
+		lines.append('    %-16s %9s' % ('includes', counters['includes']))
+		lines.append('    %-16s %9s' % ('files read', counters['files_read']))
+		lines.append('    %-16s %9s' % ('bytes read', counters['bytes_read']))
+		lines.append('    %-16s %9s' % ('bytes written', counters['bytes_written']))
+		if counters['files_checked']:
+			lines.append('    %-16s %9s' % ('files checked', counters['files_checked']))
+		if counters['labels_removed']:
+			lines.append('    %-16s %9s' % ('labels removed', counters['labels_removed']))
+		if cache_stats is not None:
+			lookups = cache_stats['hits'] + cache_stats['misses']
+			lines.append('    %-16s %9s hits, %s misses (%.1f%% hit rate), %s skipped' % (
+				'cache', cache_stats['hits'], cache_stats['misses'],
+				_get_percent(cache_stats['hits'], lookups), cache_stats['skipped'],
+			))
+		slowest_files = self.get_slowest_files(files_count)
+		if slowest_files:
+			lines.append('Slowest files (own time, total time, expansions):')
+		for file_path, own_time, file_time, expansions in slowest_files:
+			lines.append('    %9.1f ms %9.1f ms %4s  %s' % (
+				own_time * 1000, file_time * 1000, expansions, file_path
+			))
+		return '\n'.join(lines)
+
+	def save_trace(self, file_path):
+		"""Saves the spans as Chrome trace events (JSON).
+
+		The file opens in 'chrome://tracing' or 'https://ui.perfetto.dev',
+		the spans of the included files are nested as the includes.
+
+		Args:
+		    file_path: str -- the trace file path
+
+		Raises:
+		    ValueError -- if the object is created without 'trace'
+
+		"""
+
+		if self._events is None:
+			raise ValueError("The spans are not kept, see 'trace'")
+		trace = {
+			'traceEvents': sorted(
+				self._events, key=lambda event: (event['ts'], -event['dur'])
+			),
+			'displayTimeUnit': 'ms',
+		}
+		with open(file_path, 'w') as file:
+			json.dump(trace, file)
+
+
+def _get_percent(value, total):
+	"""Return the value percent of the total, 0 if the total is 0."""
+	return value / total * 100 if total else 0.0
@@ -7,10 +7,18 @@ But you can also define subclasses if needed.
 
 """
 
-import copy
+import codecs
+import os
+
+from .utils import (
+	get_file_encoding,
+)
 
 __all__ = [
 	'frozendict',
+	'DirectiveToken',
+	'Document',
+	'MappedFile',
 ]
 
 
@@ -137,6 +145,8 @@ class frozendict(dict):
 			hash(self)
 			
 		except TypeError:
+			import copy
+
 			dict_object = copy.deepcopy(dict(self))
 			return type(self)(dict_object)
 		
@@ -210,4 +220,315 @@ class frozendict(dict):
 	
 	def popitem(self, *args, **kwargs):
 		"""Not supported."""
-		_immutable(self)
\ No newline at end of file
+		_immutable(self)
+
+
+class DirectiveToken:
+	"""Token of one preprocessor directive line.
+
+	DirectiveToken(kind, key, line, column, start, end, text) -> token
+
+	The tokens are produced by 'IncluderTokenizer'.
+	It is a compact object ('__slots__'),
+	a file can have a lot of them.
+
+	Attributes:
+	    kind: str -- :
+	        'include' is :#include "some.bat",
+	        'environ' is :#include "%some_path%\some.bat",
+	        'pragma' is :#pragma once,
+	        'error' is an incorrect 'include' expression,
+	        'define', 'undef', 'ifdef', 'ifndef', 'if', 'elif', 'else', 'endif' -
+	        are the conditional directives,
+	        'conditional_error' is an incorrect conditional directive
+	    key: int -- :
+	        the regex key that matched,
+	        see 'IncluderRegexs' and 'ConditionalRegexs'
+	    line: int -- line number, starting with one
+	    column: int -- column of ':#', starting with one
+	    start: int -- start offset of the directive in the source
+	    end: int -- end offset of the directive in the source
+	    text: str -- the directive expression
+	    path: str -- the included path, or None
+	    path_start: int -- start offset of the path in the source, or None
+	    path_end: int -- end offset of the path in the source, or None
+	    name: str -- the name of a conditional directive, or None
+	    value: str -- :
+	        the value of ':#define',
+	        or the expression of ':#if' and ':#elif', or None
+
+	"""
+
+	__slots__ = (
+		'kind', 'key', 'line', 'column', 'start', 'end', 'text',
+		'path', 'path_start', 'path_end', 'name', 'value',
+	)
+
+	def __init__(self, kind, key, line, column, start, end, text):
+		self.kind = kind
+		self.key = key
+		self.line = line
+		self.column = column
+		self.start = start
+		self.end = end
+		self.text = text
+		self.path = None
+		self.path_start = None
+		self.path_end = None
+		self.name = None
+		self.value = None
+
+	def __repr__(self):
+		repr_text = "DirectiveToken(kind=%r, key=%r, line=%r, column=%r, text=%r)" % (
+			self.kind, self.key, self.line, self.column, self.text
+		)
+		return repr_text
+
+
+class Document:
+	"""Rope of text segments.
+
+	Document() -> empty document
+	Document(segments) -> document of the segments
+
+	A segment is a 'str' or another 'Document'.
+	The text is never copied into one string -
+	until it is needed, with 'join' or 'str'.
+	A nested document can be a segment of many documents,
+	so the same included file is stored only once.
+
+	A segment can also be a 'memoryview' -
+	raw bytes of a mapped file, copied as they are.
+	Its size is counted in bytes,
+	and it is decoded only when the text is needed.
+
+	#### Examples ####
+	>>> doc = Document(['echo 1\\n'])
+	>>> doc.append(Document(['echo 2\\n', 'echo 3\\n']))
+	>>> len(doc)
+	21
+	>>> doc.join()
+	'echo 1\\necho 2\\necho 3\\n'
+	>>> list(doc)
+	['echo 1\\n', 'echo 2\\n', 'echo 3\\n']
+
+	"""
+
+	__slots__ = ('_segments', '_size', '_byte_size')
+
+	def __init__(self, segments=()):
+		self._segments = []
+		self._size = 0
+		# [encoding, newline, byte size, counted segments], see 'get_byte_size'.
+		self._byte_size = None
+		for segment in segments:
+			self.append(segment)
+
+	def __repr__(self):
+		repr_text = "Document(size=%s, segments=%s)" % (
+			self._size, len(self._segments)
+		)
+		return repr_text
+
+	def __len__(self):
+		"""Return the text size, it is not computed again."""
+		return self._size
+
+	def __iter__(self):
+		"""Yields the chunks ('str' or 'memoryview') in order.
+
+		Nested documents are walked without recursion,
+		so the nesting depth is not limited.
+
+		"""
+
+		stack = [iter(self._segments)]
+		while stack:
+			for segment in stack[-1]:
+				if isinstance(segment, Document):
+					stack.append(iter(segment._segments))
+					break
+				yield segment
+			else:
+				stack.pop()
+
+	def __str__(self):
+		"""Return the whole text."""
+		return self.join()
+
+	def append(self, segment):
+		"""Appends the segment ('str' or 'Document') to the end.
+
+		Empty segments are not stored.
+
+		Raises:
+		    TypeError -- If incorrect types
+
+		"""
+
+		if not isinstance(segment, (str, Document, memoryview)):
+			raise TypeError(
+				"Param 'segment' must be 'str', 'Document' or 'memoryview', "
+				"not '%s'" % type(segment).__name__
+			)
+		if isinstance(segment, memoryview):
+			segment = segment.cast('B')
+		if segment:
+			self._segments.append(segment)
+			self._size += len(segment)
+
+	def get_byte_size(self, encoding=None, newline=None):
+		"""Return the size of the document in bytes, as 'iter_bytes' yields it.
+
+		The size is kept, a document only grows,
+		so the next call counts only the segments appended after it.
+
+		Args:
+		    encoding: str -- see 'iter_bytes'
+		    newline: str -- see 'iter_bytes'
+
+		"""
+
+		encoding = encoding or get_file_encoding()
+		newline = newline or os.linesep
+		byte_size = self._byte_size
+		if byte_size is None or byte_size[:2] != [encoding, newline]:
+			byte_size = self._byte_size = [encoding, newline, 0, 0]
+		extra_size = len(newline) - 1
+		for segment in self._segments[byte_size[3]:]:
+			if isinstance(segment, Document):
+				byte_size[2] += segment.get_byte_size(encoding, newline)
+			elif isinstance(segment, str):
+				byte_size[2] += len(
+					segment.encode(encoding, 'surrogateescape')
+				) + segment.count('\n') * extra_size
+			else:
+				byte_size[2] += len(segment)
+		byte_size[3] = len(self._segments)
+		return byte_size[2]
+
+	def iter_text(self, encoding=None):
+		"""Yields the text chunks ('str') in order.
+
+		The bytes are decoded as a file opened in text mode -
+		with the 'encoding' and with '\\r\\n' turned into '\\n'.
+
+		Args:
+		    encoding: str -- encoding of the bytes, the files encoding by default
+
+		"""
+
+		encoding = encoding or get_file_encoding()
+		for chunk in self:
+			if isinstance(chunk, memoryview):
+				chunk = str(chunk, encoding).replace('\r\n', '\n')
+			yield chunk
+
+	def iter_bytes(self, encoding=None, newline=None):
+		"""Yields the chunks as bytes, in order.
+
+		The text is encoded as a file opened in text mode -
+		with the 'encoding' and with '\\n' turned into the 'newline'.
+		The bytes ('memoryview') are yielded as they are, without copying.
+
+		Args:
+		    encoding: str -- the output encoding, the files encoding by default
+		    newline: str -- the output line ending, 'os.linesep' by default
+
+		"""
+
+		encoding = encoding or get_file_encoding()
+		newline = newline or os.linesep
+		for chunk in self:
+			if isinstance(chunk, str):
+				chunk = chunk.replace('\n', newline).encode(
+					encoding, 'surrogateescape'
+				)
+			yield chunk
+
+	def join(self, encoding=None):
+		"""Return the whole text, as one string.
+
+		Args:
+		    encoding: str -- encoding of the bytes, see 'iter_text'
+
+		"""
+
+		return ''.join(self.iter_text(encoding))
+
+
+class MappedFile:
+	"""Bytes of a mapped file.
+
+	MappedFile(buffer) -> mapped included file
+	MappedFile(buffer, False) -> mapped source file
+
+	An included file is wrapped with a space on each side,
+	so the offsets are shifted by one -
+	0 is the leading space, and the last offset is the trailing space.
+	The UTF-8 BOM of an included file is not in the slices -
+	it would be in the middle of the output, only the source keeps it.
+	A slice is a 'memoryview' of the buffer, the bytes are not copied.
+	A slice with the spaces is a 'Document'.
+
+	#### Example ####
+	>>> mapped_file = MappedFile(b'echo 1\r\n')
+	>>> len(mapped_file)
+	10
+	>>> bytes(mapped_file[1:7])
+	b'echo 1'
+	>>> mapped_file[0:10].join()
+	' echo 1\n '
+
+	"""
+
+	__slots__ = ('_buffer', '_view', '_shift', '_bom_size')
+
+	def __init__(self, buffer, is_included=True):
+		self._buffer = buffer
+		self._view = memoryview(buffer)
+		self._shift = 1 if is_included else 0
+		self._bom_size = 0
+		if is_included and buffer[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8:
+			self._bom_size = len(codecs.BOM_UTF8)
+
+	def __repr__(self):
+		repr_text = "MappedFile(size=%s, is_included=%s)" % (
+			len(self._view), bool(self._shift)
+		)
+		return repr_text
+
+	def __len__(self):
+		"""Return the size in bytes, with the spaces."""
+		return len(self._view) + 2 * self._shift
+
+	def __getitem__(self, key):
+		"""Return the slice, 'memoryview' or 'Document'.
+
+		Raises:
+		    TypeError -- If the key is not a slice
+		    ValueError -- If the slice step is not 1
+
+		"""
+
+		if not isinstance(key, slice):
+			raise TypeError("Only slices of 'MappedFile' are supported")
+		start, stop, step = key.indices(len(self))
+		if step != 1:
+			raise ValueError("The slice step of 'MappedFile' must be 1")
+		if stop <= start:
+			return ''
+		shift = self._shift
+		size = len(self._view)
+		view = self._view[max(start - shift, self._bom_size):min(stop - shift, size)]
+		if not shift or (start > 0 and stop < size + 2):
+			return view
+		return Document([
+			' ' if start == 0 else '',
+			view,
+			' ' if stop == size + 2 else '',
+		])
+
+	def count_lines(self, offset):
+		"""Return the line number of the offset."""
+		return bytes(self._view[:max(offset - self._shift, 0)]).count(b'\n') + 1
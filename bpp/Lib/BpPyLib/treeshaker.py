@@ -0,0 +1,258 @@
+"""Label-level tree shaking, the '--tree-shake' param.
+
+A batch library (a .hbat file) defines many ':label' functions,
+a script calls a few of them, but cmd.exe scans the file -
+for every 'call :label' and 'goto', so each unused function slows every call.
+
+The preprocessed text is split into blocks,
+a block starts at a label, at a banner of an included file -
+or at a safe region marker, and ends before the next one.
+cmd.exe runs the blocks one after another, so a block is reachable -
+if a reachable block refers to its label ('call :name', 'goto name'),
+or if the block before it is reachable and does not end with 'exit' or 'goto'.
+The blocks of the entry script are reachable,
+only the unreachable blocks of the included files are removed.
+
+A dynamic reference ('call :%fn%') keeps the labels with its literal prefix,
+'call :lib_%fn%' keeps every ':lib_*' label.
+A dynamic reference without a prefix can call any label,
+so the text is not shaken, unless an allow-list of labels is given -
+it must list the labels called dynamically.
+
+The blocks of a safe region are kept, the region is between -
+':: bpp: shake off' and ':: bpp: shake on' (or the end of the file).
+
+"""
+
+import fnmatch
+import re
+
+__all__ = [
+	'TreeShaker',
+	'get_label_names',
+]
+
+
+class TreeShaker:
+	"""Removes the unreachable label blocks of the included files.
+
+	Constructor:
+	    keep_labels: list -- :
+	        the allow-list, label names or 'fnmatch' patterns ('lib_*'),
+	        the labels are kept as if they were called
+	    comment_symbol: str -- the comment symbol of the banners
+
+	#### Example ####
+	>>> shaker = TreeShaker(['on_event_*'])
+	>>> text = shaker.shake(preprocessor.get_document().join())
+	>>> shaker.get_report()['labels']
+	['unused_function']
+
+	"""
+
+	_label_regex = re.compile(r'[ \t]*:([^\s:+&|<>()=;,"^%!]+)')
+	_reference_regex = re.compile(
+		r'(?:\bcall[ \t]*:|\bgoto[ \t]*:?)[ \t]*([^\s:+&|<>()=;,"^]+)', re.I
+	)
+	_exit_regex = re.compile(r'[ \t]*@?[ \t]*(?:exit|goto)\b', re.I)
+	_rem_regex = re.compile(r'[ \t]*@?[ \t]*rem\b', re.I)
+
+	def __init__(self, keep_labels=None, comment_symbol='::'):
+		self._keep_labels = [
+			label.lstrip(':').lower() for label in keep_labels or ()
+		]
+		self._comment_symbol = comment_symbol
+		self._begin_banner = comment_symbol + '-'*30 + '('
+		self._end_banner = comment_symbol + '-'*30 + ')'
+		self._marker_regex = re.compile(
+			r'[ \t]*%s[ \t]*bpp:[ \t]*shake[ \t]+(off|on)[ \t]*$' % (
+				re.escape(comment_symbol),
+			),
+			re.I,
+		)
+		self._report = None
+
+	def __repr__(self):
+		repr_text = "TreeShaker(keep_labels=%s, comment_symbol=%s)" % (
+			self._keep_labels, self._comment_symbol
+		)
+		return repr_text
+
+	def get_report(self):
+		"""Return the report of the last 'shake'.
+
+		Return:
+		    value: dict -- :
+		        'labels' is the list of the removed labels,
+		        'lines' is the count of the removed lines,
+		        'dynamic' is the line of the dynamic reference -
+		        that stopped the shaking, or None
+
+		"""
+
+		return self._report
+
+	def shake(self, text):
+		"""Return the text without the unreachable label blocks.
+
+		Args:
+		    text: str -- the preprocessed text, with the banners of the includes
+
+		"""
+
+		lines = text.split('\n')
+		blocks = self._get_blocks(lines)
+		labels = {}
+		for index, block in enumerate(blocks):
+			if block[2] is not None:
+				labels.setdefault(block[2], []).append(index)
+		reachable = [False] * len(blocks)
+		stack = [index for index, block in enumerate(blocks) if block[3]]
+		while stack:
+			index = stack.pop()
+			if reachable[index]:
+				continue
+			reachable[index] = True
+			start, end = blocks[index][:2]
+			for line_index in range(start, end):
+				for label in self._get_references(lines[line_index]):
+					if '%' not in label and '!' not in label:
+						stack.extend(labels.get(label, ()))
+						continue
+					prefix = re.split('[%!]', label, 1)[0]
+					if not prefix and not self._keep_labels:
+						self._report = {
+							'labels': [], 'lines': 0, 'dynamic': lines[line_index].strip(),
+						}
+						return text
+					if prefix:
+						for name, indexes in labels.items():
+							if name.startswith(prefix):
+								stack.extend(indexes)
+			if index + 1 < len(blocks) and not self._is_exit(lines, start, end):
+				stack.append(index + 1)
+		removed_labels = []
+		removed_lines = 0
+		kept_lines = []
+		for index, (start, end, label, _) in enumerate(blocks):
+			if reachable[index]:
+				kept_lines.extend(lines[start:end])
+				continue
+			# The banners stay paired, and framed as the includer writes them:
+			# a blank line after the begin banner and before the end banner.
+			if lines[start] in (self._begin_banner, self._end_banner):
+				kept_lines.append(lines[start])
+				start += 1
+				is_begin = lines[start - 1] == self._begin_banner
+				if is_begin and start < end and not lines[start]:
+					kept_lines.append(lines[start])
+					start += 1
+			tail_lines = []
+			is_end = end < len(lines) and lines[end] == self._end_banner
+			if is_end and start < end and not lines[end - 1]:
+				tail_lines.append(lines[end - 1])
+				end -= 1
+			removed_lines += end - start
+			kept_lines.extend(tail_lines)
+			if label is not None and label not in removed_labels:
+				removed_labels.append(label)
+		self._report = {
+			'labels': removed_labels, 'lines': removed_lines, 'dynamic': None,
+		}
+		if not removed_lines:
+			return text
+		return '\n'.join(kept_lines)
+
+	def _get_blocks(self, lines):
+		"""Return the blocks of the lines.
+
+		Return:
+		    value: list -- :
+		        tuples (start line, end line, label or None, is kept),
+		        the label is lowercase,
+		        a block is kept if it is in the entry script,
+		        in a safe region, or its label is in the allow-list
+
+		"""
+
+		comment_symbol = self._comment_symbol
+		blocks = []
+		# The safe flags of the enclosing files.
+		safe_stack = []
+		is_safe = False
+		start = 0
+		label = None
+		is_kept = True
+		for index, line in enumerate(lines):
+			new_label = None
+			if line.lstrip().startswith(comment_symbol):
+				if line == self._begin_banner:
+					# The included file is safe if it is included in a safe region.
+					safe_stack.append(is_safe)
+				elif line == self._end_banner and safe_stack:
+					is_safe = safe_stack.pop()
+				else:
+					marker_match = self._marker_regex.match(line)
+					if marker_match is None:
+						continue
+					is_safe = marker_match.group(1).lower() == 'off'
+			else:
+				label_match = self._label_regex.match(line)
+				if label_match is None:
+					continue
+				new_label = label_match.group(1).lower()
+			if index > start:
+				blocks.append((start, index, label, is_kept))
+			start = index
+			label = new_label
+			is_kept = not safe_stack or is_safe or self._is_kept_label(label)
+		blocks.append((start, len(lines), label, is_kept))
+		return blocks
+
+	def _is_kept_label(self, label):
+		"""Return True if the label is in the allow-list."""
+
+		if label is None:
+			return False
+		for pattern in self._keep_labels:
+			if fnmatch.fnmatchcase(label, pattern):
+				return True
+		return False
+
+	def _get_references(self, line):
+		"""Return the lowercase labels of 'call' and 'goto' in the line."""
+
+		lowered_line = line.lower()
+		if 'call' not in lowered_line and 'goto' not in lowered_line:
+			return ()
+		if lowered_line.lstrip().startswith(self._comment_symbol):
+			return ()
+		return [
+			label for label in self._reference_regex.findall(lowered_line)
+			if label != 'eof'
+		]
+
+	def _is_exit(self, lines, start, end):
+		"""Return True if the last command of the block is 'exit' or 'goto'.
+
+		Blank lines, comments and labels are skipped,
+		a line after a continuation ('^') is a part of the line before it.
+
+		"""
+
+		for index in range(end - 1, start - 1, -1):
+			line = lines[index]
+			stripped_line = line.strip()
+			if not stripped_line or stripped_line.startswith(self._comment_symbol):
+				continue
+			if self._rem_regex.match(line) or self._label_regex.match(line):
+				continue
+			if index > start and lines[index - 1].rstrip().endswith('^'):
+				return False
+			return self._exit_regex.match(line) is not None
+		return False
+
+
+def get_label_names(value):
+	"""Return the labels of the comma separated value ('on_*, main')."""
+	return [name.strip() for name in value.split(',') if name.strip()]
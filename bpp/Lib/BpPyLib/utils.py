@@ -1,10 +1,18 @@
 """Utilities"""
 
+import codecs
+import mmap
 import os
 
 __all__ = [
+	'LazyRegexs',
 	'chdir_to_filedir',
+	'detect_encoding',
+	'detect_newline',
+	'get_error_message',
+	'get_file_encoding',
 	'get_temp_dir',
+	'map_file',
 ]
 
 
@@ -29,6 +37,23 @@ def chdir_to_filedir(file_path):
 	return file_dirname
 
 
+def get_error_message(ex):
+	"""Return the message of the 'BPPError' or 'OSError' exception.
+
+	An 'OSError' is its description and the file ('File exists: 'out'),
+	without the error number.
+
+	"""
+
+	if isinstance(ex, OSError) and ex.strerror is not None:
+		error_message = ex.strerror
+	else:
+		error_message = '\n'.join(map(str, ex.args))
+	if isinstance(ex, OSError) and ex.filename is not None:
+		error_message += ": '%s'" % ex.filename
+	return error_message
+
+
 def get_temp_dir():
 	"""Return Temp directory path."""
 	
@@ -38,4 +63,128 @@ def get_temp_dir():
 		tmp_dir = os.getenv('TMPDIR', os.curdir)
 	else:
 		tmp_dir = os.getenv('TMP', os.curdir)
-	return tmp_dir
\ No newline at end of file
+	return tmp_dir
+
+
+def get_file_encoding():
+	"""Return the encoding of files opened in text mode."""
+
+	import locale
+
+	return locale.getpreferredencoding(False)
+
+
+def map_file(file_path):
+	"""Maps the file into memory, for reading.
+	
+	Args:
+	    file_path: str -- file path
+	
+	Return:
+	    value: mmap or bytes -- file map, an empty file is empty bytes
+	
+	Raises:
+	    OSError -- If problem in operating system
+
+	"""
+
+	with open(file_path, 'rb') as file:
+		if os.fstat(file.fileno()).st_size == 0:
+			return b''
+		return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def detect_encoding(buffer, default=None):
+	"""Detects the encoding of the file bytes.
+
+	A file with the UTF-8 BOM, or with valid non-ASCII UTF-8, is 'utf-8'.
+	Otherwise it is the 'default' code page (cp866, cp1251 ...etc),
+	it cannot be told from the bytes.
+	The file is checked in parts, it is not decoded entirely.
+	
+	Args:
+	    buffer: mmap or bytes -- file value
+	    default: str -- :
+	        the code page of other files,
+	        the encoding of files opened in text mode by default
+	
+	Return:
+	    value: str -- encoding name
+
+	"""
+
+	default = default or get_file_encoding()
+	if buffer[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8:
+		return 'utf-8'
+	decoder = codecs.getincrementaldecoder('utf-8')()
+	part_size = 1 << 20
+	is_ascii = True
+	try:
+		for position in range(0, len(buffer), part_size):
+			part = buffer[position:position + part_size]
+			decoder.decode(part)
+			is_ascii = is_ascii and part.isascii()
+		decoder.decode(b'', True)
+
+	except UnicodeDecodeError:
+		return default
+	return default if is_ascii else 'utf-8'
+
+
+def detect_newline(buffer):
+	"""Return the line ending of the file bytes ('\\r\\n' or '\\n').
+
+	It is the ending of the first line,
+	a file without lines has the ending of the system.
+
+	"""
+
+	position = buffer.find(b'\n')
+	if position == -1:
+		return os.linesep
+	if position > 0 and buffer[position - 1:position] == b'\r':
+		return '\r\n'
+	return '\n'
+
+
+class LazyRegexs:
+	"""Regular expressions of a class, compiled on first use.
+
+	A descriptor, the class attribute is the compiled regex -
+	(or a dict of them), but nothing is compiled at the import.
+	
+	Constructor:
+	    patterns: str or dict -- the pattern, or {key: pattern}
+	    flags: int -- the 're' flags
+
+	#### Example ####
+	>>> class Regexs:
+	...     number = LazyRegexs(r'\\d+')
+	>>> Regexs.number.findall('1 and 22')
+	['1', '22']
+
+	"""
+
+	def __init__(self, patterns, flags=0):
+		self._patterns = patterns
+		self._flags = flags
+		self._regexs = None
+
+	def __repr__(self):
+		repr_text = "LazyRegexs(patterns=%r)" % (self._patterns,)
+		return repr_text
+
+	def __get__(self, instance, owner=None):
+		regexs = self._regexs
+		if regexs is None:
+			import re
+
+			if isinstance(self._patterns, dict):
+				regexs = {
+					key: re.compile(pattern, self._flags)
+					for key, pattern in self._patterns.items()
+				}
+			else:
+				regexs = re.compile(self._patterns, self._flags)
+			self._regexs = regexs
+		return regexs
@@ -0,0 +1,343 @@
+"""Watch mode, rebuilds the outputs when their files change.
+
+The include graph of every target is kept in memory,
+with a reverse index (file -> targets that depend on it).
+When a file changes, only the targets that depend on it are rebuilt,
+and only the changed files are read again.
+
+The changes are found by the file stats (modification time and size).
+The stats are checked every 'interval' seconds,
+or at once when the system notifies about a change in a watched directory
+(inotify on Linux, change notifications on Windows).
+
+"""
+
+import ctypes
+import os
+import select
+import time
+
+__all__ = [
+	'Watcher',
+]
+
+
+class Watcher:
+	"""Rebuilds the targets of the project when their files change.
+
+	Constructor:
+	    project: Project -- the project to build
+	    names: list -- names of the targets to watch, None is all
+	    interval: float -- seconds between the stat checks
+	    use_cache: bool -- see 'Project.build'
+	    jobs: int -- see 'Project.build'
+
+	#### Example ####
+	>>> watcher = Watcher(Project('bpp.json'), interval=0.2)
+	>>> watcher.run(lambda results, changed_files: print(results))
+
+	"""
+
+	def __init__(self, project, names=None, interval=0.5, use_cache=True, jobs=1):
+		self._project = project
+		self._targets = project.get_build_order(names)
+		self._names = [target['name'] for target in self._targets]
+		self._interval = interval
+		self._use_cache = use_cache
+		self._jobs = jobs
+		# {target name: real paths of its files}
+		self._target_files = {}
+		# {real path: names of the targets that depend on the file}
+		self._dependents = {}
+		# {real path: (mtime, size) or None}
+		self._file_stats = {}
+		# Targets to build on the next change, they failed or were not built.
+		self._failed_names = set()
+		self._notifier = None
+		self._directories = set()
+		self._is_running = False
+
+	def __repr__(self):
+		repr_text = "Watcher(project=%s, interval=%s)" % (
+			self._project, self._interval
+		)
+		return repr_text
+
+	def run(self, callback=None):
+		"""Builds the targets, and rebuilds them on changes, until 'stop'.
+
+		Args:
+		    callback: callable -- :
+		        callback(results, changed_files) after every build,
+		        results are the ones of 'Project.build',
+		        changed_files is a list of real paths (empty at first)
+
+		"""
+
+		self._is_running = True
+		results = self.build()
+		if callback is not None:
+			callback(results, [])
+		try:
+			while self._is_running:
+				is_notified = self._wait()
+				changed_files = self.get_changed_files()
+				# A failed target may need a new file, it is not watched yet.
+				while changed_files or (is_notified and self._failed_names):
+					results = self.rebuild(changed_files)
+					if callback is not None:
+						callback(results, changed_files)
+					# The new outputs may be included by the other targets.
+					changed_files = self.get_changed_files()
+					is_notified = False
+
+		finally:
+			self._close_notifier()
+		return None
+
+	def stop(self):
+		"""Stops 'run' after the current wait."""
+		self._is_running = False
+
+	def build(self, names=None):
+		"""Builds the targets and updates the include graph.
+
+		Args:
+		    names: list -- names of the targets, None is all watched
+
+		Return:
+		    value: list -- see 'Project.build'
+
+		"""
+
+		if names is None:
+			names = self._names
+		results = self._project.build(
+			names, self._use_cache, self._jobs, raise_errors=False
+		)
+		failed_names = set(names)
+		for result in results:
+			if result['error'] is None:
+				failed_names.discard(result['name'])
+				self._set_target_files(result['name'], result['dependencies'])
+		self._failed_names -= set(names) - failed_names
+		for name in failed_names:
+			self._set_failed(name)
+		return results
+
+	def _set_failed(self, name):
+		"""Marks the target as failed (or not built) after an error.
+
+		Its source is watched, with the files it had before.
+
+		"""
+
+		self._failed_names.add(name)
+		source = [
+			target['source'] for target in self._targets if target['name'] == name
+		]
+		self._set_target_files(name, self._target_files.get(name, set()) | set(
+			os.path.realpath(file_path) for file_path in source
+		))
+
+	def rebuild(self, changed_files):
+		"""Rebuilds the targets affected by the changed files.
+
+		Args:
+		    changed_files: list -- real paths of the changed files
+
+		Return:
+		    value: list -- see 'Project.build'
+
+		"""
+
+		for file_path in changed_files:
+			self._project.forget_file(file_path)
+		names = self.get_affected_targets(changed_files)
+		return self.build(names)
+
+	def get_affected_targets(self, changed_files):
+		"""Return the names of the targets to rebuild, in the build order.
+
+		Those that depend on the changed files,
+		and those that failed before (a new file may fix them).
+
+		Args:
+		    changed_files: list -- real paths of the changed files
+
+		"""
+
+		names = set(self._failed_names)
+		for file_path in changed_files:
+			names.update(self._dependents.get(file_path, ()))
+		return [name for name in self._names if name in names]
+
+	def get_changed_files(self):
+		"""Return real paths of the watched files changed since the last call."""
+
+		changed_files = []
+		for file_path, file_stat in list(self._file_stats.items()):
+			new_stat = self._get_file_stat(file_path)
+			if new_stat != file_stat:
+				self._file_stats[file_path] = new_stat
+				changed_files.append(file_path)
+		return changed_files
+
+	def get_dependents(self, file_path):
+		"""Return the names of the targets that depend on the file."""
+		return sorted(self._dependents.get(os.path.realpath(file_path), ()))
+
+	def _set_target_files(self, name, files):
+		"""Sets the files of the target in the include graph."""
+
+		for file_path in self._target_files.get(name, ()):
+			dependents = self._dependents.get(file_path)
+			if dependents is not None:
+				dependents.discard(name)
+				if not dependents:
+					del self._dependents[file_path]
+		files = set(os.path.realpath(file_path) for file_path in files)
+		self._target_files[name] = files
+		for file_path in files:
+			self._dependents.setdefault(file_path, set()).add(name)
+			if file_path not in self._file_stats:
+				self._file_stats[file_path] = self._get_file_stat(file_path)
+		for file_path in list(self._file_stats):
+			if file_path not in self._dependents:
+				del self._file_stats[file_path]
+
+	def _wait(self):
+		"""Waits for the 'interval', or less if a change is notified.
+
+		Return:
+		    value: bool -- True if a change is notified
+
+		"""
+
+		directories = set(
+			os.path.dirname(file_path) for file_path in self._file_stats
+		)
+		if directories != self._directories:
+			self._close_notifier()
+			self._directories = directories
+			self._notifier = _get_notifier(directories)
+		if self._notifier is None:
+			time.sleep(self._interval)
+			return False
+		return self._notifier.wait(self._interval)
+
+	def _close_notifier(self):
+		"""Closes the notifier, it is created again for the new directories."""
+
+		if self._notifier is not None:
+			self._notifier.close()
+			self._notifier = None
+		self._directories = set()
+
+	@staticmethod
+	def _get_file_stat(file_path):
+		"""Return (mtime, size) of the file, or None if it is not found."""
+
+		try:
+			file_stat = os.stat(file_path)
+
+		except OSError:
+			return None
+		return (file_stat.st_mtime_ns, file_stat.st_size)
+
+
+class _InotifyNotifier:
+	"""Change notifications of directories on Linux (inotify)."""
+
+	# IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO,
+	# IN_CREATE, IN_DELETE
+	_flags = 0x2 | 0x4 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200
+	# IN_NONBLOCK, IN_CLOEXEC
+	_init_flags = 0o4000 | 0o2000000
+
+	def __init__(self, directories):
+		self._libc = ctypes.CDLL(None, use_errno=True)
+		self._fd = self._libc.inotify_init1(self._init_flags)
+		if self._fd < 0:
+			raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+		for directory in directories:
+			self._libc.inotify_add_watch(
+				self._fd, os.fsencode(directory), self._flags
+			)
+
+	def wait(self, timeout):
+		"""Return True if a change is notified within the timeout."""
+
+		readable = select.select([self._fd], [], [], timeout)[0]
+		if not readable:
+			return False
+		try:
+			while os.read(self._fd, 65536):
+				pass
+
+		except BlockingIOError:
+			pass
+		return True
+
+	def close(self):
+		"""Closes the notifications."""
+		os.close(self._fd)
+
+
+class _WindowsNotifier:
+	"""Change notifications of directories on Windows."""
+
+	# FILE_NOTIFY_CHANGE_FILE_NAME, _SIZE, _LAST_WRITE
+	_flags = 0x1 | 0x8 | 0x10
+	_max_handles = 64
+
+	def __init__(self, directories):
+		self._kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+		self._kernel32.FindFirstChangeNotificationW.restype = ctypes.c_void_p
+		self._handles = []
+		if len(directories) > self._max_handles:
+			raise OSError('Too many directories to watch')
+		for directory in directories:
+			handle = self._kernel32.FindFirstChangeNotificationW(
+				directory, False, self._flags
+			)
+			if handle is None or handle == ctypes.c_void_p(-1).value:
+				self.close()
+				raise OSError(ctypes.get_last_error(), 'FindFirstChangeNotification failed')
+			self._handles.append(handle)
+
+	def wait(self, timeout):
+		"""Return True if a change is notified within the timeout."""
+
+		if not self._handles:
+			time.sleep(timeout)
+			return False
+		handles = (ctypes.c_void_p * len(self._handles))(*self._handles)
+		index = self._kernel32.WaitForMultipleObjects(
+			len(self._handles), handles, False, int(timeout * 1000)
+		)
+		if not 0 <= index < len(self._handles):
+			return False
+		self._kernel32.FindNextChangeNotification(ctypes.c_void_p(self._handles[index]))
+		return True
+
+	def close(self):
+		"""Closes the notifications."""
+
+		for handle in self._handles:
+			self._kernel32.FindCloseChangeNotification(ctypes.c_void_p(handle))
+		self._handles = []
+
+
+def _get_notifier(directories):
+	"""Return the change notifier of the system, or None (then the stats are polled)."""
+
+	try:
+		if os.name == 'nt':
+			return _WindowsNotifier(sorted(directories))
+		if hasattr(select, 'select') and os.uname().sysname == 'Linux':
+			return _InotifyNotifier(sorted(directories))
+
+	except (OSError, AttributeError):
+		pass
+	return None
@@ -0,0 +1,375 @@
+#!/usr/bin/env python
+"""Benchmark suite of bpp.
+
+Generates synthetic projects (in a temporary directory) and measures:
+* 'Preprocessor.preprocessize' and 'include_all' times,
+* the wall time of a whole bpp.py call,
+* the peak memory of 'preprocessize' (tracemalloc),
+* the included files per second.
+
+The results are written as JSON. The compare mode fails (exit status 1) -
+when a result is worse than the base one by more than the threshold (percent).
+Only the standard library is used.
+
+$ python bench.py --output base.json
+$ python bench.py --output new.json --compare base.json --threshold 10
+$ python bench.py --compare base.json new.json
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+__all__ = [
+	'compare_results',
+	'main',
+	'make_case',
+	'run_case',
+]
+
+BPP_DIR = os.path.realpath(os.path.join(__file__, os.pardir, os.pardir))
+PYBPP = os.path.join(BPP_DIR, 'bpp.py')
+
+# The environment variable of the 'environ' case,
+# lower case, because the source file is lowered by the preprocessor.
+ENVIRON_NAME = 'bpp_bench_lib'
+
+# {metric: True if more is better}
+METRICS = {
+	'preprocessize_ms': False,
+	'include_all_ms': False,
+	'cli_ms': False,
+	'peak_memory_mb': False,
+	'files_per_second': True,
+}
+
+
+class _CaseWriter:
+	"""Writes the files of a synthetic project."""
+
+	def __init__(self, case_dir, name):
+		self.name = name
+		self.lib_dir = os.path.join(case_dir, 'lib')
+		self.main_path = os.path.join(case_dir, 'main.bat')
+		os.makedirs(self.lib_dir)
+
+	def write(self, file_name, includes=(), lines=10, pragma_once=False):
+		"""Writes the library file, with its includes and 'lines' echo lines."""
+
+		content = []
+		if pragma_once:
+			content.append(':#pragma once')
+		content.extend(':#include "%s"' % path for path in includes)
+		content.extend(
+			'echo %s %s line %s' % (self.name, file_name, line)
+			for line in range(lines)
+		)
+		file_path = os.path.join(self.lib_dir, file_name)
+		os.makedirs(os.path.dirname(file_path), exist_ok=True)
+		with open(file_path, 'w') as file:
+			file.write('\n'.join(content) + '\n')
+
+	def write_main(self, includes):
+		"""Writes the main file, which includes the library files."""
+
+		content = ['@echo off']
+		content.extend(':#include "%s"' % path for path in includes)
+		content.append('exit /b 0')
+		with open(self.main_path, 'w') as file:
+			file.write('\n'.join(content) + '\n')
+
+
+def _lib_path(*names):
+	"""Return the path of the library file, relative to the main file."""
+	return os.path.join('lib', *names)
+
+
+def _environ_path(file_name):
+	"""Return the path of the library file, with the environment variable."""
+
+	if os.name == 'nt':
+		return '%%%s%%\\%s' % (ENVIRON_NAME, file_name)
+	return '$%s/%s' % (ENVIRON_NAME, file_name)
+
+
+def make_case(case_dir, name, scale=1.0):
+	"""Writes the synthetic project of the case.
+
+	Args:
+	    case_dir: str -- an empty directory of the project
+	    name: str -- case name, see 'CASES'
+	    scale: float -- multiplies the files count (and sizes)
+
+	Return:
+	    value: str -- the main file path
+
+	"""
+
+	writer = _CaseWriter(case_dir, name)
+	size = lambda count: max(1, int(count * scale))
+	if name == 'deep_chain':
+		# Every file includes the next one, within the default depth limit.
+		depth = min(size(100), 250)
+		for index in range(depth):
+			includes = ['chain%s.bat' % (index + 1)] if index + 1 < depth else []
+			writer.write('chain%s.bat' % index, includes, 50)
+		writer.write_main([_lib_path('chain0.bat')])
+	elif name == 'wide_fanout':
+		count = size(500)
+		for index in range(count):
+			writer.write('wide%s.bat' % index, (), 20)
+		writer.write_main([_lib_path('wide%s.bat' % n) for n in range(count)])
+	elif name == 'diamond':
+		# Every file includes all files of the next layer, once.
+		layers, width = size(10), 4
+		for layer in range(layers):
+			includes = [] if layer + 1 == layers else [
+				'node%s_%s.bat' % (layer + 1, n) for n in range(width)
+			]
+			for index in range(width):
+				writer.write(
+					'node%s_%s.bat' % (layer, index), includes, 20, pragma_once=True
+				)
+		writer.write_main([_lib_path('node0_%s.bat' % n) for n in range(width)])
+	elif name == 'environ':
+		count = size(200)
+		for index in range(count):
+			writer.write('env%s.bat' % index, (), 20)
+		writer.write_main([_environ_path('env%s.bat' % n) for n in range(count)])
+	elif name == 'huge_leaf':
+		for index in range(2):
+			writer.write('huge%s.bat' % index, (), size(100000))
+		writer.write_main([_lib_path('huge%s.bat' % n) for n in range(2)])
+	elif name == 'many_small':
+		# Directories of one-line files, each directory has an index file.
+		directories, count = size(50), 40
+		for directory in range(directories):
+			file_names = ['small%s.bat' % n for n in range(count)]
+			for file_name in file_names:
+				writer.write(os.path.join('dir%s' % directory, file_name), (), 1)
+			writer.write(
+				os.path.join('dir%s' % directory, 'index.bat'), file_names, 0
+			)
+		writer.write_main([
+			_lib_path('dir%s' % n, 'index.bat') for n in range(directories)
+		])
+	else:
+		raise ValueError("Unknown benchmark case '%s'" % name)
+	return writer.main_path
+
+
+CASES = (
+	'deep_chain',
+	'wide_fanout',
+	'diamond',
+	'environ',
+	'huge_leaf',
+	'many_small',
+)
+
+
+def _time_call(function, repeat):
+	"""Return the median time (ms) of the calls, and the last result."""
+
+	times = []
+	result = None
+	for _ in range(repeat):
+		start_time = time.perf_counter()
+		result = function()
+		times.append((time.perf_counter() - start_time) * 1000)
+	return statistics.median(times), result
+
+
+def run_case(main_path, repeat=5, cli=True):
+	"""Measures the case.
+
+	Args:
+	    main_path: str -- the main file, see 'make_case'
+	    repeat: int -- the calls count, the median time is taken
+	    cli: bool -- if False then bpp.py is not called
+
+	Return:
+	    value: dict -- {metric: value}, see 'METRICS'
+
+	"""
+
+	from BpPyLib.includer import include_all
+	from BpPyLib.preprocessor import Preprocessor
+
+	def preprocessize():
+		preprocessor = Preprocessor(main_path)
+		preprocessor.preprocessize()
+		return preprocessor
+
+	current_dir = os.getcwd()
+	os.chdir(os.path.dirname(main_path))
+	try:
+		preprocessize_ms, preprocessor = _time_call(preprocessize, repeat)
+		include_all_ms, _ = _time_call(lambda: include_all(main_path), repeat)
+		tracemalloc.start()
+		try:
+			preprocessize()
+			peak_memory = tracemalloc.get_traced_memory()[1]
+
+		finally:
+			tracemalloc.stop()
+
+	finally:
+		os.chdir(current_dir)
+	files_count = len(preprocessor.getincluder().get_dependencies())
+	results = {
+		'files': files_count,
+		'output_bytes': len(preprocessor.get_preprocessed_file().encode()),
+		'preprocessize_ms': preprocessize_ms,
+		'include_all_ms': include_all_ms,
+		'peak_memory_mb': peak_memory / 2**20,
+		'files_per_second': files_count / (preprocessize_ms / 1000),
+	}
+	if cli:
+		output_path = os.path.join(os.path.dirname(main_path), 'out.bat')
+		command = [
+			sys.executable, PYBPP, '-s', main_path, '-o', output_path, '--no-cache',
+		]
+		results['cli_ms'], _ = _time_call(
+			lambda: subprocess.run(command, check=True, stderr=subprocess.DEVNULL),
+			repeat,
+		)
+	return results
+
+
+def run_benchmarks(cases, scale=1.0, repeat=5, cli=True):
+	"""Runs the cases and prints their results.
+
+	Return:
+	    value: dict -- the JSON results
+
+	"""
+
+	sys.path.insert(1, os.path.join(BPP_DIR, 'Lib'))
+	from BpPyLib.version import getversion
+
+	results = {
+		'bpp_version': getversion(),
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'scale': scale,
+		'repeat': repeat,
+		'cases': {},
+	}
+	with tempfile.TemporaryDirectory() as bench_dir:
+		for name in cases:
+			case_dir = os.path.join(bench_dir, name)
+			main_path = make_case(case_dir, name, scale)
+			os.environ[ENVIRON_NAME] = os.path.join(case_dir, 'lib')
+			case_results = run_case(main_path, repeat, cli)
+			results['cases'][name] = case_results
+			print("%-12s %5s files  preprocessize %8.1f ms  include_all %8.1f ms  "
+				"cli %8s  peak %7.1f MB  %9.0f files/s" % (
+				name, case_results['files'],
+				case_results['preprocessize_ms'], case_results['include_all_ms'],
+				'%.1f ms' % case_results['cli_ms'] if cli else '-',
+				case_results['peak_memory_mb'], case_results['files_per_second'],
+			))
+	return results
+
+
+def compare_results(base, new, threshold, memory_threshold=None):
+	"""Compares the results, and prints the differences.
+
+	Args:
+	    base: dict -- the base JSON results
+	    new: dict -- the new JSON results
+	    threshold: float -- allowed regression (percent) of the times
+	    memory_threshold: float -- allowed regression (percent) of the memory,
+	        if None then 'threshold'
+
+	Return:
+	    value: list -- (case, metric, base value, new value) of the regressions
+
+	"""
+
+	if memory_threshold is None:
+		memory_threshold = threshold
+	if (base.get('scale'), base.get('repeat')) != (new.get('scale'), new.get('repeat')):
+		print("Warning: the results are of different --scale or --repeat")
+	regressions = []
+	for name, new_case in new['cases'].items():
+		base_case = base['cases'].get(name)
+		if base_case is None:
+			continue
+		for metric, more_is_better in METRICS.items():
+			if metric not in base_case or metric not in new_case:
+				continue
+			base_value, new_value = base_case[metric], new_case[metric]
+			if not base_value:
+				continue
+			change = (new_value - base_value) / base_value * 100
+			if more_is_better:
+				change = -change
+			limit = memory_threshold if metric == 'peak_memory_mb' else threshold
+			is_regression = change > limit
+			if is_regression:
+				regressions.append((name, metric, base_value, new_value))
+			print("%-12s %-18s %12.2f -> %12.2f  %+7.1f%%%s" % (
+				name, metric, base_value, new_value,
+				-change if more_is_better else change,
+				'  REGRESSION' if is_regression else '',
+			))
+	return regressions
+
+
+def main():
+	"""Runs the benchmarks, or compares the results."""
+
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--cases', default=','.join(CASES),
+		help="comma separated names of: %s" % ', '.join(CASES))
+	parser.add_argument('--scale', type=float, default=1.0)
+	parser.add_argument('--repeat', type=int, default=5)
+	parser.add_argument('--no-cli', action='store_true',
+		help="do not measure bpp.py calls")
+	parser.add_argument('--output', help="JSON file of the results")
+	parser.add_argument('--compare', nargs='+', metavar='JSON',
+		help="base results, and the new ones (else they are measured now)")
+	parser.add_argument('--threshold', type=float, default=10.0,
+		help="allowed regression, percent")
+	parser.add_argument('--memory-threshold', type=float)
+	args = parser.parse_args()
+	if args.compare is not None and len(args.compare) > 2:
+		parser.error("--compare takes one or two files")
+	if args.compare is not None and len(args.compare) == 2:
+		with open(args.compare[1]) as file:
+			results = json.load(file)
+	else:
+		cases = [name for name in args.cases.split(',') if name]
+		for name in cases:
+			if name not in CASES:
+				parser.error("unknown case '%s'" % name)
+		results = run_benchmarks(cases, args.scale, args.repeat, not args.no_cli)
+	if args.output is not None:
+		with open(args.output, 'w') as file:
+			json.dump(results, file, indent=4)
+	if args.compare is not None:
+		with open(args.compare[0]) as file:
+			base = json.load(file)
+		regressions = compare_results(
+			base, results, args.threshold, args.memory_threshold
+		)
+		if regressions:
+			print("%s regressions (threshold %.1f%%)" % (
+				len(regressions), args.threshold
+			))
+			sys.exit(1)
+	return None
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""Benchmark of the bpp daemon against cold starts.
+
+Builds a generated project of bat files (in a temporary directory)
+many times, with 'bpp.py' (a new interpreter and library every call),
+and with 'bppc.py' while the daemon is running.
+Only the standard library is used.
+
+$ python bench_daemon.py [--calls 20] [--files 50]
+
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+__all__ = [
+	'main',
+]
+
+BPP_DIR = os.path.realpath(os.path.join(__file__, os.pardir, os.pardir))
+PYBPP = os.path.join(BPP_DIR, 'bpp.py')
+PYBPPC = os.path.join(BPP_DIR, 'bppc.py')
+
+
+def make_project(project_dir, files_count):
+	"""Writes the main file, which includes 'files_count' library files.
+
+	Return:
+	    value: str -- the main file path
+
+	"""
+
+	lib_dir = os.path.join(project_dir, 'lib')
+	os.makedirs(lib_dir)
+	main_lines = ['@echo off']
+	for index in range(files_count):
+		file_name = 'lib%s.bat' % index
+		with open(os.path.join(lib_dir, file_name), 'w') as file:
+			if index:
+				file.write(':#include "lib%s.bat"\n' % (index - 1))
+			for line in range(200):
+				file.write('echo lib %s line %s\n' % (index, line))
+		main_lines.append(':#include "lib/%s"' % file_name)
+	main_path = os.path.join(project_dir, 'main.bat')
+	with open(main_path, 'w') as file:
+		file.write('\n'.join(main_lines) + '\n')
+	return main_path
+
+
+def time_calls(script, main_path, output_path, calls):
+	"""Return the times (seconds) of the calls of the script."""
+
+	command = [
+		sys.executable, script, '-s', main_path, '-o', output_path, '--no-cache',
+	]
+	times = []
+	for _ in range(calls):
+		start_time = time.perf_counter()
+		subprocess.run(command, check=True, stderr=subprocess.DEVNULL)
+		times.append(time.perf_counter() - start_time)
+	return times
+
+
+def wait_daemon(is_running, timeout=10.0):
+	"""Waits until the daemon is running (or not running)."""
+
+	sys.path.insert(1, os.path.join(BPP_DIR, 'Lib'))
+	from BpPyLib.daemon import send_request
+
+	start_time = time.perf_counter()
+	while (send_request({'command': 'ping'}) is not None) != is_running:
+		if time.perf_counter() - start_time > timeout:
+			raise RuntimeError('The bpp daemon did not start (stop) in time')
+		time.sleep(0.05)
+
+
+def main():
+	"""Runs the benchmark and prints the results."""
+
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--calls', type=int, default=20)
+	parser.add_argument('--files', type=int, default=50)
+	args = parser.parse_args()
+	with tempfile.TemporaryDirectory() as project_dir:
+		main_path = make_project(project_dir, args.files)
+		cold_output = os.path.join(project_dir, 'cold.bat')
+		daemon_output = os.path.join(project_dir, 'daemon.bat')
+		cold_times = time_calls(PYBPP, main_path, cold_output, args.calls)
+		daemon = subprocess.Popen(
+			[sys.executable, PYBPP, '--daemon'], stderr=subprocess.DEVNULL
+		)
+		try:
+			wait_daemon(True)
+			daemon_times = time_calls(PYBPPC, main_path, daemon_output, args.calls)
+
+		finally:
+			subprocess.run([sys.executable, PYBPPC, '--stop-daemon'])
+			daemon.wait()
+		with open(cold_output, 'rb') as cold_file, open(daemon_output, 'rb') as daemon_file:
+			if cold_file.read() != daemon_file.read():
+				raise RuntimeError('The daemon output differs from bpp.py')
+	print("%s calls, %s files" % (args.calls, args.files))
+	for name, times in (('cold start', cold_times), ('daemon', daemon_times)):
+		print("%-10s median %.1f ms, min %.1f ms" % (
+			name, statistics.median(times) * 1000, min(times) * 1000,
+		))
+	print("speedup    %.1fx" % (
+		statistics.median(cold_times) / statistics.median(daemon_times),
+	))
+	return None
+
+
+if __name__ == "__main__":
+	main()
@@ -174,16 +174,24 @@ goto :EndOfDefines
 	:: Compilation BPP library
 	call cythonize -i -3 "%bppylib_path%\abcs.py"
 	call cythonize -i -3 "%bppylib_path%\bppcli.py"
+	call cythonize -i -3 "%bppylib_path%\buildcache.py"
 	call cythonize -i -3 "%bppylib_path%\compat.py"
 	call cythonize -i -3 "%bppylib_path%\cores.py"
+	call cythonize -i -3 "%bppylib_path%\daemon.py"
+	call cythonize -i -3 "%bppylib_path%\depfile.py"
 	call cythonize -i -3 "%bppylib_path%\exceptions.py"
 	call cythonize -i -3 "%bppylib_path%\includer.py"
 	call cythonize -i -3 "%bppylib_path%\precommands.py"
+	call cythonize -i -3 "%bppylib_path%\precompiled.py"
+	call cythonize -i -3 "%bppylib_path%\treeshaker.py"
 	call cythonize -i -3 "%bppylib_path%\preprocessor.py"
+	call cythonize -i -3 "%bppylib_path%\project.py"
 	call cythonize -i -3 "%bppylib_path%\prompts.py"
+	call cythonize -i -3 "%bppylib_path%\stats.py"
 	call cythonize -i -3 "%bppylib_path%\structures.py"
 	call cythonize -i -3 "%bppylib_path%\utils.py"
 	call cythonize -i -3 "%bppylib_path%\version.py"
+	call cythonize -i -3 "%bppylib_path%\watcher.py"
 	
 	:: Compiling the 'bpp.py' utility
 	echo. & call python -m nuitka --standalone --mingw64 --output-dir="%dist_path%" "%pybpp_path%"
@@ -208,16 +216,24 @@ goto :EndOfDefines
 	set errorflag=0
 	if not exist "%dist_path%\Lib\BpPyLib\abcs*.pyd" call :Print_ModuleNotExist abcs.py & set errorflag=1
 	if not exist "%dist_path%\Lib\BpPyLib\bppcli*.pyd" call :Print_ModuleNotExist bppcli.py & set errorflag=1
+	if not exist "%dist_path%\Lib\BpPyLib\buildcache*.pyd" call :Print_ModuleNotExist buildcache.py & set errorflag=1
 	if not exist "%dist_path%\Lib\BpPyLib\compat*.pyd" call :Print_ModuleNotExist compat.py & set errorflag=1
 	if not exist "%dist_path%\Lib\BpPyLib\cores*.pyd" call :Print_ModuleNotExist cores.py & set errorflag=1
+	if not exist "%dist_path%\Lib\BpPyLib\daemon*.pyd" call :Print_ModuleNotExist daemon.py & set errorflag=1
+	if not exist "%dist_path%\Lib\BpPyLib\depfile*.pyd" call :Print_ModuleNotExist depfile.py & set errorflag=1
 	if not exist "%dist_path%\Lib\BpPyLib\exceptions*.pyd" call :Print_ModuleNotExist exceptions.py & set errorflag=1
 	if not exist "%dist_path%\Lib\BpPyLib\includer*.pyd" call :Print_ModuleNotExist includer.py & set errorflag=1
 	if not exist "%dist_path%\Lib\BpPyLib\precommands*.pyd" call :Print_ModuleNotExist precommands.py & set errorflag=1
+	if not exist "%dist_path%\Lib\BpPyLib\precompiled*.pyd" call :Print_ModuleNotExist precompiled.py & set errorflag=1
+	if not exist "%dist_path%\Lib\BpPyLib\treeshaker*.pyd" call :Print_ModuleNotExist treeshaker.py & set errorflag=1
 	if not exist "%dist_path%\Lib\BpPyLib\preprocessor*.pyd" call :Print_ModuleNotExist preprocessor.py & set errorflag=1
+	if not exist "%dist_path%\Lib\BpPyLib\project*.pyd" call :Print_ModuleNotExist project.py & set errorflag=1
 	if not exist "%dist_path%\Lib\BpPyLib\prompts*.pyd" call :Print_ModuleNotExist prompts.py & set errorflag=1
+	if not exist "%dist_path%\Lib\BpPyLib\stats*.pyd" call :Print_ModuleNotExist stats.py & set errorflag=1
 	if not exist "%dist_path%\Lib\BpPyLib\structures*.pyd" call :Print_ModuleNotExist structures.py & set errorflag=1
 	if not exist "%dist_path%\Lib\BpPyLib\utils*.pyd" call :Print_ModuleNotExist utils.py & set errorflag=1
 	if not exist "%dist_path%\Lib\BpPyLib\version*.pyd" call :Print_ModuleNotExist version.py & set errorflag=1
+	if not exist "%dist_path%\Lib\BpPyLib\watcher*.pyd" call :Print_ModuleNotExist watcher.py & set errorflag=1
 	if not exist "%dist_path%\bpp.exe" call :Print_ExecutableNotExist & set errorflag=1
 	
 	:: User choice if something didn't compile
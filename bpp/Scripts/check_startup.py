@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""Start-up time budget of bpp.py and bppc.py.
+
+Runs '--version' and '--help' of 'bpp.py' and of the client 'bppc.py' -
+(which Bin/bpp.bat launches) with 'python -X importtime',
+and fails (exit status 1) if they import more than the budget (milliseconds),
+or import a module that only the preprocessing (or the daemon) needs.
+The client is run with an empty runtime directory,
+so it takes the path without the daemon, which must not import 'multiprocessing'.
+Only the standard library is used.
+
+$ python check_startup.py [--budget 30] [--runs 5]
+
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+__all__ = [
+	'main',
+]
+
+BPP_DIR = os.path.realpath(os.path.join(__file__, os.pardir, os.pardir))
+PYBPP = os.path.join(BPP_DIR, 'bpp.py')
+PYBPPC = os.path.join(BPP_DIR, 'bppc.py')
+
+# Modules which '--help' and '--version' must not import.
+FORBIDDEN_MODULES = (
+	'BpPyLib.abcs',
+	'BpPyLib.buildcache',
+	'BpPyLib.cores',
+	'BpPyLib.daemon',
+	'BpPyLib.depfile',
+	'BpPyLib.includer',
+	'BpPyLib.precommands',
+	'BpPyLib.precompiled',
+	'BpPyLib.treeshaker',
+	'BpPyLib.preprocessor',
+	'BpPyLib.project',
+	'BpPyLib.prompts',
+	'BpPyLib.stats',
+	'BpPyLib.watcher',
+	'asyncio',
+	'concurrent.futures',
+	'copy',
+	'logging',
+	'multiprocessing',
+	'random',
+	'socket',
+	'tempfile',
+)
+
+# The client imports 'send_request' of 'BpPyLib.daemon',
+# but not the connection ('multiprocessing', 'socket') without the daemon.
+CLIENT_FORBIDDEN_MODULES = tuple(
+	name for name in FORBIDDEN_MODULES if name != 'BpPyLib.daemon'
+)
+
+# The checked scripts, (script path, forbidden modules).
+SCRIPTS = (
+	(PYBPP, FORBIDDEN_MODULES),
+	(PYBPPC, CLIENT_FORBIDDEN_MODULES),
+)
+
+
+def get_imports(script, args, env):
+	"""Runs the script with '-X importtime'.
+
+	Return:
+	    value: tuple -- :
+	        0 is {module name: cumulative import time (ms)} of the imports -
+	        made by the script (not by the interpreter start-up),
+	        1 is the wall time (ms) of the run
+
+	"""
+
+	command = [sys.executable, '-X', 'importtime', script] + args
+	start_time = time.perf_counter()
+	process = subprocess.run(
+		command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+		universal_newlines=True, check=True, env=env,
+	)
+	wall_time = (time.perf_counter() - start_time) * 1000
+	imports = {}
+	is_startup = True
+	for line in process.stderr.splitlines():
+		if not line.startswith('import time:') or 'cumulative' in line:
+			continue
+		_, cumulative, name = line.split('|')
+		if is_startup:
+			# The interpreter start-up ends with 'site'.
+			is_startup = name.strip() != 'site'
+			continue
+		imports[name.strip()] = (int(cumulative) / 1000, name.startswith('  '))
+	return imports, wall_time
+
+
+def check(script, args, budget, runs, forbidden_modules, env):
+	"""Checks the start-up of '<script> <args>', and prints the results.
+
+	Return:
+	    value: bool -- True if it is within the budget
+
+	"""
+
+	import_times = []
+	wall_times = []
+	imported = set()
+	for _ in range(runs):
+		imports, wall_time = get_imports(script, args, env)
+		import_times.append(sum(
+			cumulative for cumulative, is_nested in imports.values() if not is_nested
+		))
+		wall_times.append(wall_time)
+		imported.update(imports)
+	forbidden = sorted(
+		name for name in imported
+		if any(name == n or name.startswith(n + '.') for n in forbidden_modules)
+	)
+	import_time = statistics.median(import_times)
+	is_ok = import_time <= budget and not forbidden
+	print("%-7s %-10s imports %.1f ms (budget %.1f ms), run %.1f ms -- %s" % (
+		os.path.basename(script), ' '.join(args), import_time, budget,
+		statistics.median(wall_times), 'ok' if is_ok else 'FAILED',
+	))
+	for name in forbidden:
+		print("    imports %s" % name)
+	return is_ok
+
+
+def main():
+	"""Checks the start-up budget, exits with 1 if it is exceeded."""
+
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--budget', type=float, default=30.0)
+	parser.add_argument('--runs', type=int, default=5)
+	args = parser.parse_args()
+	with tempfile.TemporaryDirectory() as runtime_dir:
+		# Nothing listens there, so the client does not find the daemon.
+		env = dict(os.environ, XDG_RUNTIME_DIR=runtime_dir, LOCALAPPDATA=runtime_dir)
+		results = [
+			check(script, params, args.budget, args.runs, forbidden_modules, env)
+			for script, forbidden_modules in SCRIPTS
+			for params in (['--version'], ['--help'])
+		]
+	if not all(results):
+		sys.exit(1)
+	return None
+
+
+if __name__ == "__main__":
+	main()
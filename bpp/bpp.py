@@ -17,23 +17,22 @@ Date: 12 May 2021
 
 """
 
-import logging
-import random
 import sys
+import time
 import os
  
 sys.path.insert(
 	1, os.path.realpath(os.path.join(__file__, os.pardir, 'Lib'))
 )
 
-from BpPyLib.preprocessor import (
-	Preprocessor,
-)
+# Only the command line modules are imported here,
+# '--help' and '--version' do not load the preprocessing ones (or 'logging').
 from BpPyLib.bppcli import (
 	BppCLI,
 )
 from BpPyLib.utils import (
 	chdir_to_filedir,
+	get_error_message,
 	get_temp_dir,
 )
 from BpPyLib.exceptions import (
@@ -42,22 +41,29 @@ from BpPyLib.exceptions import (
 )
 
 __all__ = [
+	'build_project',
+	'execute',
 	'main',
+	'precompile',
 	'run',
+	'watch',
 ]
 
-logger = logging.getLogger(__name__)
-logging.basicConfig(
-	level=logging.INFO,
-	format="%(message)s"
-)
+# See '_get_logger'.
+logger = None
 
 
-def main(argv):
+def main(argv, cache_includer=None, environ=None):
 	"""Main function to bpp utility.
 	
 	Args:
 	    argv: list -- sys.argv
+	    cache_includer: Includer -- :
+	        the files cache to share (see 'Includer.share_cache'),
+	        the daemon keeps it between the calls
+	    environ: dict -- :
+	        the environment variables (see the 'environ' property of 'Includer'),
+	        the daemon gives the environment of its client, None is 'os.environ'
 
 	"""
 
@@ -66,7 +72,29 @@ def main(argv):
 	if not status:
 		return None
 	bpp_cli.validate()
+	from BpPyLib.buildcache import BuildCache
+	from BpPyLib.depfile import DepFile
+	from BpPyLib.preprocessor import Preprocessor
+
 	parsered_args = bpp_cli.get_parsered_args()
+	if parsered_args['daemon'] is not None:
+		from BpPyLib.daemon import BppDaemon
+
+		# The daemon redirects the log handlers, they must exist.
+		_get_logger()
+		BppDaemon(execute).serve_forever()
+		return None
+	if parsered_args['watch'] is not None:
+		watch(parsered_args, bpp_cli.get_defines())
+		return None
+	if parsered_args['precompile'] is not None:
+		precompile(
+			parsered_args, bpp_cli.get_defines(), bpp_cli.get_limits(), environ
+		)
+		return None
+	if parsered_args['project'] is not None or parsered_args['sources'] is not None:
+		build_project(parsered_args, bpp_cli.get_defines(), cache_includer, environ)
+		return None
 	source = parsered_args['source']
 	output = parsered_args['output']
 	run = parsered_args['run']
@@ -75,28 +103,113 @@ def main(argv):
 	if source is None:
 		raise CLIError("Argument '--source or -s' not specified")
 	source = os.path.abspath(source)
-	current_dir = os.getcwd()
-	chdir_to_filedir(source)
-	preprocessor = Preprocessor(source)
-	preprocessor.preprocessize()
-	os.chdir(current_dir)
 	if output is not None:
 		output = os.path.abspath(output)
 		if os.path.isdir(output):
 			output = os.path.join(output, '.bat')
-		preprocessor.save(output)
+	cache_dir = parsered_args['cache_dir']
+	if cache_dir is not None:
+		cache_dir = os.path.abspath(cache_dir)
+	depfile = parsered_args['depfile']
+	if depfile is not None:
+		depfile = os.path.abspath(depfile)
+	current_dir = os.getcwd()
+	chdir_to_filedir(source)
+	binary = parsered_args['binary'] is not None
+	stats = None
+	if parsered_args['stats'] is not None or parsered_args['trace'] is not None:
+		from BpPyLib.stats import BuildStats
+
+		stats = BuildStats(trace=parsered_args['trace'] is not None)
+		stats.begin('setup', source)
+	preprocessor = Preprocessor(source, binary)
+	if stats is not None:
+		stats.end()
+	includer = preprocessor.getincluder()
+	if cache_includer is not None:
+		includer.share_cache(cache_includer)
+	defines = bpp_cli.get_defines()
+	includer.setproperty('defines', defines)
+	includer.setproperty('environ', environ)
+	limits = bpp_cli.get_limits()
+	includer.setproperty('limits', limits)
+	include_once = parsered_args['include_once'] is not None
+	includer.setproperty('include_once', include_once)
+	includer.setproperty('mmap', binary or parsered_args['mmap'] is not None)
+	if parsered_args['encoding'] is not None:
+		includer.setproperty('encoding', parsered_args['encoding'])
+	if parsered_args['prefetch'] is not None:
+		includer.setproperty('prefetch', int(parsered_args['prefetch']))
+	if stats is not None:
+		includer.setproperty('stats', stats)
+	if parsered_args['use_precompiled'] is not None:
+		includer.setproperty('use_precompiled', True)
+	build_cache = None
+	if output is not None and parsered_args['no_cache'] is None:
+		build_cache = BuildCache(
+			source, output, cache_dir,
+			{
+				'defines': defines,
+				'depfile': depfile,
+				'limits': limits,
+				'include_once': include_once,
+				'mmap': parsered_args['mmap'] is not None,
+				'binary': binary,
+				'encoding': parsered_args['encoding'],
+				'tree_shake': parsered_args['tree_shake'] is not None,
+				'keep_labels': parsered_args['keep_labels'],
+			},
+		)
+	if stats is not None and build_cache is not None:
+		stats.begin('cache_check')
+	is_up_to_date = (
+		build_cache is not None and
+		(depfile is None or os.path.isfile(depfile)) and
+		build_cache.is_up_to_date(includer.expand_environ, stats)
+	)
+	if stats is not None and build_cache is not None:
+		stats.end()
+		if is_up_to_date:
+			stats.set_up_to_date()
+	if not is_up_to_date:
+		preprocessor.preprocessize()
+		if parsered_args['tree_shake'] is not None:
+			_tree_shake(preprocessor, parsered_args['keep_labels'], stats)
+	os.chdir(current_dir)
+	if depfile is not None and not is_up_to_date:
+		DepFile(
+			output or source, source, includer.get_include_graph()
+		).save(depfile)
+	if stats is not None:
+		stats.begin('write')
+	size = 0
+	if output is not None:
+		if not is_up_to_date:
+			is_written = preprocessor.update(output)
+			if is_written and stats is not None:
+				size = os.path.getsize(output)
+			if build_cache is not None:
+				build_cache.record(
+					includer.get_dependencies(),
+					includer.get_environ_values(),
+				)
+	elif run is not None:
+		import random
+
+		temp_file_name = '__output_%s__.bat' % random.randrange(100000, 999999)
+		tmp_dir = get_temp_dir()
+		output = os.path.abspath(
+			os.path.join(tmp_dir, temp_file_name)
+		)
+		size = preprocessor.save(output)
 	else:
-		if run is not None:
-			temp_file_name = '__output_%s__.bat' % random.randrange(100000, 999999)
-			tmp_dir = get_temp_dir()
-			output = os.path.abspath(
-				os.path.join(tmp_dir, temp_file_name)
-			)
-			preprocessor.save(output)
-		else:
-			preprocessed_file = preprocessor.get_preprocessed_file()
-			logger.info(preprocessed_file)
-			return None
+		size = preprocessor.write(sys.stdout)
+		sys.stdout.flush()
+	if stats is not None:
+		stats.end()
+		stats.count('bytes_written', size)
+		stats.stop()
+		_report_stats(stats, includer, parsered_args)
 	if run is not None:
 		command = "call %s" % output
 		try:
@@ -106,6 +219,191 @@ def main(argv):
 				os.remove(output)
 	return None
 
+def build_project(parsered_args, defines=None, cache_includer=None, environ=None):
+	"""Builds the targets of the project ('--project' or '--sources').
+	
+	Args:
+	    parsered_args: dict -- see 'BppCLI.get_parsered_args'
+	    defines: dict -- '--define' variables of the '--sources' targets
+	    cache_includer: Includer -- the files cache to share, see 'main'
+	    environ: dict -- the environment variables, see 'main'
+
+	"""
+
+	project = _get_project(parsered_args, defines)
+	if cache_includer is not None:
+		project.share_cache(cache_includer)
+	if environ is not None:
+		project.set_environ(environ)
+	start_time = time.perf_counter()
+	results = project.build(
+		parsered_args['targets'],
+		parsered_args['no_cache'] is None,
+		int(parsered_args['jobs'] or 1),
+	)
+	_log_results(results, time.perf_counter() - start_time)
+	return None
+
+def precompile(parsered_args, defines=None, limits=None, environ=None):
+	"""Precompiles the libraries ('--precompile').
+	
+	Every library is expanded, and saved next to it ('<library>.bpch'),
+	see 'Includer.precompile'.
+	
+	Args:
+	    parsered_args: dict -- see 'BppCLI.get_parsered_args'
+	    defines: dict -- '--define' variables
+	    limits: dict -- '--max-*' limits, see 'BppCLI.get_limits'
+	    environ: dict -- the environment variables, see 'main'
+
+	"""
+
+	from BpPyLib.precompiled import PrecompiledHeader
+	from BpPyLib.preprocessor import Preprocessor
+
+	for library in parsered_args['precompile']:
+		library = os.path.abspath(library)
+		includer = Preprocessor(library).getincluder()
+		includer.setproperty('defines', defines or {})
+		includer.setproperty('environ', environ)
+		includer.setproperty('limits', limits or {})
+		includer.setproperty(
+			'include_once', parsered_args['include_once'] is not None
+		)
+		header = PrecompiledHeader(library)
+		header.save(
+			includer.precompile(library), includer.get_precompile_options()
+		)
+		_get_logger().info("precompiled %s" % header.get_artifact_path())
+	return None
+
+def watch(parsered_args, defines=None):
+	"""Builds the targets, and rebuilds them when their files change ('--watch').
+	
+	Runs until Ctrl+C.
+	
+	Args:
+	    parsered_args: dict -- see 'BppCLI.get_parsered_args'
+	    defines: dict -- '--define' variables, see 'build_project'
+
+	"""
+
+	from BpPyLib.watcher import Watcher
+
+	project = _get_project(parsered_args, defines)
+	watcher = Watcher(
+		project,
+		parsered_args['targets'],
+		float(parsered_args['watch_interval'] or 0.5),
+		parsered_args['no_cache'] is None,
+		int(parsered_args['jobs'] or 1),
+	)
+
+	def on_build(results, changed_files):
+		for file_path in changed_files:
+			_get_logger().info("changed    %s" % file_path)
+		_log_results(results, sum(result['time'] for result in results))
+		_get_logger().info("Watching for changes (Ctrl+C to stop)...")
+
+	try:
+		watcher.run(on_build)
+
+	except KeyboardInterrupt:
+		pass
+	return None
+
+def _get_project(parsered_args, defines):
+	"""Return the project of the '--project', '--sources' or '-s' params."""
+
+	from BpPyLib.project import Project
+
+	if parsered_args['project'] is not None:
+		return Project(parsered_args['project'])
+	options = {}
+	for name in ('include_once', 'mmap', 'binary', 'use_precompiled', 'tree_shake'):
+		if parsered_args[name] is not None:
+			options[name] = True
+	if parsered_args['keep_labels'] is not None:
+		options['keep_labels'] = ','.join(parsered_args['keep_labels'])
+	if parsered_args['encoding'] is not None:
+		options['encoding'] = parsered_args['encoding']
+	for name in ('max_depth', 'max_includes', 'max_output_bytes', 'prefetch'):
+		if parsered_args[name] is not None:
+			options[name] = int(parsered_args[name])
+	if parsered_args['sources'] is not None:
+		return Project.from_sources(
+			parsered_args['sources'],
+			parsered_args['output_dir'],
+			defines,
+			options,
+			parsered_args['cache_dir'],
+		)
+	return Project.from_target(
+		parsered_args['source'],
+		parsered_args['output'],
+		defines,
+		options,
+		parsered_args['cache_dir'],
+		parsered_args['depfile'],
+	)
+
+def _tree_shake(preprocessor, keep_labels, stats):
+	"""Removes the unused labels ('--tree-shake'), see 'Preprocessor.tree_shake'."""
+
+	if stats is not None:
+		stats.begin('shake')
+	report = preprocessor.tree_shake(keep_labels)
+	if stats is not None:
+		stats.end()
+		stats.count('labels_removed', len(report['labels']))
+	if report['dynamic'] is not None:
+		_get_logger().warning(
+			"Tree shaking skipped, the label is dynamic: '%s' "
+			"(list the labels it calls with '--keep-label')" % report['dynamic']
+		)
+
+def _report_stats(stats, includer, parsered_args):
+	"""Logs the build statistics ('--stats'), and saves the trace ('--trace')."""
+
+	if parsered_args['stats'] is not None:
+		_get_logger().info(stats.format_report(includer.get_cache_stats()))
+	trace_path = parsered_args['trace']
+	if trace_path is not None:
+		stats.save_trace(trace_path)
+		_get_logger().info("Trace saved to %s" % os.path.abspath(trace_path))
+
+def _log_results(results, build_time):
+	"""Logs the results of 'Project.build', and the build time (seconds)."""
+
+	for result in results:
+		if result['error'] is not None:
+			_get_logger().error("error      %s: %s" % (result['name'], result['error']))
+			continue
+		_get_logger().info("%-10s %s (%.1f ms)" % (
+			'built' if result['built'] else 'up to date',
+			result['name'],
+			result['time'] * 1000,
+		))
+	_get_logger().info("%s targets, %s built (%.1f ms)" % (
+		len(results),
+		len([result for result in results if result['built']]),
+		build_time * 1000,
+	))
+
+def _get_logger():
+	"""Return the logger of the utility, 'logging' is imported on first use."""
+
+	global logger
+	if logger is None:
+		import logging
+
+		logger = logging.getLogger(__name__)
+		logging.basicConfig(
+			level=logging.INFO,
+			format="%(message)s"
+		)
+	return logger
+
 def run():
 	"""Runs the main function.
 	
@@ -115,27 +413,38 @@ def run():
 	"""
 
 	if os.name != 'nt':
-		logger.warning("Warning: Bpp utility works correctly in OS Windows")
-	argv = sys.argv
+		# Not logged, 'logging' is not imported before the arguments are parsed.
+		print("Warning: Bpp utility works correctly in OS Windows", file=sys.stderr)
+	sys.exit(execute(sys.argv))
+
+def execute(argv, cache_includer=None, environ=None):
+	"""Runs the main function, and reports its errors.
+	
+	Args:
+	    argv: list -- sys.argv
+	    cache_includer: Includer -- the files cache to share, see 'main'
+	    environ: dict -- the environment variables, see 'main'
+	
+	Return:
+	    value: int -- the exit status, 0 or 1
+
+	"""
+
 	current_dir = os.getcwd()
 	try:
-		main(argv)
+		main(argv, cache_includer, environ)
 	
 	except Exception as ex:
 		exceps = (BPPError, OSError,)
 		if isinstance(ex, exceps):
-			error_message = 'Error: %s' % (
-				'\n'.join(map(str, ex.args)),
-			)
-			if isinstance(ex, OSError) and ex.filename is not None:
-				error_message += ": '%s'" % ex.filename
-			logger.error(error_message)
+			error_message = 'Error: %s' % get_error_message(ex)
+			_get_logger().error(error_message)
 		else:
 			error_message = "Error: Some kind of error has occurred"
-			logger.error(error_message)
-		sys.exit(1)
+			_get_logger().error(error_message)
+		return 1
 	else:
-		sys.exit(0)
+		return 0
 	finally:
 		try:
 			os.chdir(current_dir)
@@ -149,5 +458,5 @@ if __name__ == "__main__":
 	
 	except Exception:
 		error_message = "Error: Something went wrong"
-		logger.error(error_message)
+		_get_logger().error(error_message)
 		sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""Batch preprocessor client.
+
+The thin client of the bpp daemon (see 'bpp.py --daemon').
+It takes the same command line as bpp.py,
+sends it to the daemon and prints its output.
+If the daemon is not running, bpp.py is run in this process.
+
+Starts the daemon:
+$ python bpp.py --daemon
+
+Stops the daemon:
+$ python bppc.py --stop-daemon
+
+------------------------------
+
+Date: 17 October 2026
+
+"""
+
+import os
+import sys
+
+sys.path.insert(
+	1, os.path.realpath(os.path.join(__file__, os.pardir, 'Lib'))
+)
+
+from BpPyLib.daemon import (
+	LOCAL_PARAMS,
+	send_request,
+)
+
+__all__ = [
+	'run',
+]
+
+
+def run():
+	"""Runs the bpp call in the daemon, or in this process.
+
+	Raises:
+	    SystemExit -- calls sys.exit
+
+	"""
+
+	argv = sys.argv
+	if argv[1:] == ['--stop-daemon']:
+		response = send_request({'command': 'stop'})
+		if response is None:
+			print("Error: The bpp daemon is not running", file=sys.stderr)
+			sys.exit(1)
+		sys.exit(0)
+	response = None
+	if not any(param in LOCAL_PARAMS for param in argv[1:]):
+		response = send_request({
+			'argv': argv,
+			'cwd': os.getcwd(),
+			'encoding': sys.stdout.encoding,
+		})
+	if response is None:
+		sys.path.insert(1, os.path.dirname(os.path.realpath(__file__)))
+		import bpp
+		bpp.run()
+	sys.stdout.flush()
+	sys.stdout.buffer.write(response['stdout'])
+	sys.stdout.buffer.flush()
+	sys.stderr.flush()
+	sys.stderr.buffer.write(response['stderr'])
+	sys.stderr.buffer.flush()
+	sys.exit(response['status'])
+
+
+if __name__ == "__main__":
+	run()